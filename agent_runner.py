@@ -0,0 +1,45 @@
+import json
+import logging
+import os
+import sys
+import time
+from audit_task import AuditTask
+from handlers.audit_handler import AuditHandler
+from handlers.check_handlers.multi_procedure_handler import set_step_workers
+from utils.result_blob import pack_tasks
+
+# Shipped to the target by the remote agent mode (utils/remote_agent.py) and run there as root:
+#   python3 agent_runner.py <job.json>
+# Every check runs locally on the target and the whole result comes back as one blob on stdout.
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python3 agent_runner.py <job.json>", file=sys.stderr)
+        sys.exit(2)
+
+    with open(sys.argv[1], 'r', encoding='utf-8') as f:
+        job = json.load(f)
+
+    # execute_script resolves functions/ against the working directory
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    logging.basicConfig(stream=sys.stderr, level=job.get("loglevel", "WARNING"), format="%(levelname)s - %(message)s")
+
+    tasks = [AuditTask.from_dict(t) for t in job.get("tasks", [])]
+    set_step_workers(job.get("parallel_steps", 0))
+
+    # handlers may print, only the result blob is allowed on the real stdout
+    result_stream, sys.stdout = sys.stdout, sys.stderr
+    started = time.time()
+    # a --budget run: checks not started before the remaining budget runs out come back NOT_RUN
+    budget = job.get("budget_seconds")
+    deadline = time.monotonic() + budget if budget is not None else None
+    completed = AuditHandler().run_audit(tasks, workers=job.get("workers", 1), deadline=deadline)
+    meta = {"agent_duration": round(time.time() - started, 3), "python": sys.version.split()[0]}
+
+    result_stream.write(pack_tasks(completed, meta) + "\n")
+    result_stream.flush()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+import argparse
+import getpass
+import json
+import os
+import socket
+import sys
+
+# Thin client for `main.py --daemon`. Standard library only, so a request costs
+# one process start and no imports of the auditor itself.
+
+DEFAULT_SOCKET = "/tmp/cis_audit.sock"
+
+
+def send_request(socket_path: str, request: dict):
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.connect(socket_path)
+    client.sendall((json.dumps(request) + "\n").encode('utf-8'))
+    client.shutdown(socket.SHUT_WR)
+    with client, client.makefile('r', encoding='utf-8') as stream:
+        for line in stream:
+            if line.strip():
+                yield line
+
+
+def print_event(event: dict):
+    kind = event.get("event")
+    if kind == "result":
+        host = f"{event['host']} " if event.get("host") else ""
+        print(f"[{event['status']}] {host}{event['id']} - {event['title']}")
+    elif kind == "start":
+        print(f"Session {event['session_id']}: {event['mode']} audit of {event['tasks']} checks")
+    elif kind == "end" and "counts" in event:
+        counts = event["counts"]
+        not_run = f", {counts['NOT_RUN']} Not run" if counts.get('NOT_RUN') else ""
+        print(f"RESULTS: {counts['PASS']} Passed, {counts['FAIL']} Failed, {counts['ERROR']} Errored{not_run}.")
+        print(f"Reports: {event['report_dir']} (session {event['session_id']})")
+    elif kind == "end":
+        for host in event["hosts"]:
+            print(f"  {host['host']}: {host['status']} ({host['PASS']} Pass, {host['FAIL']} Fail, {host['ERROR']} Error)")
+        print(f"Fleet reports: {event['report_dir']}")
+    elif kind == "error":
+        print(f"Error: {event['message']}", file=sys.stderr)
+    else:
+        print(json.dumps(event, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Send an audit request to a running auditor daemon (main.py --daemon). "
+                    "Any other arguments are the same as for main.py.",
+        allow_abbrev=False
+    )
+    parser.add_argument('--socket', default=DEFAULT_SOCKET, metavar='PATH', help=f"Daemon socket (default: {DEFAULT_SOCKET}).")
+    parser.add_argument('--ndjson', action='store_true', help="Print the raw result stream, one JSON object per line.")
+    parser.add_argument('--status', action='store_true', help="Show the benchmarks and connections the daemon keeps warm.")
+    parser.add_argument('--shutdown', action='store_true', help="Stop the daemon.")
+    options, audit_args = parser.parse_known_args()
+
+    if options.status or options.shutdown:
+        request = {"command": "status" if options.status else "shutdown"}
+    else:
+        request = {"command": "audit", "argv": audit_args, "cwd": os.getcwd()}
+        # the daemon cannot prompt, ask here and send the password with the request
+        for flag in ('-p', '--ask-pass'):
+            if flag in audit_args:
+                audit_args.remove(flag)
+                request["password"] = getpass.getpass("Enter SSH password: ")
+
+    failed = False
+    try:
+        for line in send_request(options.socket, request):
+            event = json.loads(line)
+            failed = failed or event.get("event") == "error"
+            if options.ndjson:
+                sys.stdout.write(line)
+                sys.stdout.flush()
+            else:
+                print_event(event)
+    except (FileNotFoundError, ConnectionRefusedError):
+        print(f"Error: no auditor daemon is listening on {options.socket} (start it with: main.py <benchmark> --daemon)", file=sys.stderr)
+        sys.exit(1)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        sys.exit(130)
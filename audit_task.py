@@ -1,5 +1,5 @@
-from dataclasses import dataclass, field
-from typing import List, Optional, Union, Dict
+from dataclasses import dataclass, field, fields, asdict
+from typing import List, Optional, Union, Dict, Any
 
 @dataclass
 class AuditTask:
@@ -23,4 +23,13 @@ class AuditTask:
 
     status: str = "PENDING"
     actual_output: Optional[str] = None
-    final_result: Optional[str] = None # PASS / FAIL / ERROR
\ No newline at end of file
+    final_result: Optional[str] = None # PASS / FAIL / ERROR
+    metrics: Optional[Dict[str, Any]] = None # timings and counters, see utils/metrics.py
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AuditTask":
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
@@ -1,23 +1,65 @@
 # In cis_auditor_v3/handlers/audit_handler.py
 import logging
 import importlib
-from typing import List
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
 from audit_task import AuditTask
 # We must import the Judge function here to be used by the handler
 from handlers.output_handler import process_with_algorithm
+from utils.execution_utils import submit_in_context
+from utils.metrics import measure, evidence_size
+from utils.budget import mark_not_run
+from utils.providers import snapshot_scope
+from utils.tracing import span
 from utils.color_utils import Colors
 
 class AuditHandler:
     def __init__(self):
         self.logger = logging.getLogger()
 
-    def run_audit(self, tasks: List[AuditTask], log_level: str = 'INFO') -> List[AuditTask]:
+    def run_audit(self, tasks: List[AuditTask], log_level: str = 'INFO', workers: int = 1,
+                  on_complete: Optional[Callable[[AuditTask], None]] = None, deadline: Optional[float] = None) -> List[AuditTask]:
+        # deadline (time.monotonic()) of a --budget run, checks not started by then are NOT_RUN
         self.logger.info(f"Starting audit with {len(tasks)} tasks.")
+        # fresh snapshots, those of an earlier run (daemon, watch mode) may be stale
+        with snapshot_scope(), span("run_audit", "run", tasks=len(tasks), workers=workers):
+            if workers > 1 and len(tasks) > 1:
+                # tasks are independent, the shared remote connection caps how many channels they really open
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    futures = [submit_in_context(pool, self.finish_task, task, on_complete, deadline) for task in tasks]
+                    try:
+                        for future in futures:
+                            future.result()
+                    except BaseException:
+                        # on Ctrl-C only the running checks finish (and reach on_complete), not the queue
+                        for future in futures:
+                            future.cancel()
+                        raise
+            else:
+                for task in tasks:
+                    self.finish_task(task, on_complete, deadline)
+
+        self.logger.info("AUDIT RUN HAS BEEN COMPLETED.")
+        return tasks
+
+    def finish_task(self, task: AuditTask, on_complete: Optional[Callable[[AuditTask], None]] = None,
+                    deadline: Optional[float] = None) -> AuditTask:
+        if deadline is not None and time.monotonic() >= deadline:
+            # the estimates were too low, not journaled so --resume still runs it
+            self.logger.info(f"Not running check: [{task.id}] - the time budget is used up")
+            return mark_not_run(task, "Not run: the --budget was used up before it started")
+        self.run_task(task)
+        # streamed as soon as the check is done, in completion order (called from the worker thread)
+        if on_complete:
+            on_complete(task)
+        return task
+
+    def run_task(self, task: AuditTask) -> AuditTask:
+        task.status = "RUNNING"
+        self.logger.info(f"Executing check: [{task.id}] {task.title}")
         
-        for task in tasks:
-            task.status = "RUNNING"
-            self.logger.info(f"Executing check: [{task.id}] {task.title}")
-            
+        with measure() as metrics, span(f"task {task.id}", "task", title=task.title, check_type=task.check_type):
             try:
                 if not task.check_type:
                     raise ValueError("Task has no 'check_type' defined. Please check CSV headers and data.")
@@ -34,24 +76,24 @@ class AuditHandler:
 
             except Exception as e:
                 task.final_result = {"overall_status": "ERROR", "type":"action_node", "details": {"error":f"Audit Handler Error: {e}"}}
-            
-            task.status = "COMPLETED"
-
+        
+        metrics.evidence_bytes = evidence_size(task.actual_output)
+        task.metrics = metrics.to_dict()
+        task.status = "COMPLETED"
 
-            # case_color = Colors.OKGREEN if simple_status == "PASS" else Colors.FAIL if simple_status == "FAIL" else Colors.WARNING
 
-            final_result_obj = task.final_result
-            if isinstance(final_result_obj, dict):
-                simple_status = final_result_obj.get("overall_status", "ERROR")
-            elif isinstance(final_result_obj, str):
-                simple_status = final_result_obj
-           
-            # Use the correct log level based on the final status.
-            if simple_status == "ERROR":
-                self.logger.error(f"Finished check: [{task.id}] - Result: [ERROR]")
-            else:
-                self.logger.info(f"Finished check: [{task.id}] - Result: [{simple_status}]")
+        # case_color = Colors.OKGREEN if simple_status == "PASS" else Colors.FAIL if simple_status == "FAIL" else Colors.WARNING
 
+        final_result_obj = task.final_result
+        if isinstance(final_result_obj, dict):
+            simple_status = final_result_obj.get("overall_status", "ERROR")
+        elif isinstance(final_result_obj, str):
+            simple_status = final_result_obj
+       
+        # Use the correct log level based on the final status.
+        if simple_status == "ERROR":
+            self.logger.error(f"Finished check: [{task.id}] - Result: [ERROR]")
+        else:
+            self.logger.info(f"Finished check: [{task.id}] - Result: [{simple_status}]")
 
-        self.logger.info("AUDIT RUN HAS BEEN COMPLETED.")
-        return tasks
\ No newline at end of file
+        return task
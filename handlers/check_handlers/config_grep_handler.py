@@ -0,0 +1,134 @@
+import functools
+import re
+from typing import Dict, List
+
+from utils.providers import snapshot
+
+# grep over config files without running grep. Target is the path arguments as they would
+# be written on the command line (globs and {a,b} braces are expanded), parameters are
+#   'pattern'      the regular expression
+#   'syntax'       'perl' (grep -P, default), 'extended' (grep -E) or 'basic' (plain grep)
+#   'ignore_case'  grep -i        'invert'      grep -v
+#   'recursive'    grep -r        'no_messages' grep -s
+# Files come from a per-run cache (utils/providers/config_files.py). The output is what grep
+# prints: "file:line" when more than one file is searched (grep -H), bare lines otherwise,
+# with grep's exit codes (0 match, 1 no match, 2 a file could not be read).
+
+# \h and \H are PCRE only
+PERL_CLASSES = {"h": ("[ \\t]", " \\t"), "H": ("[^ \\t]", None)}
+POSIX_CLASSES = {
+    "[:space:]": "\\s", "[:digit:]": "0-9", "[:alpha:]": "a-zA-Z", "[:alnum:]": "a-zA-Z0-9",
+    "[:upper:]": "A-Z", "[:lower:]": "a-z", "[:blank:]": " \\t", "[:punct:]": "!-/:-@\\[-`{-~",
+}
+# characters whose escaped and plain meanings swap between basic and extended syntax
+BASIC_SWAPPED = set("(){}|+?")
+
+
+def translate(pattern: str, syntax: str) -> str:
+    out: List[str] = []
+    in_class = False
+    index = 0
+    while index < len(pattern):
+        char = pattern[index]
+        if in_class:
+            posix = next((name for name in POSIX_CLASSES if pattern.startswith(name, index)), None)
+            if posix:
+                out.append(POSIX_CLASSES[posix])
+                index += len(posix)
+                continue
+            if char == '\\' and index + 1 < len(pattern):
+                following = pattern[index + 1]
+                if syntax == "perl" and following in PERL_CLASSES and PERL_CLASSES[following][1]:
+                    out.append(PERL_CLASSES[following][1])
+                elif syntax == "perl":
+                    out.append(char + following)
+                else:
+                    # a backslash is literal inside POSIX brackets
+                    out.append("\\\\")
+                    index += 1
+                    continue
+                index += 2
+                continue
+            if char == ']' and out and out[-1] not in ('[', '[^'):
+                in_class = False
+            out.append(char)
+            index += 1
+            continue
+
+        if char == '[':
+            in_class = True
+            if pattern.startswith('[^', index):
+                out.append('[^')
+                index += 2
+            else:
+                out.append('[')
+                index += 1
+            # a ']' right after the opening bracket is a literal
+            if index < len(pattern) and pattern[index] == ']':
+                out.append('\\]')
+                index += 1
+            continue
+        if char == '\\' and index + 1 < len(pattern):
+            following = pattern[index + 1]
+            if syntax == "perl" and following in PERL_CLASSES:
+                out.append(PERL_CLASSES[following][0])
+            elif syntax == "basic" and following in BASIC_SWAPPED:
+                out.append(following)
+            else:
+                out.append(char + following)
+            index += 2
+            continue
+        if syntax == "basic" and char in BASIC_SWAPPED:
+            out.append('\\' + char)
+        else:
+            out.append(char)
+        index += 1
+    return "".join(out)
+
+
+@functools.lru_cache(maxsize=512)
+def compile_pattern(pattern: str, syntax: str, ignore_case: bool) -> "re.Pattern":
+    return re.compile(translate(pattern, syntax), re.IGNORECASE if ignore_case else 0)
+
+
+def handle(target: str, params: dict) -> Dict[str, any]:
+    if not isinstance(params, dict) or not params.get('pattern'):
+        return {"stdout": "", "stderr": "ERROR: Missing 'pattern' in parameters", "exit_code": 127}
+    paths = (target or "").split()
+    if not paths:
+        return {"stdout": "", "stderr": "ERROR: config_grep needs at least one path as target", "exit_code": 127}
+
+    syntax = params.get('syntax', 'perl')
+    invert = bool(params.get('invert'))
+    recursive = bool(params.get('recursive'))
+    try:
+        regex = compile_pattern(params['pattern'], syntax, bool(params.get('ignore_case')))
+        files = snapshot("config_files")
+        entries = files.expand(paths, recursive)
+    except re.error as e:
+        return {"stdout": "", "stderr": f"ERROR: Invalid pattern '{params['pattern']}': {e}", "exit_code": 127}
+    except Exception as e:
+        return {"stdout": "", "stderr": f"ERROR: Could not read the files. Reason: {e}", "exit_code": 127}
+
+    # a file found by recursing into a directory operand is not one of the paths
+    with_filename = len(entries) > 1 or (recursive and bool(entries) and entries[0][0] not in paths)
+    lines, errors = [], []
+    for path, kind in entries:
+        if kind != "file":
+            reason = {"dir": "Is a directory", "missing": "No such file or directory"}.get(kind) or files.errors.get(path, "Permission denied")
+            errors.append(f"grep: {path}: {reason}")
+            continue
+        # like grep only '\n' ends a line, and a final newline does not start another
+        file_lines = files.text(path).split('\n')
+        if file_lines[-1] == '':
+            file_lines.pop()
+        for line in file_lines:
+            if bool(regex.search(line)) != invert:
+                lines.append(f"{path}:{line}" if with_filename else line)
+
+    # stripped like the output of command_output rows
+    return {
+        "stdout": "\n".join(lines).strip(),
+        "stderr": "" if params.get('no_messages') else "\n".join(errors),
+        "exit_code": 2 if errors else 0 if lines else 1
+    }
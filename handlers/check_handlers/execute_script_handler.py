@@ -1,6 +1,8 @@
 import os, subprocess
+import shlex
 from typing import List, Dict
 # from utils.decorators import debug_wrapper
+from utils import execution_utils
 from utils.execution_utils import execute_command, switch_mode, call_remo_runner
 import tempfile
 import uuid
@@ -25,6 +27,9 @@ def handle(script_name: str, params: List[str]) -> Dict[str, any]:  # Fixed retu
 
 def local_script(script_path: str, params: List[str]) -> Dict[str, any]:
     script_command = ['bash', script_path] + params
+    if execution_utils.local_shells and os.path.isfile(script_path):
+        # a worker is bash already, sourcing the script in its subshell saves starting another one
+        script_command = [f"set -- {shlex.join(params)}; . {shlex.quote(script_path)}"]
     
     try:
         result = execute_command(
@@ -51,8 +56,29 @@ def local_script(script_path: str, params: List[str]) -> Dict[str, any]:
             'exit_code': 1
         }
 
+def bundled_script(remote_script_path: str, params: List[str]) -> Dict[str, any]:
+    # already shipped once for the whole run, nothing to upload or remove per check
+    script_command = ['sudo', 'bash', remote_script_path] + params
+    result = execute_command(
+        script_command, 
+        capture_output=True, 
+        text=True, 
+        check=False
+    )
+    return {
+        'stdout': result.stdout.strip(),
+        'stderr': result.stderr.strip(),
+        'exit_code': result.returncode
+    }
+
 def remo_script(script_path: str, params: List[str]) -> Dict[str, any]:
     try:
+        executor = call_remo_runner()
+        bundle = getattr(executor, 'script_bundle', None)
+        remote_script_path = bundle.path_for(os.path.basename(script_path)) if bundle else None
+        if remote_script_path:
+            return bundled_script(remote_script_path, params)
+
         if not os.path.exists(script_path):
             return {
                 'stdout': '',
@@ -65,7 +91,6 @@ def remo_script(script_path: str, params: List[str]) -> Dict[str, any]:
         
         remote_script_path = f"/tmp/audit_script_{uuid.uuid4().hex[:8]}.sh"
         
-        executor = call_remo_runner()
         if not executor.upload_script_content(script_content, remote_script_path):
             return {
                 'stdout': '',
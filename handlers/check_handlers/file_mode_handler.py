@@ -0,0 +1,105 @@
+from typing import Dict, List
+
+from utils.providers import snapshot
+
+# Checks mode, owner and group of files from one batch of stat lookups per row
+# (utils/providers/file_stats.py) instead of a `stat -Lc` per file. Target is the paths as they
+# would be written on the command line (globs and {a,b} braces work), parameters are
+#   'mask'         permission bits that must not be set, '0177' means 0600 or more restrictive
+#   'max_mode'     instead of 'mask', the most permissive mode allowed, e.g. '0644'
+#   'group_masks'  a different mask for files owned by some groups, {'ssh_keys': '0137'}
+#   'owner' / 'group'  allowed owner and group names, a list or comma separated
+#   'optional'     a path that does not exist passes, like `[ -e path ] && stat ...`
+#   'recursive'    check the files below directories instead of the directories
+# stdout is the audit result the access scripts print, '** PASS **' or '** FAIL **' with the
+# offending and the correctly set files.
+
+
+def as_list(value) -> List[str]:
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(',')
+    return [str(item).strip() for item in value if str(item).strip()]
+
+
+def as_mode(value) -> int:
+    # '0644', '644' and 0o644 all mean the same mode
+    return value if isinstance(value, int) else int(str(value).strip(), 8)
+
+
+def file_mask(params: dict) -> int:
+    if 'mask' in params:
+        return as_mode(params['mask'])
+    if 'max_mode' in params:
+        return 0o7777 & ~as_mode(params['max_mode'])
+    raise ValueError("Missing 'mask' or 'max_mode' in parameters")
+
+
+def octal(mode: int) -> str:
+    return f"0{mode:o}" if mode else "0"
+
+
+def quoted(names: List[str]) -> str:
+    return " or ".join(f'"{name}"' for name in names)
+
+
+def check_entry(entry, mask: int, group_masks: Dict[str, int], owners: List[str], groups: List[str]) -> List[str]:
+    reasons = []
+    mask = group_masks.get(entry.group, mask)
+    if entry.mode & mask:
+        reasons.append(f"    Mode: \"{entry.octal_mode}\" should be mode: \"{octal(0o777 & ~mask)}\" or more restrictive")
+    if owners and entry.owner not in owners:
+        reasons.append(f"    Owned by: \"{entry.owner}\" should be owned by: {quoted(owners)}")
+    if groups and entry.group not in groups:
+        reasons.append(f"    Owned by group \"{entry.group}\" should be group owned by: {quoted(groups)}")
+    return reasons
+
+
+def audit_result(failures: List[str], correct: List[str]) -> str:
+    if not failures:
+        return "\n".join(["- Audit Result:", "  ** PASS **"] + (correct or ["  - No files found"]))
+    lines = ["- Audit Result:", "  ** FAIL **", " - Reason(s) for audit failure:"] + failures
+    if correct:
+        lines += ["", "- Correctly set:"] + correct
+    return "\n".join(lines)
+
+
+def handle(target: str, params: dict) -> Dict[str, any]:
+    paths = (target or "").split()
+    if not paths:
+        return {"stdout": "", "stderr": "ERROR: file_mode needs at least one path as target", "exit_code": 127}
+    if not isinstance(params, dict):
+        params = {}
+
+    try:
+        mask = file_mask(params)
+        group_masks = {group: as_mode(value) for group, value in (params.get('group_masks') or {}).items()}
+        entries = snapshot("file_stats").expand(paths, bool(params.get('recursive')))
+    except ValueError as e:
+        return {"stdout": "", "stderr": f"ERROR: Invalid file_mode parameters: {e}", "exit_code": 127}
+    except Exception as e:
+        return {"stdout": "", "stderr": f"ERROR: Could not stat the files. Reason: {e}", "exit_code": 127}
+
+    owners, groups = as_list(params.get('owner')), as_list(params.get('group'))
+    failures, correct = [], []
+    for entry in entries:
+        if entry.kind == "missing":
+            if not params.get('optional'):
+                failures.append(f"  - File: \"{entry.path}\" does not exist")
+            continue
+        if entry.kind == "error":
+            failures.append(f"  - File: \"{entry.path}\" could not be checked")
+            continue
+        reasons = check_entry(entry, mask, group_masks, owners, groups)
+        if reasons:
+            failures += [f"  - File: \"{entry.path}\""] + reasons
+        else:
+            correct += [f"  - File: \"{entry.path}\"",
+                        f"    Correct: mode: \"{entry.octal_mode}\", owner: \"{entry.owner}\" and group owner: \"{entry.group}\" configured"]
+
+    return {
+        "stdout": audit_result(failures, correct),
+        "stderr": "",
+        "exit_code": 1 if failures else 0
+    }
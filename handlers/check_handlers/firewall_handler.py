@@ -0,0 +1,132 @@
+from typing import Dict, List, Tuple
+
+from utils.providers import snapshot
+
+# Questions about the firewall answered from one ruleset snapshot per backend
+# (utils/providers/firewall.py). Target is the backend: nftables, iptables, ip6tables or ufw.
+# Parameters pick the question with 'query':
+#   status          the backend has a ruleset (nftables tables, iptables chains, ufw active)
+#   base_chains     base chains exist for 'hooks' (default input, forward, output)
+#   default_policy  the policy of 'chains' is one of 'allowed' (default drop, reject, deny,
+#                   and disabled for the ufw routed policy)
+#   loopback        the loopback 'rules' exist: accept_lo_in, accept_lo_out, drop_v4, drop_v6
+#   open_ports      every port listening on a non-loopback address has a rule
+# stdout starts with '** PASS **' or '** FAIL **' like the audit scripts, details follow.
+
+DEFAULT_CHAINS = {
+    "ufw": ["incoming", "outgoing", "routed"],
+}
+DEFAULT_LOOPBACK = {
+    "nftables": ["accept_lo_in", "drop_v4"],
+    "iptables": ["accept_lo_in", "accept_lo_out", "drop_v4"],
+    "ip6tables": ["accept_lo_in", "accept_lo_out", "drop_v6"],
+    # ufw accepts loopback in /etc/ufw/before.rules, which `ufw status` does not show
+    "ufw": ["drop_v4", "drop_v6"],
+}
+LOOPBACK_RULES = {
+    "accept_lo_in": ("input", "accept", "iif", ("lo",), "accepts traffic on lo"),
+    "accept_lo_out": ("output", "accept", "oif", ("lo",), "accepts traffic to lo"),
+    "drop_v4": ("input", "drop", "saddr", ("127.0.0.0/8",), "drops traffic from 127.0.0.0/8"),
+    # ip6tables-save writes the prefix length
+    "drop_v6": ("input", "drop", "saddr", ("::1", "::1/128"), "drops traffic from ::1"),
+}
+FAMILIES = {"iptables": "ipv4", "ip6tables": "ipv6"}
+
+
+def as_list(value, default: List[str]) -> List[str]:
+    if not value:
+        return default
+    if isinstance(value, str):
+        value = value.split(',')
+    return [str(item).strip().lower() for item in value if str(item).strip()]
+
+
+def check_status(ruleset, params) -> Tuple[bool, List[str]]:
+    if ruleset.backend == "ufw":
+        return ruleset.active, [f"Status: {'active' if ruleset.active else 'inactive'}"]
+    if ruleset.backend == "nftables":
+        return ruleset.active, ruleset.tables or ["no nftables tables"]
+    return ruleset.active, [f"{chain} policy {policy}" for chain, policy in ruleset.policies.items()]
+
+
+def check_base_chains(ruleset, params) -> Tuple[bool, List[str]]:
+    hooks = as_list(params.get('hooks') or params.get('hook'), ["input", "forward", "output"])
+    missing = [hook for hook in hooks if hook not in ruleset.policies]
+    details = [f"base chain for hook {hook} exists" for hook in hooks if hook not in missing]
+    details += [f"no base chain for hook {hook}" for hook in missing]
+    return not missing, details
+
+
+def check_default_policy(ruleset, params) -> Tuple[bool, List[str]]:
+    chains = as_list(params.get('chains') or params.get('chain'), DEFAULT_CHAINS.get(ruleset.backend, ["input", "forward", "output"]))
+    allowed = as_list(params.get('allowed'), ["drop", "reject", "deny"])
+    passed, details = True, []
+    for chain in chains:
+        policy = ruleset.policies.get(chain)
+        if policy is None:
+            passed = False
+            details.append(f"{chain}: no policy found")
+        elif policy in allowed or (policy == "disabled" and chain == "routed" and not params.get('allowed')):
+            details.append(f"{chain} policy {policy}")
+        else:
+            passed = False
+            details.append(f"{chain} policy {policy} (expected {' or '.join(allowed)})")
+    return passed, details
+
+
+def check_loopback(ruleset, params) -> Tuple[bool, List[str]]:
+    passed, details = True, []
+    for name in as_list(params.get('rules'), DEFAULT_LOOPBACK.get(ruleset.backend, [])):
+        if name not in LOOPBACK_RULES:
+            raise ValueError(f"Unknown loopback rule '{name}', expected one of {', '.join(LOOPBACK_RULES)}")
+        chain, verdict, field, values, description = LOOPBACK_RULES[name]
+        found = any(
+            rule.verdict == verdict and getattr(rule, field) in values
+            for rule in ruleset.chain_rules(chain)
+        )
+        passed = passed and found
+        details.append(f"{chain} {'has' if found else 'has no'} rule that {description}")
+    return passed, details
+
+
+def check_open_ports(ruleset, params) -> Tuple[bool, List[str]]:
+    family = params.get('family') or FAMILIES.get(ruleset.backend)
+    listeners = [listener for listener in snapshot("listening") if not family or listener.family == family or listener.address == '*']
+    rules = ruleset.chain_rules("input")
+    missing = sorted({str(listener) for listener in listeners
+                      if not any(rule.covers(listener.port, listener.protocol) for rule in rules)})
+    if missing:
+        return False, [f"no {ruleset.backend} rule for port {port}" for port in missing]
+    return True, [f"all {len(listeners)} open ports have a {ruleset.backend} rule"]
+
+
+QUERIES = {
+    "status": check_status,
+    "base_chains": check_base_chains,
+    "default_policy": check_default_policy,
+    "loopback": check_loopback,
+    "open_ports": check_open_ports,
+}
+
+
+def handle(target: str, params: dict) -> Dict[str, any]:
+    if not isinstance(params, dict):
+        params = {}
+    query = QUERIES.get(params.get('query', 'status'))
+    if query is None:
+        return {"stdout": "", "stderr": f"ERROR: Unknown firewall query '{params.get('query')}', expected one of {', '.join(QUERIES)}", "exit_code": 127}
+
+    try:
+        ruleset = snapshot("firewall", target)
+        if not ruleset.available:
+            # like a failing `nft list ruleset | grep ...`, the check fails instead of erroring
+            return {"stdout": f"** FAIL **\n- {target} ruleset could not be read", "stderr": ruleset.error, "exit_code": 1}
+        passed, details = query(ruleset, params)
+    except Exception as e:
+        return {"stdout": "", "stderr": f"ERROR: Could not evaluate the {target} firewall. Reason: {e}", "exit_code": 127}
+
+    return {
+        "stdout": "\n".join([f"** {'PASS' if passed else 'FAIL'} **"] + [f"- {line}" for line in details]),
+        "stderr": "",
+        "exit_code": 0 if passed else 1
+    }
@@ -0,0 +1,38 @@
+from typing import Dict, List
+
+from utils.providers import snapshot
+
+# Answers from the mount table snapshot (utils/providers/mounts.py) what
+# `findmnt -kn <target> | grep -v <option>` answers, without running anything per row:
+#   no option         -> the mounts on target, 'Not Null' means it is a separate partition
+#   option / options  -> the mounts on target missing any of them, 'Null' means all are set
+#   'mode': 'absent'  -> the mounts on target having any of them instead
+# exit_code is 1 when nothing is mounted on target, as with findmnt.
+
+def requested_options(params: dict) -> List[str]:
+    options = params.get('options') or params.get('option') or []
+    if isinstance(options, str):
+        options = options.split(',')
+    return [option.strip() for option in options if option and option.strip()]
+
+def handle(target: str, params: dict) -> Dict[str, any]:
+    if not target:
+        return {"stdout": "", "stderr": "ERROR: Mount point target cannot be empty.", "exit_code": 127}
+    if not isinstance(params, dict):
+        params = {}
+    options = requested_options(params)
+    absent = str(params.get('mode', 'present')).lower() == 'absent'
+
+    try:
+        mounted = snapshot("mounts").find(target)
+    except Exception as e:
+        return {"stdout": "", "stderr": f"ERROR: Could not read the mount table. Reason: {e}", "exit_code": 127}
+
+    mounts = mounted
+    if options:
+        mounts = [mount for mount in mounted if any(mount.has_option(option) == absent for option in options)]
+    return {
+        "stdout": "\n".join(mount.findmnt_line() for mount in mounts),
+        "stderr": "",
+        "exit_code": 0 if mounted else 1
+    }
@@ -1,8 +1,38 @@
+import contextvars
 import importlib
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Optional
+
+from handlers.output_handler import complex_check
+from utils.execution_utils import submit_in_context
+from utils.metrics import measure, evidence_size
+from utils.tracing import span
 
 # from utils.decorators import debug_wrapper
 
+# default pool size for running sibling steps concurrently, 0/1 keeps it serial
+step_workers: int = 0
+# per request value in the daemon, takes priority over the process wide one above
+step_workers_context: contextvars.ContextVar = contextvars.ContextVar('step_workers_context', default=None)
+
+def set_step_workers(workers: Optional[int]):
+    global step_workers
+    step_workers = workers or 0
+
+@contextmanager
+def bind_step_workers(workers: Optional[int]):
+    token = step_workers_context.set(workers or 0)
+    try:
+        yield
+    finally:
+        step_workers_context.reset(token)
+
+def current_step_workers() -> int:
+    workers = step_workers_context.get()
+    return step_workers if workers is None else workers
+
 def call_sub_handler(handler_name):
     try:
         if not handler_name: return None
@@ -13,44 +43,129 @@ def call_sub_handler(handler_name):
         logging.error(f"Could not load sub-handler for '{handler_name}': {e}")
         return None
 
-def collect_evidence(steps_array):
+def resolve_workers(node: dict, inherited: int) -> int:
+    # per node (or per row through the top-level params) 'parallel': true / <int> overrides the global option
+    parallel = node.get('parallel')
+    if parallel is None:
+        return inherited
+    if isinstance(parallel, bool) or str(parallel).lower() in ('true', 'false'):
+        enabled = parallel if isinstance(parallel, bool) else str(parallel).lower() == 'true'
+        workers = current_step_workers()
+        return (workers if workers > 1 else 4) if enabled else 0
+    try:
+        return int(parallel)
+    except (ValueError, TypeError):
+        return inherited
+
+def resolve_action(node: dict):
+    sub_handler_name = node.get('type_handler')
+    step_title = node.get('title', 'Untitled Step')
+
+    if not sub_handler_name:
+        error_message = f"Configuration Error: Missing 'type_handler' key in step titled: '{step_title}'"
+        return None, {"error": error_message}
+
+    sub_handle_func = call_sub_handler(sub_handler_name)
+    if not sub_handle_func:
+        error_message = f"Configuration Error: The specified 'type_handler' ('{sub_handler_name}') does not exist for step: '{step_title}'"
+        return None, {"error": error_message}
+    return sub_handle_func, None
+
+def run_action(node: dict, sub_handle_func) -> dict:
+    action_node = node.copy()
+    with measure() as metrics, span(action_node.get('title', 'Untitled Step'), "step", type_handler=action_node.get('type_handler')):
+        try:
+            raw_evidence = sub_handle_func(action_node.get('target'), action_node.get('parameters'))
+        except Exception as e:
+            raw_evidence = {"stderr": f"Exception during execution of '{action_node.get('type_handler')}': {e}", "exit_code": -1}
+
+    # only this step's evidence, the task total is measured on the whole tree
+    metrics.evidence_bytes = evidence_size(raw_evidence)
+    action_node['raw_evidence'] = raw_evidence
+    action_node['metrics'] = metrics.to_dict()
+    return action_node
+
+def logic_evidence_node(node: dict, processed_steps: list) -> dict:
+    # complex_check reads pass_stop_check from the evidence tree, groups must carry it like actions do
+    evidence_node = {"logic": node["logic"], "steps": processed_steps}
+    if 'pass_stop_check' in node:
+        evidence_node['pass_stop_check'] = node['pass_stop_check']
+    return evidence_node
+
+def stops_logic(logic: str, evidence_node: dict) -> bool:
+    # mirrors the break conditions of complex_check on the same node, so steps it would never read are not waited for
+    if logic != "OR" and str(evidence_node.get('pass_stop_check', 'false')).lower() != 'true':
+        return False
+    return complex_check(evidence_node).get("overall_status") == "PASS"
+
+def collect_parallel(steps_array, logic: str, workers: int):
+    funcs = []
+    for node in steps_array:
+        if "logic" in node:
+            funcs.append(None)
+            continue
+        func, error = resolve_action(node)
+        if error:
+            return None, error
+        funcs.append(func)
+
+    evidence_tree = []
+    with ThreadPoolExecutor(max_workers=min(workers, len(steps_array))) as pool:
+        futures = []
+        for node, func in zip(steps_array, funcs):
+            if func is None:
+                futures.append(submit_in_context(pool, collect_evidence, node.get("steps", []), node.get("logic", "AND"), resolve_workers(node, workers)))
+            else:
+                futures.append(submit_in_context(pool, run_action, node, func))
+
+        # results are consumed in declaration order so steps_results stays stable
+        for index, (node, future) in enumerate(zip(steps_array, futures)):
+            if "logic" in node:
+                processed_steps, error = future.result()
+                if error:
+                    for pending in futures[index + 1:]:
+                        pending.cancel()
+                    return None, error
+                evidence_node = logic_evidence_node(node, processed_steps)
+            else:
+                evidence_node = future.result()
+            evidence_tree.append(evidence_node)
+
+            if stops_logic(logic, evidence_node):
+                for pending in futures[index + 1:]:
+                    pending.cancel()
+                break
+
+    return evidence_tree, None
+
+def collect_evidence(steps_array, logic: str = "AND", workers: int = 0):
+    with span(f"logic {str(logic or 'AND').upper()}", "logic", steps=len(steps_array), workers=workers):
+        return collect_group(steps_array, logic, workers)
+
+def collect_group(steps_array, logic: str = "AND", workers: int = 0):
+    if workers > 1 and len(steps_array) > 1:
+        return collect_parallel(steps_array, str(logic or "AND").upper(), workers)
+
     evidence_tree = []
     for node in steps_array:
         if "logic" in node:
-            processed_steps, error = collect_evidence(node.get("steps", []))
+            processed_steps, error = collect_evidence(node.get("steps", []), node.get("logic", "AND"), resolve_workers(node, workers))
             if error:
                 return None, error
-            evidence_tree.append({"logic": node["logic"], "steps": processed_steps})
+            evidence_tree.append(logic_evidence_node(node, processed_steps))
         else:
-            action_node = node.copy()
-            sub_handler_name = action_node.get('type_handler')
-            
-            if not sub_handler_name:
-                step_title = action_node.get('title', 'Untitled Step')
-                error_message = f"Configuration Error: Missing 'type_handler' key in step titled: '{step_title}'"
-                return None, {"error": error_message}
-
-            sub_handle_func = call_sub_handler(sub_handler_name)
-            if not sub_handle_func:
-                step_title = action_node.get('title', 'Untitled Step')
-                error_message = f"Configuration Error: The specified 'type_handler' ('{sub_handler_name}') does not exist for step: '{step_title}'"
-                return None, {"error": error_message}
-
-            try:
-                raw_evidence = sub_handle_func(action_node.get('target'), action_node.get('parameters'))
-            except Exception as e:
-                raw_evidence = {"stderr": f"Exception during execution of '{sub_handler_name}': {e}", "exit_code": -1}
-            
-            action_node['raw_evidence'] = raw_evidence
-            evidence_tree.append(action_node)
+            sub_handle_func, error = resolve_action(node)
+            if error:
+                return None, error
+            evidence_tree.append(run_action(node, sub_handle_func))
 
     return evidence_tree, None
 # @debug_wrapper
 def handle(target: str, params: dict) -> dict:
     if not isinstance(params, dict) or "steps" not in params:
         return {"error": "Parameters for multi_procedure must contain a 'steps' array."}
-    
-    evidence_tree, error = collect_evidence(params.get("steps", []))
+
+    evidence_tree, error = collect_evidence(params.get("steps", []), params.get("logic") or "AND", resolve_workers(params, current_step_workers()))
     if error:
         return error
 
@@ -58,4 +173,4 @@ def handle(target: str, params: dict) -> dict:
         "is_unified_logic_payload": True,
         "logic": params.get("logic"),
         "evidence_tree": evidence_tree
-    }
\ No newline at end of file
+    }
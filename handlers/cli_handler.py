@@ -2,18 +2,35 @@ import argparse
 import getpass
 import sys
 import logging
-from handlers.log_handler import setup_logger
+import time
+from handlers.log_handler import setup_logger, flush_logs
 from utils.csv_parser import CISBenchmarkParser
 from handlers.audit_handler import AuditHandler
-from utils.remote_utils import RemoteExecutor
-from utils.execution_utils import set_remote_executor, cls_remo_runner
-from utils.report_generator import gsummary_report, gcsv_report, gorganized_reports
+from handlers.fleet_handler import FleetHandler, build_executor, audit_remote_host, load_inventory, write_fleet_session
+from handlers.daemon_handler import AuditDaemon, DEFAULT_SOCKET
+from handlers.watch_handler import WatchHandler
+from handlers.reevaluate_handler import ReevaluateHandler
+from handlers.merge_handler import MergeHandler
+from handlers.check_handlers.multi_procedure_handler import set_step_workers
+from utils.execution_utils import set_local_shells
+from utils.local_shell import LocalShellPool
+from utils.evidence_reporter import EvidenceReporter, is_fleet_evidence
+from utils.cost_history import record_costs
+from utils.journal import Journal, benchmark_meta, resume_order
+from utils.budget import parse_budget, plan_budget
+from utils.sharding import select_shard
+from utils.report_generator import gsummary_report, gcsv_report, gorganized_reports, gprom_report, gevidence_report, new_session_id
+from utils.tracing import enable_tracing, save_trace
 
 
 class CLIHandler:
     def __init__(self):
         self.logger = None
         self.args = None
+        self.session_id = None
+        self.started = None
+        self.journal = None
+        self.budget = None
     
     def flag_argument(self) -> argparse.ArgumentParser:
         parser = argparse.ArgumentParser(
@@ -26,19 +43,46 @@ class CLIHandler:
         parser.add_argument('--level', help="Run only checks for a specific level.")
         parser.add_argument('--domain', help="Run only checks for a specific domain.")
         parser.add_argument('--id', help="Run only a single check by its ID.")
+        parser.add_argument('--shard', metavar='I/N', help="Run only the I-th of N deterministic parts of the selected checks, e.g. 2/4; combine the sessions with --merge.")
+        parser.add_argument('--shard-costs', metavar='PATH', help="Balance the shards by the check durations recorded in PATH instead of by check ID; every shard must use the same unchanging copy of reports/cost_history.json, which every run updates.")
+        parser.add_argument('--merge', nargs='+', metavar='SESSION', help="Combine the sessions of a sharded audit into one session and write its reports, without running any checks.")
+        parser.add_argument('--budget', metavar='DURATION', help="Quick scan: run only the most important checks that fit in DURATION (e.g. 60s, 2m) by their recorded durations, skipping filesystem walks; the rest is reported as NOT_RUN.")
         parser.add_argument('--format', choices=['txt', 'csv'], default='txt', help="The output format for the report (default: txt).")
+        parser.add_argument('--prom-file', metavar='PATH', help="Also write the results as Prometheus metrics to PATH (e.g. into node_exporter's textfile collector directory), replaced atomically.")
         parser.add_argument('--loglevel', choices=['DEBUG', 'INFO'], default='INFO', help="Set the logging verbosity (default: INFO).")
+        parser.add_argument('--log-json', action='store_true', help="Write the log file in logs/ as JSON lines (.jsonl) for log shippers instead of plain text.")
         parser.add_argument('-A', '--show-all', action='store_true', help="Show details for all checks in console output, including PASS results (default: only show FAIL/ERROR).")
+        parser.add_argument('--workers', type=int, default=1, metavar='N', help="Run up to N checks at the same time (default: 1).")
+        parser.add_argument('--parallel-steps', type=int, default=0, metavar='N', help="Run sibling steps of multi_procedure logic groups concurrently on a pool of N workers (default: serial).")
+        parser.add_argument('--local-shells', type=int, default=0, metavar='N', help="Run local commands on N pre-started bash workers instead of starting a shell per command (default: off, at least --workers are started).")
+        parser.add_argument('--local-shell-recycle', type=int, default=200, metavar='N', help="Replace a local bash worker after N commands (default: 200).")
+        parser.add_argument('--trace', metavar='FILE', help="Write a Chrome trace-event JSON of the run (run, tasks, logic groups, steps, commands per thread) for chrome://tracing or ui.perfetto.dev.")
+        parser.add_argument('--daemon', action='store_true', help="Stay running and serve audit requests from audit_client.py over a Unix socket, keeping the benchmark, handlers and SSH connections warm.")
+        parser.add_argument('--watch', action='store_true', help="Run the checks once, then keep watching the files they read and re-run only the affected checks on change, printing NDJSON results and status changes (local only).")
+        parser.add_argument('--reevaluate', metavar='SESSION', help="Judge the evidence stored by an earlier run (single host or fleet) again with this benchmark file, without executing any commands.")
+        parser.add_argument('--resume', metavar='SESSION', help="Continue an interrupted local or --ssh-host run: keep the checks its journal recorded as finished, run only the rest and write the reports of the whole session.")
+        parser.add_argument('--socket', default=DEFAULT_SOCKET, metavar='PATH', help=f"Unix socket the daemon listens on (default: {DEFAULT_SOCKET}).")
 
         # SSH arguments
         ssh_group = parser.add_argument_group('SSH Options', 'Arguments for remote auditing')
         ssh_group.add_argument('--ssh-host', help='The remote host IP address or hostname.')
         ssh_group.add_argument('-u', '--username', help='The SSH username for the remote host.')
         ssh_group.add_argument('--port', type=int, default=22, help='The SSH port (default: 22).')
+        ssh_group.add_argument('--max-channels', type=int, default=8, metavar='N', help="Maximum concurrent SSH channels on the one connection, keep it at or below the server's MaxSessions (default: 8).")
+        ssh_group.add_argument('--agent', action='store_true', help='Ship the auditor to the remote host, run every check there and fetch one result document (needs python3 on the target).')
+        ssh_group.add_argument('--persistent-shell', action='store_true', help='Run remote commands through one long-lived sudo shell per connection instead of a new channel and sudo call per command.')
+        ssh_group.add_argument('--batch-commands', type=int, default=0, metavar='N', help='Send up to N commands issued concurrently by --workers/--parallel-steps to the host as one framed script (default: off).')
+        ssh_group.add_argument('--batch-window', type=float, default=5, metavar='MS', help='How long a batch waits for more commands before it is sent, in milliseconds (default: 5).')
+        ssh_group.add_argument('--keepalive', type=int, default=30, metavar='SECONDS', help='Send an SSH keepalive after this many idle seconds, 0 disables it (default: 30).')
+        ssh_group.add_argument('--retries', type=int, default=2, metavar='N', help='Reconnect and re-send a command up to N times when the connection drops while it runs (default: 2).')
+        ssh_group.add_argument('--inventory', metavar='HOSTS_FILE', help='Audit every host listed in a YAML (or .json) inventory instead of a single --ssh-host.')
+        ssh_group.add_argument('--fleet-concurrency', type=int, default=10, metavar='N', help='Number of hosts audited (and connected) at the same time in inventory mode (default: 10).')
         auth_group = ssh_group.add_mutually_exclusive_group()
         auth_group.add_argument('-p', '--ask-pass', action='store_true', help='Prompt for SSH password interactively.')
         auth_group.add_argument('-P', '--password', help='Provide the SSH password directly on the command line (less secure).')
         auth_group.add_argument('-i', '--identity-file', help='Path to the SSH private key file for authentication.')
+        # filled in by select_shard, stored with the evidence for --merge
+        parser.set_defaults(shard_meta={})
         
         return parser
     
@@ -48,10 +92,13 @@ class CLIHandler:
         return self.args
     
     def setup_logging(self):
-        self.logger = setup_logger(self.args.loglevel)
+        self.logger = setup_logger(self.args.loglevel, json_log=self.args.log_json)
         return self.logger
     
     def validate_remote_args(self):
+        if self.args.ssh_host and self.args.inventory:
+            print("Error: --ssh-host and --inventory cannot be used together.", file=sys.stderr)
+            sys.exit(1)
         if self.args.ssh_host and not self.args.username:
             print("Error: --username is required for SSH connections.", file=sys.stderr)
             sys.exit(1)
@@ -59,7 +106,8 @@ class CLIHandler:
     def get_ssh_password(self) -> str:
         password = self.args.password
         if self.args.ask_pass:
-            password = getpass.getpass(f"Enter password for {self.args.username}@{self.args.ssh_host}: ")
+            target = self.args.ssh_host or "inventory hosts"
+            password = getpass.getpass(f"Enter password for {self.args.username}@{target}: ")
         return password
     
     def parse_tasks(self):
@@ -71,18 +119,66 @@ class CLIHandler:
                 domain=self.args.domain,
                 task_id=self.args.id
             )
+            tasks_to_run, self.args.shard_meta = select_shard(tasks_to_run, self.args.shard, self.args.shard_costs)
             return tasks_to_run
         except Exception as e:
             self.logger.critical(f"Failed to parse benchmark file. Error: {e}")
             return None
     
-    def generate_reports(self, completed_tasks):
-        gorganized_reports(completed_tasks, log_level=self.args.loglevel)
+    def generate_reports(self, completed_tasks, connection_stats=None):
+        # the console summary should not interleave with log lines still in the queue
+        flush_logs()
+        gorganized_reports(completed_tasks, log_level=self.args.loglevel, session_id=self.session_id, connection_stats=connection_stats)
         
-        gsummary_report(completed_tasks, log_level=self.args.loglevel, show_all=self.args.show_all)
+        gsummary_report(completed_tasks, log_level=self.args.loglevel, show_all=self.args.show_all, session_id=self.session_id)
         
         if self.args.format == 'csv':
-            gcsv_report(completed_tasks)
+            gcsv_report(completed_tasks, session_id=self.session_id)
+        
+        gevidence_report(completed_tasks, session_id=self.session_id,
+                         meta={"benchmark_file": self.args.benchmark_file, "host": self.args.ssh_host, **self.args.shard_meta})
+        
+        if self.args.prom_file:
+            gprom_report(completed_tasks, self.args.prom_file, session_id=self.session_id, host=self.args.ssh_host,
+                         run_duration=time.time() - self.started, connection_stats=connection_stats)
+    
+    def start_journal(self, tasks_to_run):
+        # every finished check is journaled, --resume takes the finished ones from an earlier journal
+        finished = []
+        benchmark = benchmark_meta(self.args.benchmark_file)
+        if self.args.resume:
+            try:
+                finished, meta = Journal.load(self.session_id)
+            except Exception as e:
+                self.logger.critical(f"Failed to load the journal. Error: {e}")
+                return None, []
+            if meta.get("host") != self.args.ssh_host:
+                self.logger.critical(f"Session {self.session_id} audited {meta.get('host') or 'the local machine'}, it cannot be resumed on {self.args.ssh_host or 'the local machine'}.")
+                return None, []
+            if meta.get("benchmark_file") != benchmark["benchmark_file"]:
+                self.logger.critical(f"Session {self.session_id} ran '{meta.get('benchmark_file')}', it cannot be resumed with '{self.args.benchmark_file}'.")
+                return None, []
+            if meta.get("benchmark_digest") != benchmark["benchmark_digest"]:
+                # results of rows that changed since would be mixed into the reports
+                self.logger.critical(f"'{self.args.benchmark_file}' changed since session {self.session_id} started, it cannot be resumed. Run the audit again.")
+                return None, []
+            selected = {task.id for task in tasks_to_run}
+            finished = [task for task in finished if task.id in selected]
+        
+        done = {task.id for task in finished}
+        remaining = [task for task in tasks_to_run if task.id not in done]
+        if self.args.resume:
+            self.logger.info(f"Resuming session {self.session_id}: {len(finished)} checks already finished, {len(remaining)} left to run.")
+        self.journal = Journal(self.session_id, meta={**benchmark, "host": self.args.ssh_host})
+        return remaining, finished
+    
+    def apply_budget(self, tasks_to_run):
+        if not self.budget:
+            return tasks_to_run, [], None
+        chosen, not_run = plan_budget(tasks_to_run, self.budget, self.args.workers)
+        self.logger.info(f"Budget of {self.budget:g}s: running {len(chosen)} checks, {len(not_run)} are reported as NOT_RUN.")
+        # estimates can be off, nothing new starts once the budget is spent
+        return chosen, not_run, time.monotonic() + self.budget
     
     def run_remote_audit(self):
         self.validate_remote_args()
@@ -94,35 +190,56 @@ class CLIHandler:
         tasks_to_run = self.parse_tasks()
         if tasks_to_run is None:
             return
+        remaining, finished = self.start_journal(tasks_to_run)
+        if remaining is None:
+            return
+        remaining, not_run, deadline = self.apply_budget(remaining)
 
         # Set up remote execution
-        executor = RemoteExecutor(
-            self.args.ssh_host, 
-            self.args.port, 
-            self.args.username, 
-            password=password, 
-            key_path=self.args.identity_file
-        )
+        executor = build_executor(self.args, self.args.ssh_host, password=password, key_path=self.args.identity_file)
         
         if not executor.connect():
             self.logger.critical("Failed to connect to remote host. Exiting.")
             executor.disconnect()
+            self.journal.close()
             return 
         
         try:
-            set_remote_executor(executor)
-            
-            audit_handler = AuditHandler()
-            completed_tasks = audit_handler.run_audit(tasks_to_run, log_level=self.args.loglevel)
-            
+            completed_tasks = audit_remote_host(executor, remaining, self.args, on_complete=self.journal.write, deadline=deadline)
         finally:
-            # Always clean up
-            cls_remo_runner()
-            executor.disconnect()
+            self.journal.close()
+        record_costs(completed_tasks)
+        completed_tasks = resume_order(tasks_to_run, finished + not_run, completed_tasks)
+        
+        connection_stats = executor.connection_stats()
+        if connection_stats["reconnects"] or connection_stats["retries"]:
+            self.logger.warning(f"Connection to {self.args.ssh_host} was re-established {connection_stats['reconnects']} times, {connection_stats['retries']} commands were retried.")
+        lost = [task for task in completed_tasks if (task.metrics or {}).get("connection_errors")]
+        if lost:
+            # Journal.write left them out, so a resume runs them again
+            self.logger.warning(f"{len(lost)} checks lost the connection to {self.args.ssh_host} and are reported as ERROR, "
+                                f"run them again with --resume {self.session_id}")
             
-        self.generate_reports(completed_tasks)
+        self.generate_reports(completed_tasks, connection_stats)
         self.logger.info("Remote CIS Auditor run finished.")
     
+    def run_fleet_audit(self):
+        self.validate_remote_args()
+        try:
+            inventory = load_inventory(self.args.inventory)
+        except Exception as e:
+            self.logger.critical(f"Failed to load inventory. Error: {e}")
+            return
+        password = self.get_ssh_password()
+
+        tasks_to_run = self.parse_tasks()
+        if tasks_to_run is None:
+            return
+
+        fleet_handler = FleetHandler(self.args, password=password, session_id=self.session_id)
+        fleet_handler.run(inventory, tasks_to_run)
+        self.logger.info("Fleet CIS Auditor run finished.")
+    
     def run_local_audit(self):
         self.logger.info(f"Starting CIS Auditor with file: '{self.args.benchmark_file}'")
         
@@ -130,17 +247,143 @@ class CLIHandler:
         if tasks_to_run is None:
             return
 
+        remaining, finished = self.start_journal(tasks_to_run)
+        if remaining is None:
+            return
+        remaining, not_run, deadline = self.apply_budget(remaining)
+
         audit_handler = AuditHandler()
-        completed_tasks = audit_handler.run_audit(tasks_to_run, log_level=self.args.loglevel)
+        try:
+            completed_tasks = audit_handler.run_audit(remaining, log_level=self.args.loglevel, workers=self.args.workers,
+                                                      on_complete=self.journal.write, deadline=deadline)
+        finally:
+            self.journal.close()
+        record_costs(completed_tasks)
+        completed_tasks = resume_order(tasks_to_run, finished + not_run, completed_tasks)
         
         self.generate_reports(completed_tasks)
         self.logger.info("CIS Auditor run finished.")
     
+    def run_reevaluate(self):
+        if self.args.ssh_host or self.args.inventory or self.args.watch or self.args.daemon:
+            print("Error: --reevaluate does not connect to hosts or run checks, it cannot be combined with --ssh-host, --inventory, --watch or --daemon.", file=sys.stderr)
+            sys.exit(1)
+        
+        evidence_paths = EvidenceReporter.find(self.args.reevaluate)
+        if not evidence_paths:
+            self.logger.critical(f"No stored evidence found for session '{self.args.reevaluate}'.")
+            return
+        
+        tasks_to_run = self.parse_tasks()
+        if tasks_to_run is None:
+            return
+        
+        self.logger.info(f"Re-evaluating session {self.args.reevaluate} with '{self.args.benchmark_file}' as session {self.session_id}")
+        reevaluate_handler = ReevaluateHandler(tasks_to_run)
+        if len(evidence_paths) == 1 and not is_fleet_evidence(evidence_paths[0]):
+            stored_tasks, meta = EvidenceReporter.load(evidence_paths[0])
+            completed_tasks = reevaluate_handler.rescore(stored_tasks, meta.get("host") or "")
+            self.generate_reports(completed_tasks)
+        else:
+            reevaluate_handler.rescore_fleet(evidence_paths, self.args, self.session_id)
+        self.logger.info("Re-evaluation finished.")
+    
+    def run_merge(self):
+        if self.args.ssh_host or self.args.inventory or self.args.watch or self.args.daemon or self.args.reevaluate:
+            print("Error: --merge only combines stored sessions, it cannot be combined with --ssh-host, --inventory, --watch, --daemon or --reevaluate.", file=sys.stderr)
+            sys.exit(1)
+        
+        try:
+            benchmark_tasks = CISBenchmarkParser(self.args.benchmark_file).filter_csv(
+                level=self.args.level,
+                profile=self.args.profile,
+                domain=self.args.domain,
+                task_id=self.args.id
+            )
+            merge_handler = MergeHandler(benchmark_tasks)
+            fleet, hosts = merge_handler.load_sessions(self.args.merge)
+        except Exception as e:
+            self.logger.critical(f"Failed to merge sessions. Error: {e}")
+            return
+        
+        self.logger.info(f"Merging sessions {', '.join(self.args.merge)} into session {self.session_id}")
+        if fleet:
+            write_fleet_session([(label, folder, merge_handler.combine(tasks, label), {"merged_from": self.args.merge})
+                                 for folder, (label, tasks) in hosts.items()], self.args, self.session_id)
+        else:
+            label, tasks = hosts[""]
+            self.generate_reports(merge_handler.combine(tasks, label))
+        self.logger.info("Merge finished.")
+    
+    def run_watch_audit(self):
+        if self.args.ssh_host or self.args.inventory or self.args.daemon:
+            print("Error: --watch only works for local audits.", file=sys.stderr)
+            sys.exit(1)
+        
+        tasks_to_run = self.parse_tasks()
+        if tasks_to_run is None:
+            return
+        
+        # stdout carries only the NDJSON stream, anything a handler prints goes to stderr
+        stream, sys.stdout = sys.stdout, sys.stderr
+        try:
+            WatchHandler(tasks_to_run, stream, workers=self.args.workers, log_level=self.args.loglevel).run()
+        finally:
+            sys.stdout = stream
+    
+    def run_daemon(self):
+        daemon = AuditDaemon(self.flag_argument(), self.args.socket)
+        daemon.serve_forever(preload_benchmark=self.args.benchmark_file)
+    
     def run(self, args=None):
         self.parse_arguments(args)
         self.setup_logging()
+        set_step_workers(self.args.parallel_steps)
+        if self.args.resume and (self.args.merge or self.args.reevaluate or self.args.watch or self.args.daemon or self.args.inventory):
+            print("Error: --resume continues a local or --ssh-host run, it cannot be combined with --merge, --reevaluate, --watch, --daemon or --inventory.", file=sys.stderr)
+            sys.exit(1)
+        if self.args.budget:
+            if self.args.merge or self.args.reevaluate or self.args.watch or self.args.daemon or self.args.inventory:
+                print("Error: --budget limits a local or --ssh-host run, it cannot be combined with --merge, --reevaluate, --watch, --daemon or --inventory.", file=sys.stderr)
+                sys.exit(1)
+            try:
+                self.budget = parse_budget(self.args.budget)
+            except ValueError as e:
+                print(f"Error: {e}", file=sys.stderr)
+                sys.exit(1)
+        # a resumed run keeps its session, its reports are those of the whole audit
+        self.session_id = self.args.resume or new_session_id()
+        self.started = time.time()
         
-        if self.args.ssh_host:
-            self.run_remote_audit()
-        else:
-            self.run_local_audit()
+        if self.args.trace:
+            enable_tracing()
+        local_shells = None
+        if self.args.local_shells and not self.args.ssh_host and not self.args.inventory:
+            local_shells = LocalShellPool(max(self.args.workers, self.args.local_shells), self.args.local_shell_recycle)
+            set_local_shells(local_shells)
+        try:
+            if self.args.merge:
+                self.run_merge()
+            elif self.args.reevaluate:
+                self.run_reevaluate()
+            elif self.args.watch:
+                self.run_watch_audit()
+            elif self.args.daemon:
+                self.run_daemon()
+            elif self.args.inventory:
+                self.run_fleet_audit()
+            elif self.args.ssh_host:
+                self.run_remote_audit()
+            else:
+                self.run_local_audit()
+        except KeyboardInterrupt:
+            if self.journal:
+                print(f"\nFinished checks are kept in '{self.journal.path}', continue with --resume {self.session_id}", file=sys.stderr)
+            raise
+        finally:
+            if local_shells:
+                set_local_shells(None)
+                local_shells.close()
+            if self.args.trace:
+                save_trace(self.args.trace)
+                self.logger.info(f"Trace written to '{self.args.trace}'")
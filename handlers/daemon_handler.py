@@ -0,0 +1,285 @@
+import contextlib
+import copy
+import importlib
+import io
+import json
+import logging
+import os
+import pkgutil
+import socketserver
+import stat
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+from audit_task import AuditTask
+from handlers.audit_handler import AuditHandler
+from handlers.fleet_handler import ExecutorPool, FleetHandler, audit_remote_host, load_inventory
+from handlers.check_handlers.multi_procedure_handler import bind_step_workers
+from handlers.reevaluate_handler import ReevaluateHandler
+from utils.budget import NOT_RUN, parse_budget, plan_budget
+from utils.cost_history import record_costs
+from utils.csv_parser import CISBenchmarkParser
+from utils.evidence_reporter import EvidenceReporter, is_fleet_evidence
+from utils.journal import resume_order
+from utils.ndjson_writer import NDJSONWriter, task_record
+from utils.report_formatters import TaskFormatter
+from utils.sharding import select_shard
+from utils.report_generator import gsummary_report, gcsv_report, gorganized_reports, gprom_report, gevidence_report, new_session_id
+
+DEFAULT_SOCKET = "/tmp/cis_audit.sock"
+
+
+def preload_handlers():
+    # the first check of every type would otherwise pay for the import
+    import handlers.check_handlers as package
+    for module in pkgutil.iter_modules(package.__path__):
+        if module.name.endswith('_handler'):
+            importlib.import_module(f"{package.__name__}.{module.name}")
+
+
+class BenchmarkCache:
+    # parsed benchmarks stay in memory until the CSV changes on disk
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.benchmarks = {}
+
+    def load(self, path: str) -> List[AuditTask]:
+        path = os.path.abspath(path)
+        mtime = os.stat(path).st_mtime_ns
+        with self.lock:
+            cached = self.benchmarks.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        tasks = CISBenchmarkParser(path).parse_csv()
+        with self.lock:
+            self.benchmarks[path] = (mtime, tasks)
+        logging.getLogger().info(f"Loaded {len(tasks)} checks from '{path}'")
+        return tasks
+
+    def select(self, args) -> List[AuditTask]:
+        tasks = CISBenchmarkParser.filter_tasks(
+            self.load(args.benchmark_file),
+            level=args.level,
+            profile=args.profile,
+            domain=args.domain,
+            task_id=args.id
+        )
+        # results are written onto the tasks, the cached copy must stay clean
+        tasks, args.shard_meta = select_shard(tasks, args.shard, args.shard_costs)
+        return copy.deepcopy(tasks)
+
+
+class AuditRequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        writer = NDJSONWriter(self.connection.makefile('w', encoding='utf-8'))
+        client_gone = threading.Event()
+
+        def emit(record: Dict[str, Any]):
+            if client_gone.is_set():
+                return
+            try:
+                writer.write(record)
+            except OSError:
+                # the audit still finishes and writes its reports
+                client_gone.set()
+
+        try:
+            request = json.loads(self.rfile.readline() or b"{}")
+            self.server.audit_daemon.serve_request(request, emit)
+        except Exception as e:
+            logging.getLogger().error(f"Daemon request failed: {e}")
+            emit({"event": "error", "message": str(e)})
+
+
+class AuditDaemon:
+    def __init__(self, parser, socket_path: str = DEFAULT_SOCKET):
+        self.parser = parser
+        self.socket_path = socket_path
+        self.benchmarks = BenchmarkCache()
+        self.executors = ExecutorPool()
+        self.server = None
+        self.logger = logging.getLogger()
+
+    def serve_forever(self, preload_benchmark: str = None):
+        if os.path.exists(self.socket_path):
+            if not stat.S_ISSOCK(os.stat(self.socket_path).st_mode):
+                raise FileExistsError(f"'{self.socket_path}' exists and is not a socket")
+            os.unlink(self.socket_path)
+
+        preload_handlers()
+        if preload_benchmark:
+            self.benchmarks.load(preload_benchmark)
+
+        self.server = socketserver.ThreadingUnixStreamServer(self.socket_path, AuditRequestHandler)
+        self.server.daemon_threads = True
+        self.server.audit_daemon = self
+        # requests can carry SSH passwords
+        os.chmod(self.socket_path, 0o600)
+
+        self.logger.info(f"Auditor daemon listening on {self.socket_path}")
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            self.executors.close()
+            self.logger.info("Auditor daemon stopped.")
+
+    def parse_request_args(self, request: Dict[str, Any]):
+        stderr = io.StringIO()
+        try:
+            with contextlib.redirect_stderr(stderr):
+                args = self.parser.parse_args(request.get("argv") or [])
+        except SystemExit:
+            raise ValueError(f"Invalid audit arguments: {stderr.getvalue().strip()}")
+
+        # paths are relative to where the client was started, not to the daemon
+        cwd = request.get("cwd") or os.getcwd()
+        for name in ('benchmark_file', 'inventory', 'identity_file', 'prom_file', 'shard_costs'):
+            value = getattr(args, name, None)
+            if value:
+                setattr(args, name, os.path.join(cwd, os.path.expanduser(value)))
+
+        # the daemon serves local, --ssh-host and --inventory audits, nothing else may be silently ignored
+        for flag in ('resume', 'merge', 'watch', 'daemon'):
+            if getattr(args, flag, None):
+                raise ValueError(f"--{flag} is not served by the daemon, run it with main.py.")
+        if args.budget and args.inventory:
+            raise ValueError("--budget limits a local or --ssh-host run, it cannot be combined with --inventory.")
+        if args.reevaluate and (args.ssh_host or args.inventory or args.budget):
+            raise ValueError("--reevaluate does not connect to hosts or run checks, it cannot be combined with --ssh-host, --inventory or --budget.")
+        return args
+
+    def serve_request(self, request: Dict[str, Any], emit: Callable[[Dict[str, Any]], None]):
+        command = request.get("command", "audit")
+        if command == "status":
+            emit({
+                "event": "status",
+                "benchmarks": sorted(self.benchmarks.benchmarks),
+                "connections": [f"{key[2]}@{key[0]}:{key[1]}" for key in self.executors.executors]
+            })
+            return
+        if command == "shutdown":
+            emit({"event": "shutdown"})
+            # shutdown() waits for serve_forever, which runs on another thread
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+            return
+        if command != "audit":
+            raise ValueError(f"Unknown daemon command: '{command}'")
+
+        args = self.parse_request_args(request)
+        budget = parse_budget(args.budget) if args.budget else None
+        password = request.get("password") or args.password
+        session_id = new_session_id()
+        args.started = time.time()
+        tasks = self.benchmarks.select(args)
+        selected, not_run, deadline = tasks, [], None
+        if budget:
+            selected, not_run = plan_budget(tasks, budget, args.workers)
+            # estimates can be off, nothing new starts once the budget is spent
+            deadline = time.monotonic() + budget
+
+        mode = "reevaluate" if args.reevaluate else "fleet" if args.inventory else "remote" if args.ssh_host else "local"
+        emit({"event": "start", "session_id": session_id, "mode": mode, "tasks": len(tasks)})
+        self.logger.info(f"Daemon request {session_id}: {mode} audit of {len(tasks)} checks")
+        if args.reevaluate:
+            self.run_reevaluate(args, session_id, tasks, emit)
+            return
+
+        # per request, concurrent requests must not change each other's step parallelism
+        with bind_step_workers(args.parallel_steps):
+            if args.inventory:
+                self.run_fleet(args, password, session_id, tasks, emit)
+                return
+            if args.ssh_host:
+                completed_tasks, connection_stats = self.run_remote(args, password, selected, emit, deadline)
+            else:
+                completed_tasks = AuditHandler().run_audit(
+                    selected, log_level=args.loglevel, workers=args.workers,
+                    on_complete=lambda task: emit({"event": "result", **task_record(task)}), deadline=deadline
+                )
+                connection_stats = None
+        record_costs(completed_tasks)
+
+        # checks left out by --budget are reported too, in benchmark order
+        completed_tasks = resume_order(tasks, not_run, completed_tasks)
+        host = {"host": args.ssh_host} if args.ssh_host else {}
+        for task in completed_tasks:
+            if task.status == NOT_RUN:
+                emit({"event": "result", **task_record(task, **host)})
+        self.finish(args, session_id, completed_tasks, emit, connection_stats)
+
+    def run_remote(self, args, password: str, tasks: List[AuditTask], emit, deadline: float = None):
+        if not args.username:
+            raise ValueError("--username is required for SSH connections.")
+
+        with self.executors.lease(args, args.ssh_host, password=password, key_path=args.identity_file) as executor:
+            if not executor.transport_active() and not executor.connect():
+                executor.disconnect()
+                raise ConnectionError(f"Failed to connect to {args.ssh_host}")
+
+            completed_tasks = audit_remote_host(
+                executor, tasks, args, keep_connection=True,
+                on_complete=lambda task: emit({"event": "result", **task_record(task, host=args.ssh_host)}), deadline=deadline
+            )
+            return completed_tasks, executor.connection_stats()
+
+    def run_reevaluate(self, args, session_id: str, tasks: List[AuditTask], emit):
+        # judged again from the stored evidence, no command runs
+        evidence_paths = EvidenceReporter.find(args.reevaluate)
+        if not evidence_paths:
+            raise ValueError(f"No stored evidence found for session '{args.reevaluate}'.")
+
+        reevaluate_handler = ReevaluateHandler(tasks)
+        if len(evidence_paths) == 1 and not is_fleet_evidence(evidence_paths[0]):
+            stored_tasks, meta = EvidenceReporter.load(evidence_paths[0])
+            completed_tasks = reevaluate_handler.rescore(stored_tasks, meta.get("host") or "")
+            host = {"host": meta["host"]} if meta.get("host") else {}
+            for task in completed_tasks:
+                emit({"event": "result", **task_record(task, **host)})
+            self.finish(args, session_id, completed_tasks, emit)
+            return
+
+        host_results = reevaluate_handler.rescore_fleet(evidence_paths, args, session_id)
+        emit({
+            "event": "end",
+            "session_id": session_id,
+            "hosts": host_results,
+            "report_dir": os.path.abspath(os.path.join("reports", f"fleet_{session_id}"))
+        })
+
+    def run_fleet(self, args, password: str, session_id: str, tasks: List[AuditTask], emit):
+        inventory = load_inventory(args.inventory)
+        fleet_handler = FleetHandler(
+            args, password=password, session_id=session_id, executor_pool=self.executors,
+            on_complete=lambda task, host: emit({"event": "result", **task_record(task, host=host)})
+        )
+        host_results = fleet_handler.run(inventory, tasks)
+        emit({
+            "event": "end",
+            "session_id": session_id,
+            "hosts": host_results,
+            "report_dir": os.path.abspath(fleet_handler.report_dir)
+        })
+
+    def finish(self, args, session_id: str, completed_tasks: List[AuditTask], emit, connection_stats=None):
+        gorganized_reports(completed_tasks, log_level=args.loglevel, session_id=session_id, connection_stats=connection_stats)
+        gsummary_report(completed_tasks, log_level=args.loglevel, show_all=args.show_all, session_id=session_id)
+        if args.format == 'csv':
+            gcsv_report(completed_tasks, session_id=session_id)
+        gevidence_report(completed_tasks, session_id=session_id, meta={"benchmark_file": args.benchmark_file, "host": args.ssh_host, **args.shard_meta})
+        if args.prom_file:
+            gprom_report(completed_tasks, args.prom_file, session_id=session_id, host=args.ssh_host,
+                         run_duration=time.time() - args.started, connection_stats=connection_stats)
+
+        formatter = TaskFormatter()
+        counts = {"PASS": 0, "FAIL": 0, "ERROR": 0, NOT_RUN: 0}
+        for task in completed_tasks:
+            status = formatter.get_task_status(task)
+            if status in counts:
+                counts[status] += 1
+        emit({"event": "end", "session_id": session_id, "counts": counts, "report_dir": os.path.abspath("reports")})
@@ -0,0 +1,267 @@
+import copy
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from audit_task import AuditTask
+from handlers.audit_handler import AuditHandler
+from handlers.log_handler import flush_logs
+from utils.execution_utils import bind_remote_executor, submit_in_context
+from utils.remote_agent import RemoteAgent
+from utils.remote_utils import RemoteExecutor
+from utils.script_bundle import ScriptBundle
+from utils.report_formatters import TaskFormatter
+from utils.report_generator import gorganized_reports, gcsv_report, gevidence_report
+from utils.fleet_reporter import FleetReporter
+from utils.prometheus_reporter import PrometheusReporter
+from utils.budget import NOT_RUN
+from utils.cost_history import record_costs
+
+
+def build_executor(args, host: str, port: int = None, username: str = None, password: str = None, key_path: str = None) -> RemoteExecutor:
+    return RemoteExecutor(
+        host,
+        port or args.port,
+        username or args.username,
+        password=password,
+        key_path=key_path,
+        persistent_shell=args.persistent_shell,
+        max_channels=args.max_channels,
+        batch_size=args.batch_commands,
+        batch_window=args.batch_window / 1000.0,
+        keepalive=args.keepalive,
+        retries=args.retries
+    )
+
+
+def audit_remote_host(executor: RemoteExecutor, tasks: List[AuditTask], args, keep_connection: bool = False,
+                      on_complete: Optional[Callable[[AuditTask], None]] = None, deadline: Optional[float] = None) -> List[AuditTask]:
+    logger = logging.getLogger()
+    completed_tasks = None
+    bundle = ScriptBundle.for_tasks(executor, tasks)
+    try:
+        if args.agent:
+            agent = RemoteAgent(executor)
+            completed_tasks = agent.run(tasks, workers=args.workers, parallel_steps=args.parallel_steps, log_level=args.loglevel,
+                                        deadline=deadline)
+            if completed_tasks is None:
+                logger.warning(f"Audit agent unavailable on {executor.hostname}, falling back to running checks over SSH.")
+            elif on_complete:
+                # like the SSH path, checks the budget stopped are not journaled so --resume still runs them
+                for task in completed_tasks:
+                    if task.status != NOT_RUN:
+                        on_complete(task)
+
+        if completed_tasks is None:
+            with bind_remote_executor(executor):
+                # ship every referenced script once, execute_script falls back to per-check uploads otherwise
+                if bundle.install():
+                    executor.script_bundle = bundle
+
+                audit_handler = AuditHandler()
+                completed_tasks = audit_handler.run_audit(tasks, log_level=args.loglevel, workers=args.workers, on_complete=on_complete,
+                                                           deadline=deadline)
+    finally:
+        # Always clean up
+        bundle.cleanup()
+        executor.script_bundle = None
+        if not keep_connection:
+            executor.disconnect()
+
+    return completed_tasks
+
+
+def load_inventory(path: str) -> List[Dict[str, Any]]:
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith('.json'):
+            data = json.load(f)
+        else:
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("PyYAML is required for YAML inventories (pip install pyyaml), or use a .json inventory.")
+            data = yaml.safe_load(f)
+
+    # either a bare list of hosts, or {'defaults': {...}, 'hosts': [...]}
+    defaults, entries = {}, data
+    if isinstance(data, dict):
+        defaults = data.get('defaults') or {}
+        entries = data.get('hosts') or []
+    if not isinstance(entries, list):
+        raise ValueError(f"Inventory '{path}' must contain a list of hosts.")
+
+    hosts = []
+    for entry in entries:
+        if isinstance(entry, str):
+            entry = {'host': entry}
+        if not isinstance(entry, dict) or not entry.get('host'):
+            raise ValueError(f"Invalid inventory entry: {entry}")
+        hosts.append({**defaults, **entry})
+    return hosts
+
+
+def write_fleet_session(hosts: List[Tuple[str, str, List[AuditTask], Dict[str, Any]]], args, session_id: str) -> List[Dict[str, Any]]:
+    # hosts are (label, folder, completed tasks, extra evidence meta), written like a fleet run
+    report_dir = os.path.join("reports", f"fleet_{session_id}")
+    formatter = TaskFormatter()
+    host_results = []
+    for label, folder, completed_tasks, meta in hosts:
+        host_dir = os.path.join(report_dir, folder)
+        gorganized_reports(completed_tasks, log_level=args.loglevel, session_id=session_id, report_dir=host_dir)
+        if args.format == 'csv':
+            gcsv_report(completed_tasks, session_id=session_id, report_dir=host_dir)
+        gevidence_report(completed_tasks, session_id=session_id, report_dir=host_dir,
+                         meta={"benchmark_file": args.benchmark_file, "host": label, **meta})
+
+        result = {"host": label, "status": "COMPLETED", "error": "", "tasks": len(completed_tasks),
+                  "PASS": 0, "FAIL": 0, "ERROR": 0, "duration": 0.0, "reconnects": 0, "retries": 0}
+        for task in completed_tasks:
+            status = formatter.get_task_status(task)
+            if status in result:
+                result[status] += 1
+        host_results.append(result)
+
+    FleetReporter(host_results, session_id, report_dir).generate_fleet_report()
+    return host_results
+
+
+class ExecutorPool:
+    # connections kept open between audits (daemon mode), one per host and credentials, so a
+    # request never rides on a connection another request authenticated; audits of the same
+    # host take turns on its connection
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.executors = {}
+
+    @contextmanager
+    def lease(self, args, host: str, port: int = None, username: str = None, password: str = None, key_path: str = None):
+        # only a hash of the password is kept in the key
+        secret = hashlib.sha256(password.encode('utf-8')).hexdigest() if password else None
+        key = (host, port or args.port, username or args.username, key_path, secret)
+        with self.lock:
+            if key not in self.executors:
+                self.executors[key] = (build_executor(args, host, port, username, password, key_path), threading.Lock())
+            executor, host_lock = self.executors[key]
+
+        with host_lock:
+            yield executor
+
+    def close(self):
+        with self.lock:
+            executors, self.executors = list(self.executors.values()), {}
+        for executor, _ in executors:
+            executor.disconnect()
+
+
+class FleetHandler:
+    def __init__(self, args, password: Optional[str] = None, session_id: str = None,
+                 executor_pool: Optional[ExecutorPool] = None, on_complete: Optional[Callable[[AuditTask, str], None]] = None):
+        self.args = args
+        self.password = password
+        self.session_id = session_id
+        self.executor_pool = executor_pool
+        self.on_complete = on_complete
+        # one metrics file for the whole fleet, every series labeled with its host
+        self.prom_reporter = PrometheusReporter(args.prom_file, session_id) if args.prom_file else None
+        self.report_dir = os.path.join("reports", f"fleet_{session_id}")
+        self.logger = logging.getLogger()
+
+    def host_dir(self, host: str) -> str:
+        return os.path.join(self.report_dir, re.sub(r'[^A-Za-z0-9._-]', '_', host))
+
+    @contextmanager
+    def host_executor(self, entry: Dict[str, Any], port: int):
+        options = dict(
+            port=port,
+            username=entry.get('username'),
+            password=entry.get('password', self.password),
+            key_path=os.path.expanduser(entry['identity_file']) if entry.get('identity_file') else self.args.identity_file
+        )
+        if self.executor_pool:
+            with self.executor_pool.lease(self.args, entry['host'], **options) as executor:
+                yield executor
+        else:
+            yield build_executor(self.args, entry['host'], **options)
+
+    def audit_host(self, entry: Dict[str, Any], tasks: List[AuditTask]) -> Dict[str, Any]:
+        port = entry.get('port') or self.args.port
+        with self.host_executor(entry, port) as executor:
+            return self.audit_host_with(executor, entry, port, tasks)
+
+    def audit_host_with(self, executor: RemoteExecutor, entry: Dict[str, Any], port: int, tasks: List[AuditTask]) -> Dict[str, Any]:
+        host = entry['host']
+        # the same machine can be listed on several ports, keep their reports apart
+        label = host if port == 22 else f"{host}_{port}"
+        result = {"host": label, "status": "ERROR", "error": "", "tasks": 0, "PASS": 0, "FAIL": 0, "ERROR": 0, "duration": 0.0,
+                  "reconnects": 0, "retries": 0}
+        started = time.time()
+        on_complete = (lambda task: self.on_complete(task, label)) if self.on_complete else None
+
+        try:
+            # pooled connections may still be open from an earlier audit
+            if not executor.transport_active() and not executor.connect():
+                result["status"] = "UNREACHABLE"
+                result["error"] = "Failed to connect"
+                executor.disconnect()
+                return result
+
+            # every host gets its own copy, AuditTask objects carry their results
+            completed_tasks = audit_remote_host(executor, copy.deepcopy(tasks), self.args,
+                                                keep_connection=self.executor_pool is not None, on_complete=on_complete)
+            record_costs(completed_tasks)
+
+            host_dir = self.host_dir(label)
+            gorganized_reports(completed_tasks, log_level=self.args.loglevel, session_id=self.session_id, report_dir=host_dir,
+                               connection_stats=executor.connection_stats())
+            if self.args.format == 'csv':
+                gcsv_report(completed_tasks, session_id=self.session_id, report_dir=host_dir)
+            gevidence_report(completed_tasks, session_id=self.session_id, report_dir=host_dir,
+                             meta={"benchmark_file": self.args.benchmark_file, "host": label, **self.args.shard_meta})
+
+            formatter = TaskFormatter()
+            for task in completed_tasks:
+                status = formatter.get_task_status(task)
+                if status in result:
+                    result[status] += 1
+            result["tasks"] = len(completed_tasks)
+            result["status"] = "COMPLETED"
+            if self.prom_reporter:
+                self.prom_reporter.add_run(completed_tasks, host=label, run_duration=time.time() - started,
+                                           connection_stats=executor.connection_stats())
+        except Exception as e:
+            # one broken host must not take the rest of the fleet down
+            self.logger.error(f"Audit of {label} failed: {e}")
+            result["error"] = str(e)
+        finally:
+            result["duration"] = round(time.time() - started, 2)
+            result["reconnects"] = executor.stats["reconnects"]
+            result["retries"] = executor.stats["retries"]
+
+        self.logger.info(f"Host {label} finished: {result['status']} ({result['PASS']} Pass, {result['FAIL']} Fail, {result['ERROR']} Error)")
+        return result
+
+    def run(self, inventory: List[Dict[str, Any]], tasks: List[AuditTask]) -> List[Dict[str, Any]]:
+        concurrency = max(1, self.args.fleet_concurrency)
+        self.logger.info(f"Starting FLEET audit of {len(inventory)} hosts, {concurrency} at a time.")
+
+        # the pool size is the connection bound: at most `concurrency` hosts are connected at once
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            # hosts inherit the caller's context (per request step workers in the daemon)
+            futures = [submit_in_context(pool, self.audit_host, entry, tasks) for entry in inventory]
+            host_results = [future.result() for future in futures]
+
+        flush_logs()
+        FleetReporter(host_results, self.session_id, self.report_dir).generate_fleet_report()
+        if self.prom_reporter:
+            for r in host_results:
+                self.prom_reporter.sample("cis_audit_host_audited", "1 if the host was reached and audited in the last fleet run.",
+                                          1 if r["status"] == "COMPLETED" else 0, {"host": r["host"]})
+            self.prom_reporter.generate_prom_file()
+        return host_results
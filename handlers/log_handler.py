@@ -1,9 +1,23 @@
+import atexit
+import json
 import logging
+import logging.handlers
 import datetime
 import os
+import queue
 import re
+from typing import Optional
 from utils.color_utils import draw_color_manager
 
+EXECUTING_PATTERN = re.compile(r'(Executing check:)(\s*\[([^\]]+)\]\s*)(.+)')
+FINISHED_PATTERN = re.compile(r'(Finished check: \[[^\]]+\] - Result: )\[([^\]]+)\](\]?)')
+# messages without any of these are printed as they are
+COLORIZED_MARKERS = ("Executing check:", "Finished check:", "AUDIT RUN HAS BEEN COMPLETED")
+
+# handlers run on the listener thread, set up by setup_logger
+log_queue: Optional[queue.Queue] = None
+log_listener: Optional[logging.handlers.QueueListener] = None
+
 class ColorFormatter(logging.Formatter):
     
     def __init__(self):
@@ -17,6 +31,8 @@ class ColorFormatter(logging.Formatter):
             logging.ERROR: f"{self.color_manager.GREEN}%(asctime)s {self.color_manager.BOLD_RED}|{self.color_manager.RESET}{self.color_manager.RED_BG} %(levelname)s {self.color_manager.RESET}{self.color_manager.BOLD_RED}|{self.color_manager.RESET} %(message)s",
             logging.CRITICAL: f"{self.color_manager.GREEN}%(asctime)s {self.color_manager.BOLD_RED}|{self.color_manager.RESET} {self.color_manager.BOLD_RED}%(levelname)s{self.color_manager.RESET} {self.color_manager.BOLD_RED}|{self.color_manager.RESET} %(message)s",
         }
+        self.formatters = {level: logging.Formatter(fmt) for level, fmt in self.FORMATS.items()}
+        self.default_formatter = logging.Formatter()
 
     def _colorize_message(self, message: str, level: int) -> str:
         if not self.color_manager.use_colors:
@@ -24,8 +40,7 @@ class ColorFormatter(logging.Formatter):
             
         # Colorize "Executing check" messages
         if "Executing check:" in message:
-            return re.sub(
-                r'(Executing check:)(\s*\[([^\]]+)\]\s*)(.+)',
+            return EXECUTING_PATTERN.sub(
                 rf'{self.color_manager.ORANGE}\1\2{self.color_manager.RESET}\4',
                 message
             )
@@ -45,11 +60,7 @@ class ColorFormatter(logging.Formatter):
                 
                 return f"{self.color_manager.BOLD}{prefix}{self.color_manager.RESET}[{status_color}{status}{self.color_manager.RESET}]{suffix}"
             
-            message = re.sub(
-                r'(Finished check: \[[^\]]+\] - Result: )\[([^\]]+)\](\]?)',
-                colorize_result,
-                message
-            )
+            message = FINISHED_PATTERN.sub(colorize_result, message)
         
         if "AUDIT RUN HAS BEEN COMPLETED" in message:
             return f"{self.color_manager.CYAN}{message}{self.color_manager.RESET}"
@@ -58,30 +69,60 @@ class ColorFormatter(logging.Formatter):
 
     def format(self, record):
         # First apply the standard log format
-        log_fmt = self.FORMATS.get(record.levelno)
-        formatter = logging.Formatter(log_fmt)
-        formatted = formatter.format(record)
-        
+        formatted = self.formatters.get(record.levelno, self.default_formatter).format(record)
+        if not self.color_manager.use_colors:
+            return formatted
+
         # Extract the message part (after the last | character)
-        if "|" in formatted:
-            parts = formatted.rsplit("|", 1)
-            if len(parts) == 2:
-                prefix, message = parts
-                colorized_message = self._colorize_message(message.strip(), record.levelno)
-                formatted = f"{prefix}| {colorized_message}"
-        
-        return formatted
+        prefix, separator, message = formatted.rpartition("|")
+        if not separator or not any(marker in message for marker in COLORIZED_MARKERS):
+            return formatted
+        return f"{prefix}| {self._colorize_message(message.strip(), record.levelno)}"
+
 
-def setup_logger(log_level_str: str = 'INFO'):
+class JSONFormatter(logging.Formatter):
+    # one JSON object per line, for log shippers
+
+    def format(self, record):
+        entry = {
+            "time": datetime.datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            # QueueHandler already merged any traceback into the message
+            "message": record.getMessage(),
+        }
+        return json.dumps(entry, default=str)
+
+
+def flush_logs():
+    # wait for the listener, so queued log lines come out before a report is printed
+    if log_listener is not None:
+        log_queue.join()
+
+
+def stop_logging():
+    global log_listener
+    if log_listener is not None:
+        log_listener.stop()
+        log_listener = None
+
+
+def setup_logger(log_level_str: str = 'INFO', json_log: bool = False):
+    global log_queue, log_listener
     log_dir = "logs"
     os.makedirs(log_dir, exist_ok=True)
     
-    log_filename = os.path.join(log_dir, f"audit_log_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
+    extension = "jsonl" if json_log else "log"
+    log_filename = os.path.join(log_dir, f"audit_log_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}")
     
     log_level = getattr(logging, log_level_str.upper(), logging.INFO)
 
     file_handler = logging.FileHandler(log_filename)
-    file_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+    if json_log:
+        file_handler.setFormatter(JSONFormatter())
+    else:
+        file_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
     
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(ColorFormatter())
@@ -91,7 +132,16 @@ def setup_logger(log_level_str: str = 'INFO'):
     
     if logger.hasHandlers():
         logger.handlers.clear()
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+
+    # workers only put records on the queue, formatting and terminal/disk writes happen on the listener thread
+    stop_logging()
+    log_queue = queue.Queue()
+    log_listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler)
+    log_listener.start()
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
     
-    return logger
\ No newline at end of file
+    return logger
+
+
+# drains what is still queued when the process exits
+atexit.register(stop_logging)
\ No newline at end of file
@@ -0,0 +1,72 @@
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from audit_task import AuditTask
+from utils.evidence_reporter import EvidenceReporter, is_fleet_evidence, host_folder
+from utils.budget import NOT_RUN
+from utils.sharding import parse_shard
+
+# Combines the sessions of a sharded audit (--shard i/N) into one, from the evidence every
+# session stores. Results are taken as they are, nothing is executed or judged again.
+# Single host sessions merge into one task list, fleet sessions host by host.
+# Shards only fit together when they were split the same way (same N, same cost file).
+
+
+class MergeHandler:
+    def __init__(self, benchmark_tasks: List[AuditTask]):
+        # the benchmark as the shards selected it (filters applied), every ID should be in a session
+        # merged results follow the benchmark order, not the order the shards finished in
+        self.order = {task.id: position for position, task in enumerate(benchmark_tasks)}
+        self.logger = logging.getLogger()
+
+    def load_sessions(self, session_ids: List[str]) -> Tuple[bool, Dict[str, Tuple[str, List[AuditTask]]]]:
+        # host folder ("" for single host sessions) -> (label, tasks of every session)
+        hosts: Dict[str, Tuple[str, List[AuditTask]]] = OrderedDict()
+        fleet: Optional[bool] = None
+        shard_metas: Dict[str, Dict] = {}
+        for session_id in session_ids:
+            evidence_paths = EvidenceReporter.find(session_id)
+            if not evidence_paths:
+                raise ValueError(f"No stored evidence found for session '{session_id}'.")
+            for path in evidence_paths:
+                is_fleet = is_fleet_evidence(path)
+                if fleet is not None and fleet != is_fleet:
+                    raise ValueError("Single host and fleet sessions cannot be merged together.")
+                fleet = is_fleet
+                tasks, meta = EvidenceReporter.load(path)
+                shard_metas.setdefault(session_id, meta)
+                folder = host_folder(path) if is_fleet else ""
+                label, merged = hosts.setdefault(folder, (meta.get("host") or folder, []))
+                merged.extend(tasks)
+        self.check_shards(shard_metas)
+        return bool(fleet), hosts
+
+    def check_shards(self, metas: Dict[str, Dict]):
+        sharded = {session_id: meta for session_id, meta in metas.items() if meta.get("shard")}
+        if not sharded:
+            return
+        unsharded = [session_id for session_id in metas if session_id not in sharded]
+        if unsharded:
+            raise ValueError(f"Sessions {', '.join(unsharded)} were not run with --shard, they cannot be merged with shards.")
+        counts = {parse_shard(meta["shard"])[1] for meta in sharded.values()}
+        if len(counts) > 1:
+            raise ValueError(f"The sessions were split into different numbers of shards ({', '.join(meta['shard'] for meta in sharded.values())}).")
+        costs = {meta.get("shard_costs") for meta in sharded.values()}
+        if len(costs) > 1:
+            # each shard balanced a different cost history, checks overlap or are in no shard at all
+            raise ValueError("The shards were split with different --shard-costs contents. Run every shard with the same copy of the cost file.")
+
+    def combine(self, tasks: List[AuditTask], label: str = "") -> List[AuditTask]:
+        by_id: Dict[str, AuditTask] = {}
+        for task in tasks:
+            if task.id in by_id:
+                if task.status == NOT_RUN:
+                    # a --budget session that left the check out does not replace a real result
+                    continue
+                self.logger.warning(f"{label or 'Merge'}: check {task.id} is in more than one session, the later result is kept.")
+            by_id[task.id] = task
+        missing = [task_id for task_id in self.order if task_id not in by_id]
+        if missing:
+            self.logger.warning(f"{label or 'Merge'}: {len(missing)} checks of the benchmark are in none of the sessions: {', '.join(missing[:10])}{' ...' if len(missing) > 10 else ''}")
+        return sorted(by_id.values(), key=lambda task: (self.order.get(task.id, len(self.order)), task.id))
@@ -217,7 +217,10 @@ def complex_check(node: dict) -> dict:
             title=node.get('title', 'Untitled Step'),
             id='', level='', profile=[], domain='', check_type='', target=''
         )
-        return simple_check(sub_task)
+        step_result = simple_check(sub_task)
+        if node.get('metrics'):
+            step_result['metrics'] = node['metrics']
+        return step_result
 
 def process_with_algorithm(task: AuditTask) -> dict:
     if isinstance(task.actual_output, dict) and "error" in task.actual_output:
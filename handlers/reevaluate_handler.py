@@ -0,0 +1,100 @@
+import copy
+import logging
+from typing import Any, Dict, List
+
+from audit_task import AuditTask
+from handlers.output_handler import process_with_algorithm
+from handlers.check_handlers.multi_procedure_handler import stops_logic, logic_evidence_node
+from handlers.fleet_handler import write_fleet_session
+from utils.evidence_reporter import EvidenceReporter, host_folder
+from utils.budget import NOT_RUN, mark_not_run
+
+# Judges the evidence stored by an earlier run (utils/evidence_reporter.py) again with the
+# algorithms and expected values of the current benchmark, without executing anything.
+# Evidence is only reused when the row (or step) still collects it the same way, the
+# check type, target and parameters must match; otherwise the check reports ERROR and
+# has to be run again.
+
+# what decides which evidence a step collects, everything else is judgement
+COLLECTION_KEYS = ('type_handler', 'target', 'parameters')
+JUDGEMENT_KEYS = ('title', 'algorithm', 'expected_value', 'pass_stop_check')
+
+
+class StaleEvidence(Exception):
+    pass
+
+
+def merge_steps(steps: List[dict], evidence: List[dict], logic: str) -> List[dict]:
+    if len(evidence) > len(steps):
+        raise StaleEvidence("steps were removed from the benchmark")
+    merged = []
+    for node, stored in zip(steps, evidence):
+        title = node.get('title', 'Untitled Step')
+        if ("logic" in node) != ("logic" in stored):
+            raise StaleEvidence(f"step '{title}' changed between a logic group and an action")
+        if "logic" in node:
+            merged.append(logic_evidence_node(node, merge_steps(node.get("steps", []), stored.get("steps", []), node["logic"])))
+            continue
+        if any(node.get(key) != stored.get(key) for key in COLLECTION_KEYS):
+            raise StaleEvidence(f"step '{title}' collects different evidence now")
+        merged.append({**stored, **{key: node.get(key) for key in JUDGEMENT_KEYS if key in node}})
+
+    # the run stopped collecting after a deciding step, that is only enough if it still decides
+    if len(merged) < len(steps) and not (merged and stops_logic(str(logic or "AND").upper(), merged[-1])):
+        raise StaleEvidence(f"step '{steps[len(merged)].get('title', 'Untitled Step')}' was not run")
+    return merged
+
+
+def rescore_task(task: AuditTask, stored: AuditTask) -> AuditTask:
+    rescored = copy.deepcopy(task)
+    rescored.metrics = stored.metrics
+    rescored.status = "COMPLETED"
+    if stored.status == NOT_RUN:
+        # left out of a --budget run, there is nothing to judge
+        return mark_not_run(rescored, stored.final_result.get("details", {}).get("reason", "Not run"))
+    try:
+        if stored.actual_output is None:
+            raise StaleEvidence("no evidence was collected")
+        if task.check_type != stored.check_type or task.target != stored.target:
+            raise StaleEvidence("check type or target changed")
+        payload = stored.actual_output
+        if isinstance(payload, dict) and payload.get("is_unified_logic_payload"):
+            params = task.parameters if isinstance(task.parameters, dict) else {}
+            logic = params.get("logic") or "AND"
+            rescored.actual_output = {**payload, "logic": params.get("logic"),
+                                      "evidence_tree": merge_steps(params.get("steps", []), payload.get("evidence_tree", []), logic)}
+        else:
+            if task.parameters != stored.parameters:
+                raise StaleEvidence("parameters changed")
+            rescored.actual_output = payload
+        rescored.final_result = process_with_algorithm(rescored)
+    except StaleEvidence as e:
+        rescored.actual_output = stored.actual_output
+        rescored.final_result = {"overall_status": "ERROR", "type": "action_node", "title": task.title,
+                                 "details": {"error": f"Stored evidence cannot be re-evaluated, run the check again: {e}"}}
+    return rescored
+
+
+class ReevaluateHandler:
+    def __init__(self, tasks: List[AuditTask]):
+        # the current benchmark, already filtered
+        self.tasks = tasks
+        self.logger = logging.getLogger()
+
+    def rescore(self, stored_tasks: List[AuditTask], label: str = "") -> List[AuditTask]:
+        stored_by_id = {task.id: task for task in stored_tasks}
+        missing = [task.id for task in self.tasks if task.id not in stored_by_id]
+        if missing:
+            self.logger.warning(f"{label or 'Session'}: {len(missing)} checks have no stored evidence and are left out: {', '.join(missing)}")
+        rescored = [rescore_task(task, stored_by_id[task.id]) for task in self.tasks if task.id in stored_by_id]
+        self.logger.info(f"{label or 'Session'}: re-evaluated {len(rescored)} checks from stored evidence.")
+        return rescored
+
+    def rescore_fleet(self, evidence_paths: List[str], args, session_id: str) -> List[Dict[str, Any]]:
+        hosts = []
+        for path in evidence_paths:
+            stored_tasks, meta = EvidenceReporter.load(path)
+            label = meta.get("host") or host_folder(path)
+            hosts.append((label, host_folder(path), self.rescore(stored_tasks, label), {"reevaluated_from": meta.get("session_id")}))
+        return write_fleet_session(hosts, args, session_id)
+
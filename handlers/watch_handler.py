@@ -0,0 +1,116 @@
+import logging
+import os
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, TextIO
+
+from audit_task import AuditTask
+from handlers.audit_handler import AuditHandler
+from utils.inotify import Inotify, IN_IGNORED, IN_Q_OVERFLOW
+from utils.ndjson_writer import NDJSONWriter, task_record
+from utils.report_formatters import TaskFormatter
+from utils.watch_deps import task_dependencies
+
+# quiet time after the last event before the affected checks run, an editor
+# save or a package upgrade is a burst of events
+DEBOUNCE_SECONDS = 0.5
+
+
+class WatchHandler:
+    def __init__(self, tasks: List[AuditTask], stream: TextIO, workers: int = 1, log_level: str = 'INFO'):
+        self.tasks = tasks
+        self.workers = workers
+        self.log_level = log_level
+        self.writer = NDJSONWriter(stream)
+        self.formatter = TaskFormatter()
+        self.logger = logging.getLogger()
+
+        self.dependencies = [task_dependencies(task) for task in tasks]
+        # watched directory -> entry name (None for any entry) -> indexes of the tasks reading it
+        self.index: Dict[str, Dict[Optional[str], Set[int]]] = defaultdict(lambda: defaultdict(set))
+        self.watches: Dict[int, str] = {}
+        self.inotify = None
+
+    def build_index(self):
+        self.index.clear()
+        for position, paths in enumerate(self.dependencies):
+            for path in paths:
+                if path.endswith('/'):
+                    directory, name = path.rstrip('/') or '/', None
+                else:
+                    directory, name = os.path.split(path)
+                # a path that does not exist yet is watched from its nearest existing parent
+                while directory != '/' and not os.path.isdir(directory):
+                    directory, name = os.path.split(directory)
+                self.index[directory][name].add(position)
+
+        watched = set(self.watches.values())
+        for directory in self.index:
+            if directory not in watched:
+                wd = self.inotify.add_watch(directory)
+                if wd >= 0:
+                    self.watches[wd] = directory
+
+    def affected(self, events) -> Set[int]:
+        positions = set()
+        for wd, mask, name in events:
+            if mask & IN_Q_OVERFLOW:
+                self.logger.warning("inotify queue overflowed, re-running every watched check")
+                return {p for p, paths in enumerate(self.dependencies) if paths}
+            directory = self.watches.get(wd)
+            if directory is None:
+                continue
+            if mask & IN_IGNORED:
+                # directory removed or replaced, build_index picks it up again
+                del self.watches[wd]
+            entries = self.index.get(directory, {})
+            positions |= entries.get(None, set())
+            positions |= entries.get(name, set())
+            # events on the directory itself (deleted, moved) concern everything below it
+            if not name:
+                for tasks_for_name in entries.values():
+                    positions |= tasks_for_name
+        return positions
+
+    def run_tasks(self, tasks: List[AuditTask], on_complete=None):
+        AuditHandler().run_audit(tasks, log_level=self.log_level, workers=self.workers, on_complete=on_complete)
+
+    def run(self):
+        self.inotify = Inotify()
+        try:
+            self.run_tasks(self.tasks, on_complete=lambda task: self.writer.write({"event": "result", **task_record(task)}))
+            statuses = [self.formatter.get_task_status(task) for task in self.tasks]
+
+            self.build_index()
+            unwatched = sum(1 for paths in self.dependencies if not paths)
+            self.logger.info(f"Watching {len(self.watches)} directories for {len(self.tasks) - unwatched} checks "
+                             f"({unwatched} checks read no watchable files and only ran once).")
+            self.writer.write({"event": "watching", "directories": len(self.watches), "unwatched_checks": unwatched})
+
+            while True:
+                events = self.inotify.read_events()
+                while True:
+                    more = self.inotify.read_events(DEBOUNCE_SECONDS)
+                    if not more:
+                        break
+                    events.extend(more)
+
+                changed = sorted({os.path.join(self.watches[wd], name) for wd, _, name in events if wd in self.watches})
+                positions = self.affected(events)
+                if not positions:
+                    continue
+
+                rerun = [self.tasks[p] for p in sorted(positions)]
+                self.logger.info(f"{len(changed)} watched paths changed, re-running {len(rerun)} checks")
+                self.run_tasks(rerun)
+
+                for position in sorted(positions):
+                    task = self.tasks[position]
+                    status = self.formatter.get_task_status(task)
+                    if status != statuses[position]:
+                        self.writer.write({"event": "delta", **task_record(task, previous=statuses[position]), "changed_paths": changed[:20]})
+                        statuses[position] = status
+
+                # newly created directories can now be watched directly
+                self.build_index()
+        finally:
+            self.inotify.close()
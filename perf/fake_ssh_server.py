@@ -0,0 +1,551 @@
+import errno
+import heapq
+import logging
+import os
+import random
+import re
+import shlex
+import socket
+import struct
+import subprocess
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import paramiko
+
+# An SSH server that lives inside the test or benchmark process, so the remote code
+# path (RemoteExecutor, ElevatedShell, batching, ScriptBundle, remo_script) can be
+# exercised on one box. Commands are answered from a CommandTable, or run for real
+# in a local sandbox. A LinkEmulator in front of it adds round-trip latency and a
+# bandwidth limit, Faults drops connections or channels on purpose.
+#
+#   with FakeSSHServer(rtt=0.15) as server:
+#       executor = RemoteExecutor("127.0.0.1", server.port, server.username, password=server.password)
+
+Response = Tuple[str, str, int]
+Responder = Union[Response, Callable[[str], Response]]
+
+SUDO_PREFIX = re.compile(r"sudo((?:\s+(?:-S|-p\s+(?:'[^']*'|\"[^\"]*\"|\S+)))*)\s+(.*)", re.DOTALL)
+# one command as written by utils.shell_framing.frame_command
+FRAMED_COMMAND = re.compile(
+    r"\( eval ((?:'[^']*'|\"'\"|[^\s'])+) \) </dev/null\n"
+    r"__cis_rc=\$\?\n"
+    r"printf '\\n%s %d\\n' '([^']+)' \"\$__cis_rc\"\n"
+    r"printf '\\n%s\\n' '[^']+' >&2\n"
+)
+# the start-up line of utils.remote_shell.ElevatedShell
+READY_LINE = re.compile(r"printf '%s\\n' ('[^']*'|\S+); exec bash")
+
+
+class CommandTable:
+    # exact commands first, then patterns in the order they were added, then the default
+    def __init__(self, commands: Optional[Dict[str, Responder]] = None, default: Optional[Responder] = None):
+        self.commands = dict(commands or {})
+        self.patterns: List[Tuple[re.Pattern, Responder]] = []
+        self.default = default
+
+    def add(self, command: str, response: Responder):
+        self.commands[command] = response
+
+    def add_pattern(self, pattern: str, response: Responder):
+        self.patterns.append((re.compile(pattern), response))
+
+    def lookup(self, command: str) -> Response:
+        command = command.strip()
+        response = self.commands.get(command)
+        if response is None:
+            response = next((r for pattern, r in self.patterns if pattern.search(command)), None)
+        if response is None:
+            response = self.default
+        if response is None:
+            return "", f"bash: {command.split()[0] if command else ''}: command not found", 127
+        return response(command) if callable(response) else response
+
+
+class Faults:
+    # drop_every: close the whole connection instead of answering every Nth command
+    # fail_rate:  share of commands whose channel closes without an exit status
+    def __init__(self, drop_every: int = 0, fail_rate: float = 0.0, seed: Optional[int] = None):
+        self.drop_every = drop_every
+        self.fail_rate = fail_rate
+        self.random = random.Random(seed)
+        self.commands = 0
+        self.lock = threading.Lock()
+
+    def next(self) -> Optional[str]:
+        with self.lock:
+            self.commands += 1
+            if self.drop_every and self.commands % self.drop_every == 0:
+                return "drop"
+            if self.fail_rate and self.random.random() < self.fail_rate:
+                return "fail"
+        return None
+
+
+class InjectedFault(Exception):
+    pass
+
+
+class LinkEmulator:
+    # TCP relay that delays every chunk by half the round trip in each direction and
+    # serializes it at the given bandwidth, like netem on a loopback interface
+    def __init__(self, target_port: int, rtt: float = 0.0, bandwidth: Optional[int] = None, host: str = "127.0.0.1"):
+        self.target = (host, target_port)
+        self.delay = rtt / 2
+        self.bandwidth = bandwidth
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind((host, 0))
+        self.listener.listen(64)
+        self.port = self.listener.getsockname()[1]
+        self.running = True
+
+    def start(self):
+        threading.Thread(target=self.accept_loop, name="link-accept", daemon=True).start()
+
+    def accept_loop(self):
+        while self.running:
+            try:
+                client, _ = self.listener.accept()
+            except OSError:
+                return
+            try:
+                upstream = socket.create_connection(self.target)
+            except OSError:
+                client.close()
+                continue
+            for sock in (client, upstream):
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.relay(client, upstream)
+            self.relay(upstream, client)
+
+    def relay(self, source: socket.socket, sink: socket.socket):
+        queue, ready = [], threading.Condition()
+
+        def read():
+            sequence = 0
+            while True:
+                try:
+                    data = source.recv(65536)
+                except OSError:
+                    data = b""
+                with ready:
+                    heapq.heappush(queue, (time.monotonic() + self.delay, sequence, data))
+                    sequence += 1
+                    ready.notify()
+                if not data:
+                    return
+
+        def write():
+            link_free = 0.0
+            while True:
+                with ready:
+                    while not queue:
+                        ready.wait()
+                    due, _, data = heapq.heappop(queue)
+                if data and self.bandwidth:
+                    # a chunk leaves once the previous one is on the wire
+                    link_free = max(link_free, due) + len(data) / self.bandwidth
+                    due = link_free
+                wait = due - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                try:
+                    if not data:
+                        sink.shutdown(socket.SHUT_WR)
+                        return
+                    sink.sendall(data)
+                except OSError:
+                    return
+
+        threading.Thread(target=read, name="link-read", daemon=True).start()
+        threading.Thread(target=write, name="link-write", daemon=True).start()
+
+    def stop(self):
+        self.running = False
+        self.listener.close()
+
+
+class StubSFTPHandle(paramiko.SFTPHandle):
+    def stat(self):
+        try:
+            return paramiko.SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+    def chattr(self, attr):
+        try:
+            paramiko.SFTPServer.set_file_attr(self.filename, attr)
+            return paramiko.SFTP_OK
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+
+class StubSFTPServer(paramiko.SFTPServerInterface):
+    # real files under a root directory, enough for put() and file(..., 'w')
+    def __init__(self, server, *args, root: str = "/", **kwargs):
+        super().__init__(server, *args, **kwargs)
+        self.root = root
+
+    def local_path(self, path: str) -> str:
+        return os.path.join(self.root, self.canonicalize(path).lstrip('/'))
+
+    def stat(self, path):
+        try:
+            return paramiko.SFTPAttributes.from_stat(os.stat(self.local_path(path)))
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+    def lstat(self, path):
+        try:
+            return paramiko.SFTPAttributes.from_stat(os.lstat(self.local_path(path)))
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+    def list_folder(self, path):
+        local = self.local_path(path)
+        try:
+            entries = []
+            for name in os.listdir(local):
+                attr = paramiko.SFTPAttributes.from_stat(os.lstat(os.path.join(local, name)))
+                attr.filename = name
+                entries.append(attr)
+            return entries
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+    def open(self, path, flags, attr):
+        local = self.local_path(path)
+        try:
+            os.makedirs(os.path.dirname(local), exist_ok=True)
+            fd = os.open(local, flags | getattr(os, 'O_BINARY', 0), 0o600)
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+        if flags & os.O_WRONLY:
+            mode = 'ab' if flags & os.O_APPEND else 'wb'
+        elif flags & os.O_RDWR:
+            mode = 'a+b' if flags & os.O_APPEND else 'r+b'
+        else:
+            mode = 'rb'
+        handle = StubSFTPHandle(flags)
+        handle.filename = local
+        handle.readfile = handle.writefile = os.fdopen(fd, mode)
+        return handle
+
+    def remove(self, path):
+        return self.os_call(os.remove, self.local_path(path))
+
+    def rename(self, oldpath, newpath):
+        return self.os_call(os.rename, self.local_path(oldpath), self.local_path(newpath))
+
+    def mkdir(self, path, attr):
+        return self.os_call(os.mkdir, self.local_path(path))
+
+    def rmdir(self, path):
+        return self.os_call(os.rmdir, self.local_path(path))
+
+    def chattr(self, path, attr):
+        return self.os_call(paramiko.SFTPServer.set_file_attr, self.local_path(path), attr)
+
+    @staticmethod
+    def os_call(func, *args):
+        try:
+            func(*args)
+            return paramiko.SFTP_OK
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+
+class ChannelSession:
+    # one exec request: sudo, then a table lookup, a framed script, a persistent shell or a sandboxed bash
+    def __init__(self, server: "FakeSSHServer", channel: paramiko.Channel, command: str):
+        self.server = server
+        self.channel = channel
+        self.command = command
+        self.stdin = b""
+
+    def run(self):
+        try:
+            command = self.command
+            match = SUDO_PREFIX.fullmatch(command.strip())
+            if match:
+                command = match.group(2)
+                options = shlex.split(match.group(1))
+                if '-S' in options and not self.sudo_password(options):
+                    self.finish("", "Sorry, try again.\nsudo: 1 incorrect password attempt\n", 1)
+                    return
+            if self.server.sandbox:
+                self.run_sandboxed(command)
+            else:
+                self.run_table(command)
+        except InjectedFault:
+            pass
+        except (OSError, EOFError, paramiko.SSHException):
+            # the client went away in the middle of the command
+            pass
+        finally:
+            self.channel.close()
+
+    def fault(self):
+        fault = self.server.faults.next() if self.server.faults else None
+        if fault == "drop":
+            self.server.count("drops")
+            self.channel.get_transport().close()
+            raise InjectedFault()
+        if fault == "fail":
+            self.server.count("failures")
+            raise InjectedFault()
+
+    def sudo_password(self, options: List[str]) -> bool:
+        prompt = options[options.index('-p') + 1] if '-p' in options else "[sudo] password: "
+        if prompt:
+            self.channel.sendall_stderr(prompt.encode())
+        line = self.read_line()
+        return line == self.server.password
+
+    def read_line(self) -> Optional[str]:
+        while b"\n" not in self.stdin:
+            data = self.channel.recv(65536)
+            if not data:
+                return None
+            self.stdin += data
+        line, self.stdin = self.stdin.split(b"\n", 1)
+        return line.decode('utf-8', errors='replace')
+
+    def finish(self, stdout: str, stderr: str, rc: int):
+        if stdout:
+            self.channel.sendall(stdout.encode())
+        if stderr:
+            self.channel.sendall_stderr(stderr.encode())
+        self.channel.send_exit_status(rc)
+
+    @staticmethod
+    def inner_script(command: str) -> Optional[str]:
+        try:
+            argv = shlex.split(command)
+        except ValueError:
+            return None
+        if argv and os.path.basename(argv[0]) in ("bash", "sh") and '-c' in argv[:-1]:
+            return argv[argv.index('-c') + 1]
+        return None
+
+    def answer(self, command: str) -> Response:
+        self.server.count("commands")
+        self.fault()
+        # `sudo sh -c '...'` is looked up by the script it runs
+        script = self.inner_script(command)
+        return self.server.table.lookup(command if script is None else script)
+
+    def run_table(self, command: str):
+        script = self.inner_script(command)
+        if script is not None:
+            ready = READY_LINE.search(script)
+            if ready:
+                self.run_shell(shlex.split(ready.group(1))[0])
+                return
+            if FRAMED_COMMAND.match(script):
+                self.run_framed(script)
+                self.channel.send_exit_status(0)
+                return
+        self.finish(*self.answer(command))
+
+    def run_framed(self, script: str) -> int:
+        position = 0
+        for match in FRAMED_COMMAND.finditer(script):
+            if match.start() != position:
+                break
+            stdout, stderr, rc = self.answer(shlex.split(match.group(1))[0])
+            marker = match.group(2)
+            self.channel.sendall(f"{stdout}\n{marker} {rc}\n".encode())
+            self.channel.sendall_stderr(f"{stderr}\n{marker}\n".encode())
+            position = match.end()
+        return position
+
+    def run_shell(self, ready: str):
+        self.channel.sendall(f"{ready}\n".encode())
+        buffered = self.stdin.decode('utf-8', errors='replace')
+        while True:
+            buffered = buffered[self.run_framed(buffered):]
+            data = self.channel.recv(65536)
+            if not data:
+                self.channel.send_exit_status(0)
+                return
+            buffered += data.decode('utf-8', errors='replace')
+
+    def run_sandboxed(self, command: str):
+        self.server.count("commands")
+        self.fault()
+        process = subprocess.Popen(['bash', '-c', command], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                   stderr=subprocess.PIPE, cwd=self.server.sandbox_dir, env=self.server.sandbox_env())
+
+        def feed():
+            try:
+                if self.stdin:
+                    process.stdin.write(self.stdin)
+                    process.stdin.flush()
+                while True:
+                    data = self.channel.recv(65536)
+                    if not data:
+                        break
+                    process.stdin.write(data)
+                    process.stdin.flush()
+            except (OSError, EOFError):
+                pass
+            finally:
+                try:
+                    process.stdin.close()
+                except OSError:
+                    pass
+
+        def pump(stream, send):
+            while True:
+                data = os.read(stream.fileno(), 65536)
+                if not data:
+                    return
+                send(data)
+
+        threading.Thread(target=feed, daemon=True).start()
+        errors = threading.Thread(target=pump, args=(process.stderr, self.channel.sendall_stderr), daemon=True)
+        errors.start()
+        try:
+            pump(process.stdout, self.channel.sendall)
+            errors.join()
+        finally:
+            if process.poll() is None:
+                process.kill()
+        self.channel.send_exit_status(process.wait())
+
+
+class ServerTransport(paramiko.Transport):
+    # paramiko answers an exec request only after check_channel_exec_request returns, a command
+    # that finishes first would close its channel before the client saw the request succeed
+    def __init__(self, sock):
+        super().__init__(sock)
+        self.deferred = {}
+
+    def run_after_reply(self, channel: paramiko.Channel, func: Callable[[], None]):
+        self.deferred[channel.remote_chanid] = func
+
+    def _send_user_message(self, data):
+        super()._send_user_message(data)
+        raw = data.asbytes() if isinstance(data, paramiko.Message) else bytes(data)
+        if raw[:1] == bytes([paramiko.common.MSG_CHANNEL_SUCCESS]) and len(raw) >= 5:
+            func = self.deferred.pop(struct.unpack('>I', raw[1:5])[0], None)
+            if func:
+                threading.Thread(target=func, name="fake-ssh-exec", daemon=True).start()
+
+
+class ServerInterface(paramiko.ServerInterface):
+    def __init__(self, server: "FakeSSHServer"):
+        self.server = server
+
+    def get_allowed_auths(self, username):
+        return 'password'
+
+    def check_auth_password(self, username, password):
+        if username == self.server.username and password == self.server.password:
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def check_channel_request(self, kind, chanid):
+        if kind == 'session':
+            self.server.count("channels")
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_exec_request(self, channel, command):
+        session = ChannelSession(self.server, channel, command.decode('utf-8', errors='replace'))
+        channel.get_transport().run_after_reply(channel, session.run)
+        return True
+
+
+class FakeSSHServer:
+    def __init__(self, table: Optional[CommandTable] = None, sandbox: bool = False, sandbox_dir: Optional[str] = None,
+                 username: str = "audit", password: str = "audit", rtt: float = 0.0, bandwidth: Optional[int] = None,
+                 faults: Optional[Faults] = None, sftp_root: Optional[str] = None):
+        self.table = table or CommandTable()
+        self.sandbox = sandbox
+        self.sandbox_dir = sandbox_dir
+        self.username = username
+        self.password = password
+        self.rtt = rtt
+        self.bandwidth = bandwidth
+        self.faults = faults
+        # table mode keeps uploads out of the real filesystem
+        self.tmp_root = None if sandbox or sftp_root else tempfile.TemporaryDirectory(prefix="fake_ssh_sftp_")
+        self.sftp_root = sftp_root or (self.tmp_root.name if self.tmp_root else "/")
+        self.host_key = paramiko.RSAKey.generate(2048)
+        self.stats = {"connections": 0, "channels": 0, "commands": 0, "drops": 0, "failures": 0}
+        self.stats_lock = threading.Lock()
+        self.transports: List[paramiko.Transport] = []
+        self.listener = None
+        self.link = None
+        self.running = False
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def port(self) -> int:
+        # clients go through the link emulator when there is one
+        return self.link.port if self.link else self.listener.getsockname()[1]
+
+    def count(self, name: str, value: int = 1):
+        with self.stats_lock:
+            self.stats[name] += value
+
+    def sandbox_env(self) -> Dict[str, str]:
+        return dict(os.environ, LC_ALL="C")
+
+    def start(self) -> "FakeSSHServer":
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen(64)
+        self.running = True
+        threading.Thread(target=self.accept_loop, name="fake-ssh-accept", daemon=True).start()
+        if self.rtt or self.bandwidth:
+            self.link = LinkEmulator(self.listener.getsockname()[1], self.rtt, self.bandwidth)
+            self.link.start()
+        self.logger.debug(f"Fake SSH server listening on 127.0.0.1:{self.port}")
+        return self
+
+    def accept_loop(self):
+        while self.running:
+            try:
+                client, _ = self.listener.accept()
+            except OSError as e:
+                if e.errno in (errno.EBADF, errno.EINVAL) or not self.running:
+                    return
+                continue
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            transport = ServerTransport(client)
+            transport.add_server_key(self.host_key)
+            transport.set_subsystem_handler('sftp', paramiko.SFTPServer, StubSFTPServer, root=self.sftp_root)
+            try:
+                transport.start_server(server=ServerInterface(self))
+            except (paramiko.SSHException, EOFError, OSError):
+                transport.close()
+                continue
+            self.count("connections")
+            self.transports.append(transport)
+
+    def drop_connections(self):
+        for transport in self.transports:
+            transport.close()
+
+    def stop(self):
+        self.running = False
+        if self.link:
+            self.link.stop()
+        if self.listener:
+            self.listener.close()
+        self.drop_connections()
+        if self.tmp_root:
+            self.tmp_root.cleanup()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
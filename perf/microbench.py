@@ -0,0 +1,389 @@
+import argparse
+import contextlib
+import csv
+import datetime
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+# Add the parent directory to the path so we can import the auditor
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+from audit_task import AuditTask
+from handlers.log_handler import ColorFormatter
+from handlers.output_handler import process_with_algorithm
+from utils.color_utils import draw_color_manager
+from utils.console_reporter import ConsoleReporter
+from utils.csv_parser import CISBenchmarkParser
+from utils.csv_reporter import CSVReporter, LegacyReporter
+from utils.detailed_reporter import DetailedReporter
+from utils.fleet_reporter import FleetReporter
+from utils.prometheus_reporter import PrometheusReporter
+from utils.report_generator import new_session_id
+from utils.summary_reporter import SummaryReporter
+
+# Microbenchmarks for the offline stages of an audit: parsing the benchmark CSV,
+# judging evidence and writing reports. Benchmarks are synthetic and every check
+# gets canned evidence, nothing is executed. Results are saved as JSON with the
+# commit they were measured on, so two runs can be compared with --compare.
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+HEADER = ["ID", "Level", "Profile", "Domain", "Title", "Check_Type", "Target", "Parameters", "Algorithm", "Expected_Value"]
+DOMAINS = ["Initial Setup", "Services", "Network Configuration", "Host Based Firewall", "Access Control", "Logging and Auditing", "System Maintenance"]
+ALGORITHMS = ["Exact", "Contain", "Does Not Contain", "Null", "Not Null"]
+# every evidence string carries these, so Contain/Exact can pass and Does Not Contain can fail
+MARKERS = ["permitrootlogin no", "maxauthtries 4", "install /bin/true"]
+
+
+def canned_text(size: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    lines = list(MARKERS)
+    length = sum(len(line) + 1 for line in lines)
+    while length < size:
+        line = f"option_{rng.randrange(10000)} {rng.choice(['yes', 'no', '/etc/ssh/sshd_config', '0644 root root'])}"
+        lines.append(line)
+        length += len(line) + 1
+    return "\n".join(lines)[:size]
+
+
+def expected_for(index: int) -> str:
+    if index % 7 == 0:
+        return " || ".join(["not present", MARKERS[index % len(MARKERS)]])
+    if index % 5 == 0:
+        return " ;; ".join(MARKERS[:2])
+    return MARKERS[index % len(MARKERS)]
+
+
+def step_tree(index: int, depth: int, fanout: int) -> Dict[str, Any]:
+    steps = []
+    for n in range(fanout):
+        if depth > 1:
+            steps.append(step_tree(index + n, depth - 1, fanout))
+        else:
+            steps.append({
+                'title': f'Verify setting {index}.{n}',
+                'type_handler': 'command_output',
+                'target': f'grep -Ei "^\\s*option_{index}_{n}" /etc/ssh/sshd_config',
+                'algorithm': ALGORITHMS[(index + n) % len(ALGORITHMS)],
+                'expected_value': expected_for(index + n),
+            })
+    # OR groups judge until the first PASS, AND groups judge every step
+    return {'logic': 'OR' if depth % 2 else 'AND', 'steps': steps}
+
+
+def benchmark_row(index: int, depth: int, fanout: int, multi_every: int) -> List[str]:
+    row_id = f"{index // 1000 + 1}.{index // 100 % 10 + 1}.{index % 100 + 1}"
+    domain = DOMAINS[index % len(DOMAINS)]
+    level = "L1" if index % 3 else "L2"
+    if index % multi_every == 0:
+        return [row_id, level, "Server, Workstation", domain, f"Ensure synthetic multi step check {index} is configured",
+                "multi_procedure", "N/A", repr(step_tree(index, depth, fanout)), "", ""]
+    return [row_id, level, "Server, Workstation", domain, f"Ensure synthetic check {index} is configured",
+            "command_output", f"sshd -T | grep -i option_{index}", repr({'success_code': 0}),
+            ALGORITHMS[index % len(ALGORITHMS)], expected_for(index)]
+
+
+def write_benchmark(path: str, rows: int, depth: int, fanout: int, multi_every: int):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for index in range(rows):
+            writer.writerow(benchmark_row(index, depth, fanout, multi_every))
+
+
+def canned_evidence(index: int, evidence: str) -> Dict[str, Any]:
+    if index % 23 == 0:
+        return {"stdout": "", "stderr": f"bash: option_{index}: command not found", "exit_code": 127}
+    # Null passes on the empty output, Not Null fails on it
+    if index % 11 == 0:
+        return {"stdout": "", "stderr": "", "exit_code": 1}
+    return {"stdout": evidence, "stderr": "", "exit_code": 0}
+
+
+def canned_tree(steps: List[Dict[str, Any]], evidence: str, counter: List[int]) -> List[Dict[str, Any]]:
+    tree = []
+    for node in steps:
+        if "logic" in node:
+            tree.append({"logic": node["logic"], "steps": canned_tree(node.get("steps", []), evidence, counter)})
+        else:
+            counter[0] += 1
+            tree.append({**node, "raw_evidence": canned_evidence(counter[0], evidence),
+                         "metrics": {"wall_time": 0.001 * (counter[0] % 50), "child_cpu": 0.0, "commands": 1, "round_trips": 0,
+                                     "evidence_bytes": len(evidence), "cache_hits": 0, "cached": False}})
+    return tree
+
+
+def attach_evidence(tasks: List[AuditTask], evidence: str):
+    # what the check handlers would have returned, without running them
+    for index, task in enumerate(tasks):
+        if task.check_type == "multi_procedure":
+            task.actual_output = {
+                "is_unified_logic_payload": True,
+                "logic": task.parameters.get("logic", "AND"),
+                "evidence_tree": canned_tree(task.parameters.get("steps", []), evidence, [index]),
+            }
+        else:
+            task.actual_output = canned_evidence(index, evidence)
+        task.metrics = {"wall_time": 0.002 * (index % 97), "child_cpu": 0.001 * (index % 13), "commands": 1, "round_trips": 0,
+                        "evidence_bytes": len(evidence), "cache_hits": 0, "cached": False}
+        task.status = "COMPLETED"
+
+
+def judge(tasks: List[AuditTask]):
+    for task in tasks:
+        task.final_result = process_with_algorithm(task)
+
+
+def log_records(count: int) -> List[logging.LogRecord]:
+    messages = []
+    for index in range(count):
+        kind = index % 4
+        if kind == 0:
+            messages.append((logging.INFO, f"Executing check: [{index}.1.1] Ensure synthetic check {index} is configured"))
+        elif kind == 1:
+            status, level = [("PASS", logging.INFO), ("FAIL", logging.WARNING), ("ERROR", logging.ERROR)][index % 3]
+            messages.append((level, f"Finished check: [{index}.1.1] - Result: [{status}]"))
+        elif kind == 2:
+            messages.append((logging.DEBUG, f"Running command on host: sshd -T | grep -i option_{index}"))
+        else:
+            messages.append((logging.INFO, "AUDIT RUN HAS BEEN COMPLETED"))
+    return [logging.LogRecord("microbench", level, __file__, 0, message, None, None) for level, message in messages]
+
+
+def fleet_results(hosts: int, tasks: int) -> List[Dict[str, Any]]:
+    results = []
+    for index in range(hosts):
+        status = "UNREACHABLE" if index % 10 == 9 else "COMPLETED"
+        passed = tasks * 6 // 10 if status == "COMPLETED" else 0
+        failed = tasks * 3 // 10 if status == "COMPLETED" else 0
+        results.append({"host": f"10.0.{index // 250}.{index % 250 + 1}", "status": status,
+                        "error": "Failed to connect" if status != "COMPLETED" else "",
+                        "tasks": tasks if status == "COMPLETED" else 0, "PASS": passed, "FAIL": failed,
+                        "ERROR": tasks - passed - failed if status == "COMPLETED" else 0,
+                        "duration": round(1 + index * 0.37 % 30, 2), "reconnects": index % 3, "retries": index % 4})
+    return results
+
+
+class Suite:
+    def __init__(self, repeat: int, only: List[str]):
+        self.repeat = repeat
+        self.only = only
+        self.results = {}
+
+    def wanted(self, name: str) -> bool:
+        return not self.only or any(pattern in name for pattern in self.only)
+
+    def bench(self, name: str, func: Callable[[], Any], items: int):
+        if not self.wanted(name):
+            return
+        timings = []
+        # reporters print to the console as well, that is timed but not shown
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            for _ in range(self.repeat):
+                started = time.perf_counter()
+                func()
+                timings.append(time.perf_counter() - started)
+        median = statistics.median(timings)
+        self.results[name] = {
+            "items": items,
+            "repeat": self.repeat,
+            "min_s": round(min(timings), 6),
+            "median_s": round(median, 6),
+            "per_item_us": round(median / items * 1e6, 3) if items else None,
+            "items_per_s": round(items / median, 1) if median else None,
+        }
+        print(f"  {name:<44} {median * 1000:10.2f} ms  {self.results[name]['per_item_us'] or 0:10.2f} us/item")
+
+
+def run_parser_and_judge(suite: Suite, args, work_dir: str, evidence: str):
+    for rows in args.rows:
+        csv_path = os.path.join(work_dir, f"benchmark_{rows}.csv")
+        write_benchmark(csv_path, rows, args.depth, args.fanout, args.multi_every)
+        parser = CISBenchmarkParser(csv_path)
+        suite.bench(f"parse_csv[rows={rows}]", parser.parse_csv, rows)
+
+        tasks = parser.parse_csv()
+        attach_evidence(tasks, evidence)
+        simple = [t for t in tasks if t.check_type != "multi_procedure"]
+        multi = [t for t in tasks if t.check_type == "multi_procedure"]
+        suite.bench(f"judge_simple[rows={len(simple)}]", lambda: judge(simple), len(simple))
+        suite.bench(f"judge_multi_procedure[rows={len(multi)}]", lambda: judge(multi), len(multi))
+
+    # a handful of checks with very large evidence, e.g. a full sshd -T or package list
+    large = canned_text(args.large_evidence_bytes, seed=1)
+    tasks = [AuditTask(id=f"9.9.{i}", level="L1", profile=["Server"], domain="Services", title=f"Large evidence {i}",
+                       check_type="command_output", target="", parameters={}, algorithm=ALGORITHMS[i % len(ALGORITHMS)],
+                       expected_value=expected_for(i), actual_output={"stdout": large, "stderr": "", "exit_code": 0})
+             for i in range(args.large_evidence_rows)]
+    suite.bench(f"judge_large_evidence[bytes={args.large_evidence_bytes}]", lambda: judge(tasks), len(tasks))
+
+
+def run_reporters(suite: Suite, args, work_dir: str, evidence: str):
+    csv_path = os.path.join(work_dir, f"report_benchmark_{args.report_rows}.csv")
+    write_benchmark(csv_path, args.report_rows, args.depth, args.fanout, args.multi_every)
+    tasks = CISBenchmarkParser(csv_path).parse_csv()
+    attach_evidence(tasks, evidence)
+    judge(tasks)
+
+    session_id = new_session_id()
+    report_dir = os.path.join(work_dir, "reports")
+    count = len(tasks)
+    hosts = fleet_results(args.fleet_hosts, count)
+    suffix = f"[rows={count}]"
+
+    cases = [
+        ("SummaryReporter", lambda: SummaryReporter(tasks, session_id, report_dir, {"host": "bench", "reconnects": 1, "retries": 2}).generate_summary_report()),
+        ("DetailedReporter", lambda: DetailedReporter(tasks, session_id, report_dir).gen_detailed_reports()),
+        ("CSVReporter", lambda: CSVReporter(tasks, session_id, report_dir).generate_csv_report()),
+        ("LegacyReporter", lambda: LegacyReporter(tasks, session_id, report_dir).generate_legacy_summary_file(show_all=True)),
+        ("ConsoleReporter", lambda: ConsoleReporter(tasks).generate_summary(show_all=True)),
+        ("PrometheusReporter", lambda: prometheus_report(tasks, session_id, report_dir)),
+    ]
+    for name, func in cases:
+        suite.bench(f"{name}{suffix}", func, count)
+    suite.bench(f"FleetReporter[hosts={len(hosts)}]",
+                lambda: FleetReporter(hosts, session_id, report_dir).generate_fleet_report(), len(hosts))
+
+
+def prometheus_report(tasks: List[AuditTask], session_id: str, report_dir: str):
+    reporter = PrometheusReporter(os.path.join(report_dir, "cis_audit.prom"), session_id)
+    reporter.add_run(tasks, host="bench", run_duration=12.5, connection_stats={"reconnects": 1, "retries": 2})
+    reporter.generate_prom_file()
+
+
+def run_log_format(suite: Suite, args):
+    formatter = ColorFormatter()
+    records = log_records(args.log_records)
+
+    def format_all():
+        for record in records:
+            formatter.format(record)
+    suite.bench(f"ColorFormatter.format[records={len(records)}]", format_all, len(records))
+
+
+def git_commit() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT_DIR,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": "unknown", "dirty": None}
+    return {"commit": commit, "dirty": dirty}
+
+
+def run_suite(args) -> Dict[str, Any]:
+    # timings should not depend on whether the output is a terminal
+    color_manager = draw_color_manager()
+    color_manager.use_colors = True
+    color_manager.set_colors()
+
+    suite = Suite(args.repeat, args.only)
+    evidence = canned_text(args.evidence_bytes)
+    print(f"Running microbenchmarks ({args.repeat} runs each, median shown)")
+    with tempfile.TemporaryDirectory(prefix="cis_microbench_") as work_dir:
+        run_parser_and_judge(suite, args, work_dir, evidence)
+        run_reporters(suite, args, work_dir, evidence)
+        run_log_format(suite, args)
+
+    return {
+        **git_commit(),
+        "created": datetime.datetime.now().isoformat(timespec='seconds'),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {name: getattr(args, name) for name in ("rows", "report_rows", "depth", "fanout", "multi_every", "evidence_bytes",
+                                                           "large_evidence_bytes", "large_evidence_rows", "log_records", "fleet_hosts", "repeat")},
+        "results": suite.results,
+    }
+
+
+def save_results(document: Dict[str, Any], output: str = None, prefix: str = "microbench") -> str:
+    if not output:
+        stamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+        output = os.path.join(RESULTS_DIR, f"{prefix}_{stamp}_{document['commit'][:8]}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2)
+    print(f"Results saved to '{output}'")
+    return output
+
+
+def compare(base: Dict[str, Any], new: Dict[str, Any], threshold: float) -> bool:
+    print(f"\nBase: {base['commit'][:12]}{' (dirty)' if base.get('dirty') else ''}  {base['created']}")
+    print(f"New:  {new['commit'][:12]}{' (dirty)' if new.get('dirty') else ''}  {new['created']}")
+    if base.get("settings") != new.get("settings"):
+        print("WARNING: The runs used different settings, timings may not be comparable.")
+
+    regressed = False
+    print(f"\n  {'Benchmark':<44} {'Base ms':>10} {'New ms':>10} {'Change':>8}")
+    for name in sorted(set(base["results"]) | set(new["results"])):
+        old, current = base["results"].get(name), new["results"].get(name)
+        if not old or not current:
+            print(f"  {name:<44} {'only in ' + ('new' if current else 'base'):>30}")
+            continue
+        change = (current["median_s"] - old["median_s"]) / old["median_s"] if old["median_s"] else 0.0
+        flag = ""
+        if change > threshold:
+            flag, regressed = "  REGRESSION", True
+        elif change < -threshold:
+            flag = "  faster"
+        print(f"  {name:<44} {old['median_s'] * 1000:10.2f} {current['median_s'] * 1000:10.2f} {change:+8.1%}{flag}")
+    return regressed
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def size_list(value: str) -> List[int]:
+    try:
+        return [int(part) for part in value.split(',') if part.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected comma separated row counts, got '{value}'")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline microbenchmarks for the CIS auditor (parser, judge, reporters, log formatting).")
+    parser.add_argument('--rows', type=size_list, default=[1000, 10000, 100000], help='Comma separated benchmark sizes for the parser and judge (default: 1000,10000,100000)')
+    parser.add_argument('--report-rows', type=int, default=1000, help='Benchmark size for the reporters (default: 1000)')
+    parser.add_argument('--depth', type=int, default=3, help='Nesting depth of the synthetic multi_procedure trees (default: 3)')
+    parser.add_argument('--fanout', type=int, default=3, help='Steps per logic group in the multi_procedure trees (default: 3)')
+    parser.add_argument('--multi-every', type=int, default=10, help='Make every Nth row a multi_procedure check (default: 10)')
+    parser.add_argument('--evidence-bytes', type=int, default=2048, help='Size of the canned stdout of every check and step (default: 2048)')
+    parser.add_argument('--large-evidence-bytes', type=int, default=1 << 20, help='Size of the canned stdout for the large evidence case (default: 1 MiB)')
+    parser.add_argument('--large-evidence-rows', type=int, default=20, help='Checks in the large evidence case (default: 20)')
+    parser.add_argument('--log-records', type=int, default=20000, help='Log records to format (default: 20000)')
+    parser.add_argument('--fleet-hosts', type=int, default=500, help='Hosts in the fleet report case (default: 500)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per benchmark, the median is reported (default: 3)')
+    parser.add_argument('--only', action='append', default=[], metavar='NAME', help='Only run benchmarks whose name contains NAME (repeatable)')
+    parser.add_argument('-o', '--output', help='Where to save the JSON results (default: perf/results/microbench_<time>_<commit>.json)')
+    parser.add_argument('--compare', nargs='+', metavar='RESULTS', help='Compare against a saved run. With one file a new run is made first, with two files the saved runs are compared.')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Relative slowdown that counts as a regression (default: 0.10)')
+    args = parser.parse_args()
+
+    if args.compare and len(args.compare) > 2:
+        parser.error("--compare takes one or two result files")
+
+    if args.compare and len(args.compare) == 2:
+        new = load_results(args.compare[1])
+    else:
+        new = run_suite(args)
+        save_results(new, args.output)
+
+    if args.compare:
+        if compare(load_results(args.compare[0]), new, args.threshold):
+            print(f"\nSlower than the base by more than {args.threshold:.0%} in at least one benchmark.")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
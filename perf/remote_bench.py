@@ -0,0 +1,170 @@
+import argparse
+import copy
+import csv
+import datetime
+import logging
+import os
+import platform
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+# Add the parent directory to the path so we can import the auditor
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+from fake_ssh_server import CommandTable, FakeSSHServer, Faults
+from microbench import HEADER, Suite, benchmark_row, canned_text, compare, git_commit, load_results, save_results, size_list
+from handlers.fleet_handler import audit_remote_host
+from utils.csv_parser import CISBenchmarkParser
+from utils.remote_utils import RemoteExecutor
+
+# Remote throughput on one box: the auditor talks to fake_ssh_server.FakeSSHServer
+# through a link with the given round-trip time. Measures connection set-up, channels
+# per second and the wall time of a whole audit per execution mode.
+
+MODES = {
+    "plain": {},
+    "batch": {"batch_size": 16},
+    "shell": {"persistent_shell": True},
+}
+SCRIPT_ROW = ("check_sysctl.sh", ['net.ipv4.ip_forward', '0'])
+
+
+def write_remote_benchmark(path: str, rows: int):
+    # small multi_procedure trees and a few execute_script rows, so bundles and uploads are exercised
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for index in range(rows):
+            row = benchmark_row(index, depth=2, fanout=3, multi_every=5)
+            if index % 10 == 7:
+                row[5:8] = ["execute_script", SCRIPT_ROW[0], repr(SCRIPT_ROW[1])]
+            writer.writerow(row)
+
+
+def build_table(evidence_bytes: int) -> CommandTable:
+    table = CommandTable(default=(canned_text(evidence_bytes) + "\n", "", 0))
+    table.add("true", ("", "", 0))
+    return table
+
+
+def new_executor(server: FakeSSHServer, args, mode: str) -> RemoteExecutor:
+    return RemoteExecutor("127.0.0.1", server.port, server.username, password=server.password,
+                          max_channels=args.max_channels, retries=args.retries, **MODES[mode])
+
+
+def channel_rate(executor: RemoteExecutor, channels: int, workers: int):
+    # every call opens its own exec channel
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(lambda _: executor.execute("true", retry=False), range(channels)))
+
+
+def run_rtt(suite: Suite, args, rtt: int, tasks, audit_args):
+    faults = Faults(args.drop_every, args.fail_rate, seed=1) if args.drop_every or args.fail_rate else None
+    with FakeSSHServer(build_table(args.evidence_bytes), sandbox=args.sandbox, rtt=rtt / 1000.0,
+                       bandwidth=args.bandwidth, faults=faults) as server:
+        executor = new_executor(server, args, "plain")
+
+        def connect():
+            if not executor.connect():
+                raise ConnectionError("Could not connect to the fake SSH server")
+            executor.disconnect()
+        suite.bench(f"connect[rtt={rtt}ms]", connect, 1)
+
+        executor.connect()
+        suite.bench(f"channels[rtt={rtt}ms,workers={args.workers}]",
+                    lambda: channel_rate(executor, args.channels, args.workers), args.channels)
+        executor.disconnect()
+
+        for mode in args.modes:
+            executor = new_executor(server, args, mode)
+            if not executor.connect():
+                raise ConnectionError("Could not connect to the fake SSH server")
+            # one connection for every repeat, set-up is measured on its own above
+            suite.bench(f"audit[mode={mode},rtt={rtt}ms,workers={args.workers}]",
+                        lambda: audit_remote_host(executor, copy.deepcopy(tasks), audit_args, keep_connection=True),
+                        len(tasks))
+            if executor.stats["reconnects"] or executor.stats["retries"]:
+                print(f"    {mode}: {executor.stats['reconnects']} reconnects, {executor.stats['retries']} retries")
+            executor.disconnect()
+        print(f"    server: {server.stats}")
+
+
+def run_suite(args) -> Dict[str, Any]:
+    suite = Suite(args.repeat, args.only)
+    audit_args = argparse.Namespace(agent=False, workers=args.workers, parallel_steps=None, loglevel='WARNING')
+    print(f"Running remote benchmarks ({args.repeat} runs each, median shown)")
+    with tempfile.TemporaryDirectory(prefix="cis_remote_bench_") as work_dir:
+        csv_path = os.path.join(work_dir, "remote_benchmark.csv")
+        write_remote_benchmark(csv_path, args.rows)
+        tasks = CISBenchmarkParser(csv_path).parse_csv()
+        for rtt in args.rtt:
+            run_rtt(suite, args, rtt, tasks, audit_args)
+
+    return {
+        **git_commit(),
+        "created": datetime.datetime.now().isoformat(timespec='seconds'),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {name: getattr(args, name) for name in ("rtt", "bandwidth", "rows", "modes", "workers", "max_channels", "channels",
+                                                           "evidence_bytes", "sandbox", "drop_every", "fail_rate", "repeat")},
+        "results": suite.results,
+    }
+
+
+def mode_list(value: str) -> List[str]:
+    modes = [part.strip() for part in value.split(',') if part.strip()]
+    unknown = [mode for mode in modes if mode not in MODES]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown modes {unknown}, choose from {', '.join(MODES)}")
+    return modes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Remote path benchmarks against an in-process SSH server with emulated latency.")
+    parser.add_argument('--rtt', type=size_list, default=[0, 50, 150, 300], help='Comma separated round-trip times in ms (default: 0,50,150,300)')
+    parser.add_argument('--bandwidth', type=int, help='Link bandwidth in bytes per second (default: unlimited)')
+    parser.add_argument('--rows', type=int, default=60, help='Checks in the synthetic benchmark (default: 60)')
+    parser.add_argument('--modes', type=mode_list, default=list(MODES), help=f"Execution modes to audit with (default: {','.join(MODES)})")
+    parser.add_argument('--workers', type=int, default=4, help='Concurrent checks, like --workers of the auditor (default: 4)')
+    parser.add_argument('--max-channels', type=int, default=8, help='SSH channels open at once (default: 8)')
+    parser.add_argument('--channels', type=int, default=100, help='Channels opened in the channel throughput case (default: 100)')
+    parser.add_argument('--evidence-bytes', type=int, default=512, help='Size of the canned output of every command (default: 512)')
+    parser.add_argument('--sandbox', action='store_true', help='Run the commands for real on this machine instead of answering from the table')
+    parser.add_argument('--drop-every', type=int, default=0, help='Drop the connection instead of answering every Nth command')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='Share of commands whose channel closes without an exit status')
+    parser.add_argument('--retries', type=int, default=2, help='Retries of the executor after a dropped connection (default: 2)')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per benchmark, the median is reported (default: 1)')
+    parser.add_argument('--only', action='append', default=[], metavar='NAME', help='Only run benchmarks whose name contains NAME (repeatable)')
+    parser.add_argument('-o', '--output', help='Where to save the JSON results (default: perf/results/remote_bench_<time>_<commit>.json)')
+    parser.add_argument('--compare', nargs='+', metavar='RESULTS', help='Compare against a saved run. With one file a new run is made first, with two files the saved runs are compared.')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Relative slowdown that counts as a regression (default: 0.10)')
+    args = parser.parse_args()
+
+    if args.compare and len(args.compare) > 2:
+        parser.error("--compare takes one or two result files")
+    # paths given on the command line are relative to where it was started
+    if args.output:
+        args.output = os.path.abspath(args.output)
+    args.compare = [os.path.abspath(path) for path in args.compare or []]
+
+    if args.compare and len(args.compare) == 2:
+        new = load_results(args.compare[1])
+    else:
+        # check handlers and script bundles use paths relative to the project
+        os.chdir(ROOT_DIR)
+        # the audit logs every check, only the timings are of interest here
+        logging.getLogger().addHandler(logging.NullHandler())
+        new = run_suite(args)
+        save_results(new, args.output, prefix="remote_bench")
+
+    if args.compare:
+        if compare(load_results(args.compare[0]), new, args.threshold):
+            print(f"\nSlower than the base by more than {args.threshold:.0%} in at least one benchmark.")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import os
+import re
+from typing import List, Optional, Tuple
+from audit_task import AuditTask
+from .cost_history import CostHistory
+from .script_bundle import SCRIPTS_DIR, referenced_scripts
+
+# Quick scans with --budget 60s: picks the checks that fit in the time budget by their
+# recorded durations (reports/cost_history.json) and runs the most important ones first.
+# Everything left out is reported as NOT_RUN.
+
+NOT_RUN = "NOT_RUN"
+
+# lower runs first, domains not listed sit in the middle
+DOMAIN_SEVERITY = {
+    "Access Control": 0,
+    "Host Based Firewall": 0,
+    "Network Configuration": 0,
+    "Services": 1,
+    "Initial Setup": 1,
+    "Logging and Auditing": 2,
+    "System Maintenance": 2,
+}
+DEFAULT_SEVERITY = 1
+
+# a find over whole mounts or home directories takes minutes on a big filesystem,
+# whatever a small test host recorded for it
+FILESYSTEM_WALK = re.compile(r"\bfind\b[^\n;|]*-xdev")
+
+
+def parse_budget(spec: str) -> float:
+    # "60s", "2m", "1h" or plain seconds
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([smh]?)\s*", str(spec))
+    if not match or float(match.group(1)) <= 0:
+        raise ValueError(f"Invalid budget '{spec}', expected a duration like 60s, 2m or 1h")
+    return float(match.group(1)) * {"": 1, "s": 1, "m": 60, "h": 3600}[match.group(2)]
+
+
+def level_rank(level: str) -> int:
+    digits = re.sub(r"\D", "", str(level or ""))
+    return int(digits) if digits else 99
+
+
+def is_filesystem_walk(task: AuditTask, scripts_dir: str = SCRIPTS_DIR) -> bool:
+    params = task.parameters if isinstance(task.parameters, dict) else {}
+    if task.check_type == "file_mode" and params.get("recursive"):
+        return True
+    if FILESYSTEM_WALK.search(f"{task.target} {task.parameters}"):
+        return True
+    for name in referenced_scripts([task]):
+        try:
+            with open(os.path.join(scripts_dir, name), 'r', encoding='utf-8', errors='replace') as f:
+                if FILESYSTEM_WALK.search(f.read()):
+                    return True
+        except OSError:
+            continue
+    return False
+
+
+def mark_not_run(task: AuditTask, reason: str) -> AuditTask:
+    task.status = NOT_RUN
+    task.final_result = {"overall_status": NOT_RUN, "type": "action_node", "title": task.title, "details": {"reason": reason}}
+    return task
+
+
+def plan_budget(tasks: List[AuditTask], budget: float, workers: int = 1,
+                history: Optional[CostHistory] = None) -> Tuple[List[AuditTask], List[AuditTask]]:
+    history = history or CostHistory.load()
+    default = history.default_cost()
+    costs = {task.id: history.estimate(task.id) or default for task in tasks}
+    label = f"{budget:g}s"
+
+    # most important first, cheapest first inside the same importance so more checks fit
+    ranked = sorted(tasks, key=lambda t: (level_rank(t.level), DOMAIN_SEVERITY.get(t.domain, DEFAULT_SEVERITY), costs[t.id], t.id))
+    loads = [0.0] * max(workers, 1)
+    chosen, skipped = [], []
+    for task in ranked:
+        cost = costs[task.id]
+        if is_filesystem_walk(task):
+            skipped.append(mark_not_run(task, f"Skipped by --budget {label}: walks the filesystem (estimated {cost:.1f}s)"))
+            continue
+        # the same expected finish time as running them on the worker pool in this order
+        slot = min(range(len(loads)), key=lambda s: (loads[s], s))
+        if loads[slot] + cost > budget:
+            skipped.append(mark_not_run(task, f"Skipped by --budget {label}: does not fit in the budget (estimated {cost:.1f}s)"))
+            continue
+        loads[slot] += cost
+        chosen.append(task)
+    return chosen, skipped
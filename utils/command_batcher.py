@@ -0,0 +1,81 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Tuple
+
+# Commands submitted by concurrent workers within a short window are sent to the
+# host as one framed script, and each caller gets back only its own result.
+# Latency then grows with the number of batches, not the number of commands.
+
+
+class CommandBatcher:
+    def __init__(self, run_batch: Callable[[List[str], int], List[Tuple[str, str, int]]],
+                 max_batch: int = 16, window: float = 0.005, parallel: int = 4):
+        self.run_batch = run_batch
+        self.max_batch = max(1, max_batch)
+        self.window = window
+        self.pending = []
+        self.closed = False
+        self.cond = threading.Condition()
+        self.thread = None
+        self.pool = ThreadPoolExecutor(max_workers=max(1, parallel))
+        self.batches_sent = 0
+        self.commands_sent = 0
+        self.logger = logging.getLogger(__name__)
+
+    def submit(self, command: str, timeout: int = 30) -> Tuple[str, str, int]:
+        future = Future()
+        with self.cond:
+            if self.closed:
+                raise RuntimeError("Command batcher is closed")
+            self.pending.append((command, timeout, future))
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.collect, name="command-batcher", daemon=True)
+                self.thread.start()
+            self.cond.notify_all()
+        return future.result()
+
+    def collect(self):
+        while True:
+            with self.cond:
+                while not self.pending and not self.closed:
+                    self.cond.wait()
+                if not self.pending:
+                    return
+
+                # give the other workers a moment to queue their commands
+                deadline = time.monotonic() + self.window
+                while len(self.pending) < self.max_batch and not self.closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.cond.wait(remaining)
+
+                batch, self.pending = self.pending[:self.max_batch], self.pending[self.max_batch:]
+            self.pool.submit(self.dispatch, batch)
+
+    def dispatch(self, batch):
+        commands = [command for command, _, _ in batch]
+        # worst case every command in the batch runs up to its own timeout
+        timeout = sum(timeout for _, timeout, _ in batch)
+        try:
+            results = self.run_batch(commands, timeout)
+        except Exception as e:
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+
+        self.batches_sent += 1
+        self.commands_sent += len(batch)
+        self.logger.debug(f"Batch of {len(batch)} commands completed")
+        for (_, _, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+        self.pool.shutdown(wait=True)
@@ -14,6 +14,7 @@ class ConsoleReporter:
         self.pass_count = self._count_by_status("PASS")
         self.fail_count = self._count_by_status("FAIL") 
         self.error_count = self._count_by_status("ERROR")
+        self.not_run_count = self._count_by_status("NOT_RUN")
     
     def _count_by_status(self, status: str) -> int:
         # Create a temporary formatter just for counting
@@ -35,11 +36,15 @@ class ConsoleReporter:
     def _print_summary_header(self):
         print("\n" + Colors.BOLD + "="*25 + " AUDIT SUMMARY " + "="*25 + Colors.ENDC)
         print(f"Report Time: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print(f"Total Checks Run: {len(self.tasks)}")
+        print(f"Total Checks Run: {len(self.tasks) - self.not_run_count}")
         
         results_line = (f"RESULTS: {Colors.OKGREEN}{self.pass_count} Passed{Colors.ENDC}, "
                        f"{Colors.FAIL}{self.fail_count} Failed{Colors.ENDC}, "
-                       f"{Colors.WARNING}{self.error_count} Errored{Colors.ENDC}.")
+                       f"{Colors.WARNING}{self.error_count} Errored{Colors.ENDC}")
+        if self.not_run_count:
+            results_line += f", {Colors.WARNING}{self.not_run_count} Not Run{Colors.ENDC}"
+        results_line += "."
+
         print(Colors.BOLD + results_line + Colors.ENDC)
         print(f"{Colors.BOLD}="*67 + Colors.ENDC)
     
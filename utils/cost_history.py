@@ -0,0 +1,90 @@
+import fcntl
+import hashlib
+import json
+import os
+import statistics
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from audit_task import AuditTask
+
+# How long each check took in earlier runs, as a moving average of its wall time per check ID.
+# Every finished run updates reports/cost_history.json; --shard-costs balances shards with it.
+
+DEFAULT_HISTORY = os.path.join("reports", "cost_history.json")
+# weight of the newest run, older runs fade out
+SMOOTHING = 0.3
+# fleet hosts finish on different threads, each update must see the previous one
+update_lock = threading.Lock()
+
+
+@contextmanager
+def history_lock(path: str):
+    # shards on one machine are separate processes, the thread lock alone loses their updates
+    with update_lock:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(f"{path}.lock", 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+
+class CostHistory:
+
+    def __init__(self, path: str = DEFAULT_HISTORY):
+        self.path = path
+        self.costs: Dict[str, float] = {}
+        # of the file as read, shards split with different contents do not fit together
+        self.digest: Optional[str] = None
+        self.lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_HISTORY) -> "CostHistory":
+        history = cls(path)
+        try:
+            with open(path, 'rb') as f:
+                raw = f.read()
+            history.digest = hashlib.sha256(raw).hexdigest()[:16]
+            history.costs = {str(k): float(v) for k, v in json.loads(raw.decode('utf-8')).get("costs", {}).items()}
+        except (OSError, ValueError, AttributeError):
+            # no history yet, or an unreadable one, every check then costs the same
+            pass
+        return history
+
+    def record(self, tasks: List[AuditTask]):
+        with self.lock:
+            for task in tasks:
+                duration = (task.metrics or {}).get("wall_time")
+                if duration is None:
+                    continue
+                previous = self.costs.get(task.id)
+                self.costs[task.id] = round(duration if previous is None else SMOOTHING * duration + (1 - SMOOTHING) * previous, 4)
+
+    def estimate(self, task_id: str) -> Optional[float]:
+        return self.costs.get(task_id)
+
+    def default_cost(self) -> float:
+        # a check never seen before is assumed to be a typical one
+        return statistics.median(self.costs.values()) if self.costs else 1.0
+
+    def save(self):
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = os.path.join(directory, f".{os.path.basename(self.path)}.{os.getpid()}.tmp")
+        try:
+            with self.lock:
+                document = {"costs": dict(sorted(self.costs.items()))}
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(document, f, indent=1)
+            # concurrent runs (shards on one machine) replace the file whole, never half written
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"ERROR: Could not write cost history. Reason: {e}")
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+
+def record_costs(tasks: List[AuditTask], path: str = DEFAULT_HISTORY):
+    with history_lock(path):
+        history = CostHistory.load(path)
+        history.record(tasks)
+        history.save()
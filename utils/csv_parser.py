@@ -59,8 +59,10 @@ class CISBenchmarkParser:
         return tasks
 
     def filter_csv(self, level=None, profile=None, domain=None, task_id=None) -> List[AuditTask]:
-        all_tasks = self.parse_csv()
+        return self.filter_tasks(self.parse_csv(), level, profile, domain, task_id)
 
+    @staticmethod
+    def filter_tasks(all_tasks: List[AuditTask], level=None, profile=None, domain=None, task_id=None) -> List[AuditTask]:
         tasks_to_run = all_tasks
         if level: 
             tasks_to_run = [t for t in tasks_to_run if t.level == level]
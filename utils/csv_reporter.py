@@ -8,20 +8,21 @@ from .report_formatters import TaskFormatter
 
 class CSVReporter:
     
-    def __init__(self, tasks: List[AuditTask], session_id: str):
+    def __init__(self, tasks: List[AuditTask], session_id: str, report_dir: str = "reports"):
         self.tasks = tasks
         self.session_id = session_id
+        self.report_dir = report_dir
         parts = session_id.split('_')
         self.timestamp = f"{parts[0]}_{parts[1]}"  # YYYYMMDD_HHMMSS
         self.audit_id = parts[2] if len(parts) > 2 else "unknown"
         self.task_formatter = TaskFormatter()
     
     def generate_csv_report(self):
-        report_dir = "reports"
+        report_dir = self.report_dir
         os.makedirs(report_dir, exist_ok=True)
         report_filename = f"audit_report_{self.session_id}.csv"
         report_path = os.path.join(report_dir, report_filename)
-        headers = ['ID', 'Title', 'Result', 'Details']
+        headers = ['ID', 'Title', 'Result', 'Duration_s', 'Child_CPU_s', 'Commands', 'Round_Trips', 'Evidence_Bytes', 'Cached', 'Details']
         
         try:
             with open(report_path, 'w', newline='', encoding='utf-8') as csvfile:
@@ -33,10 +34,17 @@ class CSVReporter:
                     if isinstance(task.final_result, dict):
                         details = str(task.final_result)
                         
+                    metrics = task.metrics or {}
                     writer.writerow({
                         'ID': task.id,
                         'Title': task.title,
                         'Result': status,
+                        'Duration_s': metrics.get('wall_time', ''),
+                        'Child_CPU_s': metrics.get('child_cpu', ''),
+                        'Commands': metrics.get('commands', ''),
+                        'Round_Trips': metrics.get('round_trips', ''),
+                        'Evidence_Bytes': metrics.get('evidence_bytes', ''),
+                        'Cached': metrics.get('cached', ''),
                         'Details': details
                     })
             print(f"Detailed CSV report saved to '{report_path}'")
@@ -45,9 +53,10 @@ class CSVReporter:
 
 
 class LegacyReporter:
-    def __init__(self, tasks: List[AuditTask], session_id: str):
+    def __init__(self, tasks: List[AuditTask], session_id: str, report_dir: str = "reports"):
         self.tasks = tasks
         self.session_id = session_id
+        self.report_dir = report_dir
         # Extract timestamp and audit ID from session_id
         parts = session_id.split('_')
         self.timestamp = f"{parts[0]}_{parts[1]}"  # YYYYMMDD_HHMMSS
@@ -58,9 +67,10 @@ class LegacyReporter:
         self.pass_count = len([t for t in tasks if self.task_formatter.get_task_status(t) == "PASS"])
         self.fail_count = len([t for t in tasks if self.task_formatter.get_task_status(t) == "FAIL"])
         self.error_count = len([t for t in tasks if self.task_formatter.get_task_status(t) == "ERROR"])
+        self.not_run_count = len([t for t in tasks if self.task_formatter.get_task_status(t) == "NOT_RUN"])
     
     def generate_legacy_summary_file(self, show_all: bool = False):
-        report_dir = "reports"
+        report_dir = self.report_dir
         os.makedirs(report_dir, exist_ok=True)
         file_report_path = os.path.join(report_dir, "audit_summary_report.txt")
         
@@ -68,8 +78,9 @@ class LegacyReporter:
             with open(file_report_path, 'w', encoding='utf-8') as f:
                 f.write("="*25 + " AUDIT SUMMARY " + "="*25 + "\n")
                 f.write(f"Report Time: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                f.write(f"Total Checks Run: {len(self.tasks)}\n")
-                f.write(f"RESULTS: {self.pass_count} Passed, {self.fail_count} Failed, {self.error_count} Errored.\n")
+                f.write(f"Total Checks Run: {len(self.tasks) - self.not_run_count}\n")
+                not_run = f", {self.not_run_count} Not Run" if self.not_run_count else ""
+                f.write(f"RESULTS: {self.pass_count} Passed, {self.fail_count} Failed, {self.error_count} Errored{not_run}.\n")
                 f.write("="*67 + "\n\n")
                 
                 f.write("DETAILS FOR ALL CHECKS:\n\n")  # Always show all in file
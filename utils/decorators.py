@@ -3,12 +3,12 @@ import logging
 from functools import wraps
 
 def debug_wrapper(func):
+    logger = logging.getLogger()
+
     @wraps(func)
     def wrapper(*args, **kwargs):
-        logger = logging.getLogger()
-        
-        # Only run the detailed logging if the level is DEBUG
-        if logger.getEffectiveLevel() == logging.DEBUG:
+        # Only run the detailed logging if the level is DEBUG (isEnabledFor is cached by the logger)
+        if logger.isEnabledFor(logging.DEBUG):
             handler_name = func.__module__.split('.')[-1]
             target = args[0] if args else "N/A"
             params = args[1] if len(args) > 1 else "N/A"
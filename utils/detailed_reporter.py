@@ -7,23 +7,25 @@ from .report_formatters import TaskFormatter
 
 class DetailedReporter:
     
-    def __init__(self, tasks: List[AuditTask], session_id: str):
+    def __init__(self, tasks: List[AuditTask], session_id: str, report_dir: str = "reports"):
         self.tasks = tasks
         self.session_id = session_id
+        self.report_dir = report_dir
         parts = session_id.split('_')
         self.timestamp = f"{parts[0]}_{parts[1]}"  # YYYYMMDD_HHMMSS
         self.audit_id = parts[2] if len(parts) > 2 else "unknown"
         self.task_formatter = TaskFormatter()
     
     def gen_detailed_reports(self):
-        details_base_dir = "reports/details"
+        details_base_dir = os.path.join(self.report_dir, "details")
         os.makedirs(details_base_dir, exist_ok=True)
         
         passed_tasks = [t for t in self.tasks if self.task_formatter.get_task_status(t) == "PASS"]
         failed_tasks = [t for t in self.tasks if self.task_formatter.get_task_status(t) == "FAIL"]
         error_tasks = [t for t in self.tasks if self.task_formatter.get_task_status(t) == "ERROR"]
+        not_run_tasks = [t for t in self.tasks if self.task_formatter.get_task_status(t) == "NOT_RUN"]
         
-        self.details_index(details_base_dir, passed_tasks, failed_tasks, error_tasks)
+        self.details_index(details_base_dir, passed_tasks, failed_tasks, error_tasks, not_run_tasks)
         
         if passed_tasks:
             self.status_report("PASS", passed_tasks, details_base_dir)
@@ -31,8 +33,11 @@ class DetailedReporter:
             self.status_report("FAIL", failed_tasks, details_base_dir)
         if error_tasks:
             self.status_report("ERROR", error_tasks, details_base_dir)
+        if not_run_tasks:
+            self.status_report("NOT_RUN", not_run_tasks, details_base_dir)
     
-    def details_index(self, base_dir: str, passed_tasks: List[AuditTask], failed_tasks: List[AuditTask], error_tasks: List[AuditTask]):
+    def details_index(self, base_dir: str, passed_tasks: List[AuditTask], failed_tasks: List[AuditTask], error_tasks: List[AuditTask],
+                      not_run_tasks: List[AuditTask] = ()):
         index_filename = f"audit_details_index_{self.session_id}.txt"
         index_path = os.path.join(base_dir, index_filename)
         
@@ -41,7 +46,7 @@ class DetailedReporter:
                 f.write("="*25 + " DETAILED AUDIT EVIDENCE INDEX " + "="*25 + "\n")
                 f.write(f"Audit Session ID: {self.session_id}\n")
                 f.write(f"Report Time: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                f.write(f"Total Checks Run: {len(self.tasks)}\n")
+                f.write(f"Total Checks Run: {len(self.tasks) - len(not_run_tasks)}\n")
                 f.write("="*78 + "\n\n")
                 
                 f.write("EVIDENCE REPORTS BY STATUS:\n")
@@ -62,6 +67,11 @@ class DetailedReporter:
                     f.write(f"   File: audit_error_{self.session_id}_{len(error_tasks)}_checks.txt\n")
                     f.write(f"   Status: Checks that encountered errors\n\n")
                 
+                if not_run_tasks:
+                    f.write(f"NOT_RUN Folder: {len(not_run_tasks)} checks\n")
+                    f.write(f"   File: audit_not_run_{self.session_id}_{len(not_run_tasks)}_checks.txt\n")
+                    f.write(f"   Status: Checks left out of a --budget run\n\n")
+                
                 f.write("NAVIGATION GUIDE:\n")
                 f.write("-" * 20 + "\n")
                 f.write("• Open the folder corresponding to the status you want to investigate\n")
@@ -75,14 +85,15 @@ class DetailedReporter:
                 for task in self.tasks:
                     domain = task.domain or "General"
                     if domain not in domains:
-                        domains[domain] = {"PASS": 0, "FAIL": 0, "ERROR": 0}
+                        domains[domain] = {"PASS": 0, "FAIL": 0, "ERROR": 0, "NOT_RUN": 0}
                     status = self.task_formatter.get_task_status(task)
                     if status in domains[domain]:
                         domains[domain][status] += 1
                 
                 for domain, results in domains.items():
                     total = sum(results.values())
-                    f.write(f"{domain}: {results['PASS']} Pass, {results['FAIL']} Fail, {results['ERROR']} Error (Total: {total})\n")
+                    not_run = f", {results['NOT_RUN']} Not Run" if results['NOT_RUN'] else ""
+                    f.write(f"{domain}: {results['PASS']} Pass, {results['FAIL']} Fail, {results['ERROR']} Error{not_run} (Total: {total})\n")
             
             print(f"Details index created at '{index_path}'")
             
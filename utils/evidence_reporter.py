@@ -0,0 +1,54 @@
+import glob
+import gzip
+import json
+import os
+from typing import Any, Dict, List, Tuple
+from audit_task import AuditTask
+
+# The raw evidence of a run (every task with its actual_output, multi_procedure evidence
+# trees included) as one gzip'd JSON document, so the run can be judged again later with
+# --reevaluate without executing anything.
+
+
+class EvidenceReporter:
+
+    def __init__(self, tasks: List[AuditTask], session_id: str, report_dir: str = "reports", meta: Dict[str, Any] = None):
+        self.tasks = tasks
+        self.session_id = session_id
+        self.report_dir = report_dir
+        self.meta = meta or {}
+
+    def generate_evidence_file(self) -> str:
+        evidence_dir = os.path.join(self.report_dir, "evidence")
+        os.makedirs(evidence_dir, exist_ok=True)
+        evidence_path = os.path.join(evidence_dir, f"audit_evidence_{self.session_id}.json.gz")
+
+        document = {"meta": {"session_id": self.session_id, **self.meta}, "tasks": [task.to_dict() for task in self.tasks]}
+        try:
+            with gzip.open(evidence_path, 'wt', encoding='utf-8') as f:
+                json.dump(document, f, default=str)
+            print(f"Evidence saved to '{evidence_path}'")
+        except Exception as e:
+            print(f"ERROR: Could not write evidence file. Reason: {e}")
+        return evidence_path
+
+    @staticmethod
+    def load(evidence_path: str) -> Tuple[List[AuditTask], Dict[str, Any]]:
+        with gzip.open(evidence_path, 'rt', encoding='utf-8') as f:
+            document = json.load(f)
+        return [AuditTask.from_dict(t) for t in document.get("tasks", [])], document.get("meta", {})
+
+    @staticmethod
+    def find(session_id: str, report_dir: str = "reports") -> List[str]:
+        # a single host run keeps it in reports/evidence/, a fleet run in every host directory
+        pattern = os.path.join(report_dir, "**", f"audit_evidence_{session_id}.json.gz")
+        return sorted(glob.glob(pattern, recursive=True))
+
+
+def is_fleet_evidence(evidence_path: str, report_dir: str = "reports") -> bool:
+    return os.path.normpath(os.path.dirname(evidence_path)) != os.path.normpath(os.path.join(report_dir, "evidence"))
+
+
+def host_folder(evidence_path: str) -> str:
+    # reports/fleet_<session>/<host>/evidence/audit_evidence_<session>.json.gz
+    return os.path.basename(os.path.dirname(os.path.dirname(evidence_path)))
@@ -1,10 +1,23 @@
 import subprocess
 import re
-from typing import Dict, Optional
-from utils.remote_utils import RemoteExecutor
+import shlex
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, Optional, TYPE_CHECKING
+from utils.local_shell import LocalShellPool
+from utils.metrics import record_connection_error, track_command
+from utils.tracing import span
+
+# only needed for annotations, so handlers can run where paramiko is not installed (remote agent)
+if TYPE_CHECKING:
+    from utils.remote_utils import RemoteExecutor
 
 # variable to hold remote executor when doing remote audits
-remo_runner: Optional[RemoteExecutor] = None
+remo_runner: Optional["RemoteExecutor"] = None
+# per host executor for fleet audits, takes priority over the process wide one above
+remo_context: contextvars.ContextVar = contextvars.ContextVar('remo_context', default=None)
+# pre-started bash workers for local commands (--local-shells), None runs every command in a new shell
+local_shells: Optional[LocalShellPool] = None
 
 # def reformat_output(output: str) -> str:
 #     if not output:
@@ -14,30 +27,66 @@ remo_runner: Optional[RemoteExecutor] = None
     
 #     return cleaned.strip()
 
-def set_remote_executor(executor: RemoteExecutor):
+def set_remote_executor(executor: "RemoteExecutor"):
     global remo_runner
     remo_runner = executor
 
+def set_local_shells(pool: Optional[LocalShellPool]):
+    global local_shells
+    local_shells = pool
+
 def cls_remo_runner():
     global remo_runner
     remo_runner = None
 
-def call_remo_runner() -> Optional[RemoteExecutor]:
+@contextmanager
+def bind_remote_executor(executor: "RemoteExecutor"):
+    token = remo_context.set(executor)
+    try:
+        yield executor
+    finally:
+        remo_context.reset(token)
+
+def call_remo_runner() -> Optional["RemoteExecutor"]:
     global remo_runner
-    return remo_runner
+    return remo_context.get() or remo_runner
 
 def switch_mode() -> bool:
-    global remo_runner
-    return remo_runner is not None
+    return call_remo_runner() is not None
+
+def submit_in_context(pool, func, *args):
+    # worker threads do not inherit context variables, so each job carries a copy of the caller's
+    return pool.submit(contextvars.copy_context().run, func, *args)
+
+class ShellOutput:
+    def __init__(self, stdout, stderr, returncode):
+        self.stdout = stdout
+        self.stderr = stderr
+        self.returncode = returncode
 
 def execute_command(command, shell=True, capture_output=True, text=True, check=False) -> subprocess.CompletedProcess:
-    global remo_runner
+    remo_runner = call_remo_runner()
     
     if remo_runner is None:
         if isinstance(command, list):
-            result = subprocess.run(command, shell=shell, capture_output=capture_output, text=text, check=check)
-        else:
-            result = subprocess.run(command, shell=shell, capture_output=capture_output, text=text, check=check)
+            # with shell=True only the first item is the command, the rest would become $0, $1...
+            # so quote the arguments into one command line; a single item is a command line already
+            if shell:
+                command = shlex.join(command) if len(command) > 1 else command[0]
+
+        with track_command(), span("local command", "command", command=str(command)[:200]):
+            output = None
+            # the CPU time of commands run by a worker is not in RUSAGE_CHILDREN
+            if local_shells and shell and capture_output and text:
+                output = local_shells.run(command)
+            if output is not None:
+                result = subprocess.CompletedProcess(command, output[2], output[0], output[1])
+                if check:
+                    result.check_returncode()
+            else:
+                # bash like the --local-shells workers and remote hosts, /bin/sh (dash) parses rows like `&>` differently
+                result = subprocess.run(command, shell=shell, executable='/bin/bash' if shell else None,
+                                        capture_output=capture_output, text=text, check=check)
         
         # result.stdout = reformat_output(result.stdout) if result.stdout else ""
         # result.stderr = reformat_output(result.stderr) if result.stderr else ""
@@ -55,26 +104,19 @@ def execute_command(command, shell=True, capture_output=True, text=True, check=F
             if not command_str.strip().startswith('sudo'):
                 command_str = f"sudo {command_str}"
             
-            stdout, stderr = remo_runner.run_command(command_str)
+            with track_command(remote=True), span("remote command", "command", command=command_str[:200]):
+                stdout, stderr, exit_status = remo_runner.execute(command_str, batch=True)
             
             # stdout = reformat_output(stdout)
             # stderr = reformat_output(stderr)
             
-            class ShellOutput:
-                def __init__(self, stdout, stderr, returncode):
-                    self.stdout = stdout
-                    self.stderr = stderr
-                    self.returncode = returncode
-            
+            # one policy for exec channels, the framed shell and batches, so the mode never changes a verdict;
+            # a missing command is a failure (1), not an ERROR (127)
             returncode = 0 if not stderr else 1
             
             return ShellOutput(stdout, stderr, returncode)
             
         except Exception as e:
-            class ShellOutput:
-                def __init__(self, stdout, stderr, returncode):
-                    self.stdout = stdout
-                    self.stderr = stderr
-                    self.returncode = returncode
-            
+            if remo_runner.connection_lost(e):
+                record_connection_error()
             return ShellOutput("", f"Remote execution error: {e}", 127)
@@ -0,0 +1,87 @@
+import csv
+import datetime
+import os
+from typing import Any, Dict, List
+from .report_formatters import Colors
+
+
+class FleetReporter:
+
+    def __init__(self, host_results: List[Dict[str, Any]], session_id: str, report_dir: str):
+        self.host_results = host_results
+        self.session_id = session_id
+        self.report_dir = report_dir
+
+        self.completed = [r for r in host_results if r["status"] == "COMPLETED"]
+        self.failed = [r for r in host_results if r["status"] != "COMPLETED"]
+        self.pass_count = sum(r["PASS"] for r in self.completed)
+        self.fail_count = sum(r["FAIL"] for r in self.completed)
+        self.error_count = sum(r["ERROR"] for r in self.completed)
+        self.reconnect_count = sum(r.get("reconnects", 0) for r in host_results)
+        self.retry_count = sum(r.get("retries", 0) for r in host_results)
+
+    def generate_fleet_report(self):
+        os.makedirs(self.report_dir, exist_ok=True)
+        self._write_summary_file()
+        self._write_csv_file()
+        self._print_console_summary()
+
+    def _write_summary_file(self):
+        summary_path = os.path.join(self.report_dir, f"fleet_summary_{self.session_id}.txt")
+        try:
+            with open(summary_path, 'w', encoding='utf-8') as f:
+                f.write("="*25 + " FLEET AUDIT SUMMARY " + "="*25 + "\n")
+                f.write(f"Audit Session ID: {self.session_id}\n")
+                f.write(f"Report Time: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+                f.write(f"Hosts: {len(self.host_results)} ({len(self.completed)} audited, {len(self.failed)} failed)\n")
+                f.write(f"RESULTS: {self.pass_count} Passed, {self.fail_count} Failed, {self.error_count} Errored.\n")
+                f.write(f"CONNECTIONS: {self.reconnect_count} Reconnects, {self.retry_count} Retried Commands.\n")
+                f.write("="*71 + "\n\n")
+
+                f.write("RESULTS BY HOST:\n")
+                for r in sorted(self.host_results, key=lambda r: (r["status"] != "COMPLETED", -r["FAIL"], r["host"])):
+                    if r["status"] == "COMPLETED":
+                        f.write(f"  {r['host']}: {r['PASS']} Pass, {r['FAIL']} Fail, {r['ERROR']} Error (Total: {r['tasks']}, {r['duration']}s)")
+                        if r.get("reconnects") or r.get("retries"):
+                            f.write(f" [{r['reconnects']} reconnects, {r['retries']} retries]")
+                        f.write("\n")
+                    else:
+                        f.write(f"  {r['host']}: {r['status']} - {r['error']}\n")
+            print(f"Fleet summary saved to '{summary_path}'")
+        except Exception as e:
+            print(f"ERROR: Could not write fleet summary. Reason: {e}")
+
+    def _write_csv_file(self):
+        csv_path = os.path.join(self.report_dir, f"fleet_summary_{self.session_id}.csv")
+        headers = ['Host', 'Status', 'Checks', 'Pass', 'Fail', 'Error', 'Duration_s', 'Reconnects', 'Retries', 'Details']
+        try:
+            with open(csv_path, 'w', newline='', encoding='utf-8') as csvfile:
+                writer = csv.DictWriter(csvfile, fieldnames=headers)
+                writer.writeheader()
+                for r in self.host_results:
+                    writer.writerow({
+                        'Host': r['host'],
+                        'Status': r['status'],
+                        'Checks': r['tasks'],
+                        'Pass': r['PASS'],
+                        'Fail': r['FAIL'],
+                        'Error': r['ERROR'],
+                        'Duration_s': r['duration'],
+                        'Reconnects': r.get('reconnects', 0),
+                        'Retries': r.get('retries', 0),
+                        'Details': r['error']
+                    })
+            print(f"Fleet CSV saved to '{csv_path}'")
+        except Exception as e:
+            print(f"ERROR: Could not write fleet CSV. Reason: {e}")
+
+    def _print_console_summary(self):
+        print("\n" + Colors.BOLD + "="*25 + " FLEET AUDIT SUMMARY " + "="*25 + Colors.ENDC)
+        print(f"Hosts: {len(self.host_results)} ({len(self.completed)} audited, {Colors.FAIL}{len(self.failed)} failed{Colors.ENDC})")
+        results_line = (f"RESULTS: {Colors.OKGREEN}{self.pass_count} Passed{Colors.ENDC}, "
+                       f"{Colors.FAIL}{self.fail_count} Failed{Colors.ENDC}, "
+                       f"{Colors.WARNING}{self.error_count} Errored{Colors.ENDC}.")
+        print(Colors.BOLD + results_line + Colors.ENDC)
+        for r in self.failed:
+            print(f"  [{Colors.WARNING}{r['status']}{Colors.ENDC}] {r['host']} - {r['error']}")
+        print(f"{Colors.BOLD}="*71 + Colors.ENDC)
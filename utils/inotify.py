@@ -0,0 +1,80 @@
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+from typing import List, Optional, Tuple
+
+# Minimal inotify binding over libc, Linux only and no third-party package.
+
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# content, permission/owner and replace-by-rename changes; reads never trigger it
+WATCH_MASK = (IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+
+EVENT_HEADER = struct.Struct("iIII")
+
+InotifyEvent = Tuple[int, int, str]
+
+
+class Inotify:
+    def __init__(self):
+        libc_name = ctypes.util.find_library('c') or 'libc.so.6'
+        try:
+            self.libc = ctypes.CDLL(libc_name, use_errno=True)
+            self.libc.inotify_init1
+        except (OSError, AttributeError):
+            raise OSError("inotify is not available on this system (Linux only)")
+
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_init1 failed: {os.strerror(err)}")
+
+    def add_watch(self, path: str, mask: int = WATCH_MASK) -> int:
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), ctypes.c_uint32(mask))
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                raise OSError(err, "inotify watch limit reached, raise fs.inotify.max_user_watches")
+            return -1
+        return wd
+
+    def read_events(self, timeout: Optional[float] = None) -> List[InotifyEvent]:
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0").decode('utf-8', errors='replace')
+            offset += length
+            events.append((wd, mask, name))
+        return events
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
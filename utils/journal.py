@@ -0,0 +1,80 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, List, Tuple
+from audit_task import AuditTask
+
+# Checkpoint journal of a run: a header line, then one JSON line per finished check, written
+# and fsync'd as each check completes. After a crash, Ctrl-C or a dropped connection,
+# --resume <session> takes the finished checks from it and runs only the rest.
+
+
+def benchmark_meta(benchmark_file: str) -> Dict[str, Any]:
+    # finished results only fit a resumed run of the very same benchmark
+    with open(benchmark_file, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    return {"benchmark_file": os.path.abspath(benchmark_file), "benchmark_digest": digest}
+
+
+def journal_path(session_id: str, report_dir: str = "reports") -> str:
+    return os.path.join(report_dir, "journal", f"audit_journal_{session_id}.ndjson")
+
+
+class Journal:
+
+    def __init__(self, session_id: str, report_dir: str = "reports", meta: Dict[str, Any] = None):
+        self.path = journal_path(session_id, report_dir)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # results arrive from worker threads, lines must not interleave
+        self.lock = threading.Lock()
+        is_new = not os.path.exists(self.path)
+        self.file = open(self.path, 'a', encoding='utf-8')
+        if is_new:
+            self.append({"meta": {"session_id": session_id, **(meta or {})}})
+
+    def append(self, record: Dict[str, Any]):
+        line = json.dumps(record, default=str) + "\n"
+        with self.lock:
+            self.file.write(line)
+            self.file.flush()
+            # the point of the journal is to survive a kill right after this returns
+            os.fsync(self.file.fileno())
+
+    def write(self, task: AuditTask):
+        # an ERROR from a lost connection says nothing about the host, --resume runs the check again
+        if (task.metrics or {}).get("connection_errors"):
+            return
+        self.append({"task": task.to_dict()})
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+    @staticmethod
+    def load(session_id: str, report_dir: str = "reports") -> Tuple[List[AuditTask], Dict[str, Any]]:
+        path = journal_path(session_id, report_dir)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No journal found for session '{session_id}' ({path})")
+        meta: Dict[str, Any] = {}
+        tasks: Dict[str, AuditTask] = {}
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # the last line of a killed run can be cut off, that check simply runs again
+                    continue
+                if "meta" in record:
+                    meta = record["meta"]
+                elif "task" in record:
+                    task = AuditTask.from_dict(record["task"])
+                    tasks[task.id] = task
+        return list(tasks.values()), meta
+
+
+def resume_order(tasks: List[AuditTask], finished: List[AuditTask], completed: List[AuditTask]) -> List[AuditTask]:
+    # the reports list checks in benchmark order, however the two runs split them
+    by_id: Dict[str, AuditTask] = {task.id: task for task in finished}
+    by_id.update({task.id: task for task in completed})
+    return [by_id[task.id] for task in tasks if task.id in by_id]
@@ -0,0 +1,143 @@
+import glob
+import logging
+import os
+import re
+import select
+import subprocess
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from utils.shell_framing import FramedResult, new_token, frame_script, split_framed, stdout_marker, stderr_marker
+
+# Long-lived bash workers for local audits. A command is written to a worker's stdin
+# framed like the remote batches (utils/shell_framing.py), so it runs in a subshell of
+# an already started bash instead of a fresh /bin/sh started by Python. Workers are
+# replaced after max_commands commands or after anything goes wrong with them.
+
+FUNCTION_HEADER = re.compile(r"^(?:function\s+)?[A-Za-z_][\w-]*\s*(?:\(\s*\))?\s*\{?$")
+
+
+def is_library(path: str) -> bool:
+    # only files that define functions and run nothing at the top level can be sourced up front,
+    # the check scripts end with a call like `check_sysctl "$@"`
+    depth, functions = 0, 0
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return False
+    for line in lines:
+        stripped = line.strip()
+        if depth == 0 and stripped and not stripped.startswith('#') and stripped != '{':
+            if not FUNCTION_HEADER.match(stripped) or ('(' not in stripped and not stripped.startswith('function')):
+                return False
+            functions += 1
+        depth += stripped.count('{') - stripped.count('}')
+    return functions > 0 and depth == 0
+
+
+def library_scripts(scripts_dir: str) -> List[str]:
+    return [os.path.abspath(path) for path in sorted(glob.glob(os.path.join(scripts_dir, '*.sh'))) if is_library(path)]
+
+
+class LocalShell:
+    def __init__(self, libraries: List[str]):
+        self.libraries = libraries
+        self.process = subprocess.Popen(
+            ['bash', '--noprofile', '--norc'],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=0
+        )
+        self.commands_run = 0
+        preload = "".join(f". '{path}' >/dev/null 2>&1\n" for path in libraries)
+        if preload:
+            self.process.stdin.write(preload.encode())
+
+    @property
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def run_many(self, commands: List[str], timeout: Optional[float] = None) -> List[FramedResult]:
+        token = new_token()
+        last_out, last_err = stdout_marker(token, len(commands) - 1), stderr_marker(token, len(commands) - 1)
+        self.process.stdin.write(frame_script(commands, token).encode())
+
+        out_fd, err_fd = self.process.stdout.fileno(), self.process.stderr.fileno()
+        out_buf, err_buf = b"", b""
+        deadline = time.monotonic() + timeout if timeout else None
+        open_fds = [out_fd, err_fd]
+        while not (last_out.search(out_buf) and last_err.search(err_buf)):
+            if not open_fds:
+                raise ConnectionError("Local shell worker exited while running a command")
+            remaining = deadline - time.monotonic() if deadline else None
+            if remaining is not None and remaining <= 0:
+                raise TimeoutError("Timed out waiting for the local shell worker")
+            ready, _, _ = select.select(open_fds, [], [], remaining)
+            for fd in ready:
+                data = os.read(fd, 65536)
+                if not data:
+                    open_fds.remove(fd)
+                elif fd == out_fd:
+                    out_buf += data
+                else:
+                    err_buf += data
+
+        self.commands_run += len(commands)
+        return split_framed(out_buf, err_buf, token, len(commands))
+
+    def close(self):
+        if self.alive:
+            self.process.kill()
+        self.process.wait()
+        for stream in (self.process.stdin, self.process.stdout, self.process.stderr):
+            stream.close()
+
+
+class LocalShellPool:
+    def __init__(self, size: int, max_commands: int = 200, scripts_dir: str = "functions"):
+        self.size = max(1, size)
+        self.max_commands = max_commands
+        self.libraries = library_scripts(scripts_dir)
+        self.idle: List[LocalShell] = []
+        self.lock = threading.Lock()
+        self.restarts = 0
+        self.logger = logging.getLogger(__name__)
+        if self.libraries:
+            self.logger.debug(f"Local shell workers pre-source {len(self.libraries)} libraries")
+
+    def checkout(self) -> LocalShell:
+        with self.lock:
+            if self.idle:
+                return self.idle.pop()
+        # more concurrent callers than idle workers (--parallel-steps), start another one
+        return LocalShell(self.libraries)
+
+    def checkin(self, shell: LocalShell):
+        if shell.alive and shell.commands_run < self.max_commands:
+            with self.lock:
+                if len(self.idle) < self.size:
+                    self.idle.append(shell)
+                    return
+        shell.close()
+
+    def run(self, command: str, timeout: Optional[float] = None) -> Optional[Tuple[str, str, int]]:
+        # None means the worker failed, the caller runs the command the old way
+        shell = self.checkout()
+        try:
+            stdout, stderr, exit_code = shell.run_many([command], timeout)[0]
+        except (OSError, ConnectionError, TimeoutError) as e:
+            self.logger.debug(f"Local shell worker failed, starting a fresh one: {e}")
+            exit_code = None
+        if exit_code is None:
+            with self.lock:
+                self.restarts += 1
+            shell.close()
+            return None
+        self.checkin(shell)
+        return stdout, stderr, exit_code
+
+    def close(self):
+        with self.lock:
+            shells, self.idle = self.idle, []
+        for shell in shells:
+            shell.close()
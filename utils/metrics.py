@@ -0,0 +1,110 @@
+import contextvars
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+try:
+    import resource
+except ImportError:  # not on Windows, child CPU time is then reported as 0
+    resource = None
+
+# Per check (and per multi_procedure step) measurements. A collector is bound to the
+# running context, so commands are counted against the step and every level above it
+# without handlers passing anything around; pool jobs inherit it via submit_in_context.
+
+
+class Metrics:
+    def __init__(self, parent: Optional["Metrics"] = None):
+        self.parent = parent
+        self.wall_time = 0.0
+        self.child_cpu = 0.0
+        self.commands = 0
+        self.round_trips = 0
+        self.evidence_bytes = 0
+        self.cache_hits = 0
+        # remote commands that failed because the connection was gone, the verdict is not the host's
+        self.connection_errors = 0
+        # parallel steps report into the same parent
+        self.lock = threading.Lock()
+
+    def add(self, **counts):
+        node = self
+        while node is not None:
+            with node.lock:
+                for name, value in counts.items():
+                    setattr(node, name, getattr(node, name) + value)
+            node = node.parent
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "wall_time": round(self.wall_time, 4),
+            "child_cpu": round(self.child_cpu, 4),
+            "commands": self.commands,
+            "round_trips": self.round_trips,
+            "evidence_bytes": self.evidence_bytes,
+            "cache_hits": self.cache_hits,
+            "cached": self.cache_hits > 0,
+            "connection_errors": self.connection_errors,
+        }
+
+
+active_metrics: contextvars.ContextVar = contextvars.ContextVar('active_metrics', default=None)
+
+
+@contextmanager
+def measure():
+    metrics = Metrics(active_metrics.get())
+    token = active_metrics.set(metrics)
+    started = time.perf_counter()
+    try:
+        yield metrics
+    finally:
+        metrics.wall_time = time.perf_counter() - started
+        active_metrics.reset(token)
+
+
+def children_cpu() -> float:
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+@contextmanager
+def track_command(remote: bool = False):
+    metrics = active_metrics.get()
+    if metrics is None:
+        yield
+        return
+
+    # RUSAGE_CHILDREN is process wide, with --workers the CPU of children reaped by
+    # other threads in the same window can be counted here too
+    cpu_before = 0.0 if remote else children_cpu()
+    try:
+        yield
+    finally:
+        if remote:
+            metrics.add(commands=1, round_trips=1)
+        else:
+            metrics.add(commands=1, child_cpu=max(0.0, children_cpu() - cpu_before))
+
+
+def record_cache_hit():
+    metrics = active_metrics.get()
+    if metrics is not None:
+        metrics.add(cache_hits=1)
+
+
+def record_connection_error():
+    metrics = active_metrics.get()
+    if metrics is not None:
+        metrics.add(connection_errors=1)
+
+
+def evidence_size(value: Any) -> int:
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return len(str(value))
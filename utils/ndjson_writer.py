@@ -0,0 +1,32 @@
+import json
+import threading
+from typing import Any, Dict, TextIO
+from audit_task import AuditTask
+from .report_formatters import TaskFormatter
+
+
+def task_record(task: AuditTask, **extra) -> Dict[str, Any]:
+    # one flat line per finished check, the full evidence stays in the reports
+    record = {
+        "id": task.id,
+        "title": task.title,
+        "level": task.level,
+        "domain": task.domain,
+        "status": TaskFormatter().get_task_status(task),
+    }
+    record.update(extra)
+    return record
+
+
+class NDJSONWriter:
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        # results arrive from worker threads, a line must never be interleaved with another
+        self.lock = threading.Lock()
+
+    def write(self, record: Dict[str, Any]):
+        line = json.dumps(record, default=str) + "\n"
+        with self.lock:
+            self.stream.write(line)
+            self.stream.flush()
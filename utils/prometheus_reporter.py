@@ -0,0 +1,112 @@
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from audit_task import AuditTask
+from .report_formatters import TaskFormatter
+
+# Output for node_exporter's textfile collector. The file is replaced atomically,
+# so a scrape never sees a half written file.
+
+# NOT_RUN: left out of a --budget run
+STATUSES = ("PASS", "FAIL", "ERROR", "NOT_RUN")
+
+
+def escape_label(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in labels.items()) + "}"
+
+
+class PrometheusReporter:
+
+    def __init__(self, prom_path: str, session_id: str = None, slowest: int = 10):
+        self.prom_path = prom_path
+        self.session_id = session_id
+        self.slowest = slowest
+        self.task_formatter = TaskFormatter()
+        # metric name -> (help, type, samples), samples of one metric must stay together
+        self.families = {}
+        self.lock = threading.Lock()
+
+    def sample(self, name: str, help_text: str, value: float, labels: Dict[str, Any] = None, metric_type: str = "gauge"):
+        with self.lock:
+            family = self.families.setdefault(name, (help_text, metric_type, []))
+            family[2].append((labels or {}, value))
+
+    def add_run(self, tasks: List[AuditTask], host: Optional[str] = None, run_duration: Optional[float] = None,
+                connection_stats: Optional[Dict[str, Any]] = None):
+        base = {"host": host} if host else {}
+        domains = {}
+        for task in tasks:
+            status = self.task_formatter.get_task_status(task)
+            labels = {**base, "id": task.id, "level": task.level, "domain": task.domain}
+            for candidate in STATUSES:
+                self.sample("cis_audit_check_status", "1 if the check has this status in the last run, else 0.",
+                            1 if status == candidate else 0, {**labels, "status": candidate.lower()})
+            counts = domains.setdefault(task.domain or "General", dict.fromkeys(STATUSES, 0))
+            if status in counts:
+                counts[status] += 1
+
+        for domain, counts in domains.items():
+            for status, count in counts.items():
+                self.sample("cis_audit_domain_checks", "Number of checks per domain and status in the last run.",
+                            count, {**base, "domain": domain, "status": status.lower()})
+        for status in STATUSES:
+            total = sum(counts[status] for counts in domains.values())
+            self.sample("cis_audit_checks", "Number of checks per status in the last run.", total, {**base, "status": status.lower()})
+
+        measured = [t for t in tasks if t.metrics]
+        if measured:
+            commands = sum(t.metrics["commands"] for t in measured)
+            cache_hits = sum(t.metrics["cache_hits"] for t in measured)
+            lookups = commands + cache_hits
+            self.sample("cis_audit_cache_hit_ratio", "Share of evidence lookups served from a cache instead of a command.",
+                        round(cache_hits / lookups, 4) if lookups else 0, base)
+            self.sample("cis_audit_commands", "Commands run for the checks in the last run.", commands, base)
+            self.sample("cis_audit_check_seconds_sum", "Total wall time spent in checks in the last run.",
+                        round(sum(t.metrics["wall_time"] for t in measured), 4), base)
+            for task in sorted(measured, key=lambda t: t.metrics["wall_time"], reverse=True)[:self.slowest]:
+                self.sample("cis_audit_slowest_check_seconds", f"Wall time of the {self.slowest} slowest checks in the last run.",
+                            task.metrics["wall_time"], {**base, "id": task.id, "level": task.level, "domain": task.domain})
+
+        if run_duration is not None:
+            self.sample("cis_audit_run_duration_seconds", "Wall time of the last audit run.", round(run_duration, 3), base)
+        if connection_stats:
+            self.sample("cis_audit_ssh_reconnects", "SSH reconnects during the last run.", connection_stats["reconnects"], base)
+            self.sample("cis_audit_ssh_retries", "Remote commands re-sent after a dropped connection in the last run.", connection_stats["retries"], base)
+        self.sample("cis_audit_last_run_timestamp_seconds", "Unix time the last audit run finished.", round(time.time(), 3), base)
+
+    def render(self) -> str:
+        lines = []
+        with self.lock:
+            for name, (help_text, metric_type, samples) in self.families.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in samples:
+                    lines.append(f"{name}{format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def generate_prom_file(self):
+        directory = os.path.dirname(self.prom_path) or "."
+        os.makedirs(directory, exist_ok=True)
+        # same directory as the target so os.replace is a rename, the collector skips non .prom names;
+        # unique per writer, concurrent daemon requests share the pid
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(self.prom_path)}.", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(self.render())
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, self.prom_path)
+            print(f"Prometheus metrics saved to '{self.prom_path}'")
+        except Exception as e:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            print(f"ERROR: Could not write Prometheus metrics. Reason: {e}")
@@ -0,0 +1,69 @@
+import contextvars
+import importlib
+import threading
+import weakref
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from utils.execution_utils import call_remo_runner
+from utils.metrics import record_cache_hit
+
+# Snapshots of system state that many checks read (mount table, firewall rules...).
+# A provider module utils/providers/<name>.py has a load() that collects the state once
+# through execute_command, load(variant) when it serves several (one per firewall
+# backend); the result is kept per executor, so fleet hosts never share one, for the
+# audit run that loaded it. Every run_audit opens its own snapshot_scope(), so concurrent
+# runs (daemon requests) never see or reset each other's snapshots.
+
+
+class SnapshotStore:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local_snapshots: Dict[tuple, Any] = {}
+        self.remote_snapshots: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        # concurrent workers asking for the same snapshot wait for the first one to load it
+        self.loading: Dict[tuple, threading.Lock] = {}
+
+    def snapshots_for(self, executor) -> Dict[tuple, Any]:
+        if executor is None:
+            return self.local_snapshots
+        with self.lock:
+            return self.remote_snapshots.setdefault(executor, {})
+
+    def load_lock(self, executor, key: tuple) -> threading.Lock:
+        with self.lock:
+            return self.loading.setdefault((id(executor), key), threading.Lock())
+
+
+active_store: contextvars.ContextVar = contextvars.ContextVar('active_snapshots', default=None)
+# a handler called outside an audit run
+default_store = SnapshotStore()
+
+
+@contextmanager
+def snapshot_scope():
+    # pool jobs inherit the scope via submit_in_context, the store goes away with the run
+    token = active_store.set(SnapshotStore())
+    try:
+        yield
+    finally:
+        active_store.reset(token)
+
+
+def snapshot(name: str, variant: Optional[str] = None) -> Any:
+    executor = call_remo_runner()
+    store = active_store.get() or default_store
+    cache = store.snapshots_for(executor)
+    key = (name, variant)
+    if key in cache:
+        record_cache_hit()
+        return cache[key]
+
+    with store.load_lock(executor, key):
+        if key in cache:
+            record_cache_hit()
+            return cache[key]
+        provider = importlib.import_module(f"utils.providers.{name}")
+        value = provider.load() if variant is None else provider.load(variant)
+        cache[key] = value
+    return value
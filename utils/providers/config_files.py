@@ -0,0 +1,145 @@
+import glob
+import os
+import re
+import shlex
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from utils.execution_utils import execute_command, switch_mode
+from utils.shell_framing import new_token
+
+# Contents of config files read by config_grep rows, each file read at most once per run.
+# Expanding a path argument gives the entries grep would see for it, in order:
+#   (path, "file")  a readable file, its text is in the cache
+#   (path, "dir")   a directory given without recursion
+#   (path, "missing") / (path, "error")  what grep reports on stderr
+# Remotely all path arguments of a row that are not cached yet are fetched with one command.
+
+BRACES = re.compile(r"^(.*?)\{([^{}]*,[^{}]*)\}(.*)$")
+
+# the remote side prints "\n<token> <kind> <path>\n" before every entry, followed by the file
+REMOTE_SCRIPT = r'''
+entry() {{
+  if [ -d "$1" ]; then
+    if [ "$2" = 1 ]; then
+      find -L "$1" -type f 2>/dev/null | sort | while IFS= read -r f; do entry "$f" 0; done
+    else
+      printf '\n%s dir %s\n' '{token}' "$1"
+    fi
+  elif [ ! -e "$1" ]; then
+    printf '\n%s missing %s\n' '{token}' "$1"
+  elif [ ! -r "$1" ]; then
+    printf '\n%s error %s\n' '{token}' "$1"
+  else
+    printf '\n%s file %s\n' '{token}' "$1"
+    cat -- "$1"
+  fi
+}}
+'''
+
+
+def expand_braces(pattern: str) -> List[str]:
+    # the shell expands common-{auth,account} before grep sees it
+    match = BRACES.match(pattern)
+    if not match:
+        return [pattern]
+    head, options, tail = match.groups()
+    return [expanded for option in options.split(',') for expanded in expand_braces(head + option + tail)]
+
+
+class ConfigFiles:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.texts: Dict[str, str] = {}
+        self.errors: Dict[str, str] = {}
+        self.expansions: Dict[Tuple[str, bool], List[Tuple[str, str]]] = {}
+
+    def text(self, path: str) -> Optional[str]:
+        return self.texts.get(path)
+
+    def expand(self, patterns: List[str], recursive: bool = False) -> List[Tuple[str, str]]:
+        patterns = [expanded for pattern in patterns for expanded in expand_braces(pattern)]
+        with self.lock:
+            missing = [pattern for pattern in patterns if (pattern, recursive) not in self.expansions]
+        if missing:
+            if switch_mode():
+                self.fetch_remote(missing, recursive)
+            else:
+                for pattern in missing:
+                    self.read_local(pattern, recursive)
+        with self.lock:
+            return [entry for pattern in patterns for entry in self.expansions.get((pattern, recursive), [])]
+
+    def read_file(self, path: str) -> str:
+        with self.lock:
+            if path in self.texts:
+                return "file"
+        try:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                text = f.read()
+        except OSError as e:
+            with self.lock:
+                self.errors[path] = e.strerror or str(e)
+            return "error"
+        with self.lock:
+            self.texts[path] = text
+        return "file"
+
+    def read_local(self, pattern: str, recursive: bool):
+        # an unmatched glob reaches grep as it is, like in the shell
+        paths = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else []
+        entries = []
+        for path in paths or [pattern]:
+            if os.path.isdir(path):
+                if not recursive:
+                    entries.append((path, "dir"))
+                    continue
+                for root, dirs, names in os.walk(path, followlinks=True):
+                    dirs.sort()
+                    entries += [(os.path.join(root, name), self.read_file(os.path.join(root, name))) for name in sorted(names)]
+            elif not os.path.exists(path):
+                entries.append((path, "missing"))
+            else:
+                entries.append((path, self.read_file(path)))
+        with self.lock:
+            self.expansions[(pattern, recursive)] = entries
+
+    def fetch_remote(self, patterns: List[str], recursive: bool):
+        token = new_token()
+        loops = "".join(
+            f"printf '\\n%s pattern %d\\n' '{token}' {index}\n"
+            f"for p in {glob_words(pattern)}; do entry \"$p\" {int(recursive)}; done\n"
+            for index, pattern in enumerate(patterns)
+        )
+        result = execute_command(['bash', '-c', shlex.quote(REMOTE_SCRIPT.format(token=token) + loops)])
+
+        entries: Dict[str, List[Tuple[str, str]]] = {pattern: [] for pattern in patterns}
+        texts: Dict[str, str] = {}
+        seen = set()
+        current = None
+        for chunk in result.stdout.split(f"\n{token} ")[1:]:
+            header, _, text = chunk.partition("\n")
+            kind, _, path = header.partition(" ")
+            if kind == "pattern":
+                seen.add(int(path))
+                current = patterns[int(path)]
+                continue
+            entries[current].append((path, kind))
+            if kind == "file":
+                texts[path] = text
+        # a script that never ran (sudo refused, no bash) reads nothing, which is not "no match"
+        if len(seen) != len(patterns):
+            raise OSError(f"Could not read files on the remote host: {result.stderr.strip() or 'incomplete output'}")
+        with self.lock:
+            self.texts.update(texts)
+            for pattern, found in entries.items():
+                self.expansions[(pattern, recursive)] = found
+
+
+def glob_words(pattern: str) -> str:
+    # quote everything except the glob characters, so the remote shell only expands those
+    return "".join(char if char in "*?[]" else shlex.quote(char) for char in pattern)
+
+
+def load() -> ConfigFiles:
+    return ConfigFiles()
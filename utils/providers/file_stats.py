@@ -0,0 +1,150 @@
+import functools
+import glob
+import grp
+import os
+import pwd
+import shlex
+import stat
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from utils.execution_utils import execute_command, switch_mode
+from utils.providers.config_files import expand_braces, glob_words
+from utils.shell_framing import new_token
+
+# Mode, owner and group of the files named by file_mode rows, like `stat -L`, each path
+# looked up at most once per run. Expanding a path argument gives a FileStat per entry
+# in order, with kind "file", "dir", "missing" or "error".
+# Remotely all path arguments of a row that are not cached yet are stat'ed with one command.
+
+# the remote side prints one "<token> <kind> <mode> <owner> <group> <path>" line per entry
+REMOTE_SCRIPT = r'''
+shopt -s nullglob
+entry() {{
+  if [ -d "$1" ] && [ "$2" = 1 ]; then
+    find -L "$1" -type f 2>/dev/null | sort | while IFS= read -r f; do entry "$f" 0; done
+    return
+  fi
+  if [ ! -e "$1" ]; then
+    printf '%s missing - - - %s\n' '{token}' "$1"
+    return
+  fi
+  [ -d "$1" ] && kind=dir || kind=file
+  if s="$(stat -Lc '%a %U %G' -- "$1" 2>/dev/null)"; then
+    printf '%s %s %s %s\n' '{token}' "$kind" "$s" "$1"
+  else
+    printf '%s error - - - %s\n' '{token}' "$1"
+  fi
+}}
+'''
+
+
+class FileStat:
+    def __init__(self, path: str, kind: str, mode: Optional[int] = None, owner: str = "", group: str = ""):
+        self.path = path
+        self.kind = kind
+        # permission bits with setuid/setgid/sticky, like `stat -c %a`
+        self.mode = mode
+        self.owner = owner
+        self.group = group
+
+    @property
+    def octal_mode(self) -> str:
+        # like `stat -c %#a`
+        return f"0{self.mode:o}" if self.mode else "0"
+
+
+@functools.lru_cache(maxsize=None)
+def user_name(uid: int) -> str:
+    try:
+        return pwd.getpwuid(uid).pw_name
+    except KeyError:
+        return "UNKNOWN"
+
+
+@functools.lru_cache(maxsize=None)
+def group_name(gid: int) -> str:
+    try:
+        return grp.getgrgid(gid).gr_name
+    except KeyError:
+        return "UNKNOWN"
+
+
+class FileStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.expansions: Dict[Tuple[str, bool], List[FileStat]] = {}
+
+    def expand(self, patterns: List[str], recursive: bool = False) -> List[FileStat]:
+        patterns = [expanded for pattern in patterns for expanded in expand_braces(pattern)]
+        with self.lock:
+            missing = [pattern for pattern in patterns if (pattern, recursive) not in self.expansions]
+        if missing:
+            if switch_mode():
+                self.stat_remote(missing, recursive)
+            else:
+                for pattern in missing:
+                    self.stat_local(pattern, recursive)
+        with self.lock:
+            return [entry for pattern in patterns for entry in self.expansions.get((pattern, recursive), [])]
+
+    @staticmethod
+    def stat_path(path: str) -> FileStat:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return FileStat(path, "missing")
+        except OSError:
+            return FileStat(path, "error")
+        kind = "dir" if stat.S_ISDIR(st.st_mode) else "file"
+        return FileStat(path, kind, stat.S_IMODE(st.st_mode), user_name(st.st_uid), group_name(st.st_gid))
+
+    def stat_local(self, pattern: str, recursive: bool):
+        # a glob that matches nothing names no files, only plain paths can be missing
+        paths = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        entries = []
+        for path in paths:
+            if recursive and os.path.isdir(path):
+                for root, dirs, names in os.walk(path, followlinks=True):
+                    dirs.sort()
+                    entries += [self.stat_path(os.path.join(root, name)) for name in sorted(names)]
+            else:
+                entries.append(self.stat_path(path))
+        with self.lock:
+            self.expansions[(pattern, recursive)] = entries
+
+    def stat_remote(self, patterns: List[str], recursive: bool):
+        token = new_token()
+        loops = "".join(
+            f"echo '{token} pattern {index}'\n"
+            f"for p in {glob_words(pattern)}; do entry \"$p\" {int(recursive)}; done\n"
+            for index, pattern in enumerate(patterns)
+        )
+        result = execute_command(['bash', '-c', shlex.quote(REMOTE_SCRIPT.format(token=token) + loops)])
+
+        entries: Dict[str, List[FileStat]] = {pattern: [] for pattern in patterns}
+        seen = set()
+        current = None
+        for line in result.stdout.splitlines():
+            if not line.startswith(f"{token} "):
+                continue
+            fields = line.split(" ", 5)
+            if fields[1] == "pattern":
+                seen.add(int(fields[2]))
+                current = patterns[int(fields[2])]
+            elif len(fields) == 6 and current is not None:
+                _, kind, mode, owner, group, path = fields
+                if kind in ("file", "dir"):
+                    entries[current].append(FileStat(path, kind, int(mode, 8), owner, group))
+                else:
+                    entries[current].append(FileStat(path, kind))
+        # a script that never ran (sudo refused, no bash) lists nothing, which is not "no files"
+        if len(seen) != len(patterns):
+            raise OSError(f"Could not stat files on the remote host: {result.stderr.strip() or 'incomplete output'}")
+        with self.lock:
+            for pattern, found in entries.items():
+                self.expansions[(pattern, recursive)] = found
+
+
+def load() -> FileStats:
+    return FileStats()
@@ -0,0 +1,219 @@
+import json
+import re
+from typing import Dict, List, Optional, Tuple
+
+from utils.execution_utils import execute_command
+
+# One snapshot of the firewall per backend and run, parsed into the same model:
+#   nftables   `nft -j list ruleset`
+#   iptables   `iptables-save` (ip6tables: `ip6tables-save`), the filter table only
+#   ufw        `ufw status verbose`
+# Only rules directly in the input/forward/output base chains are modelled, rules in
+# chains they jump to are not followed.
+
+COMMANDS = {
+    "nftables": "nft -j list ruleset",
+    "iptables": "iptables-save -t filter",
+    "ip6tables": "ip6tables-save -t filter",
+    "ufw": "ufw status verbose",
+}
+IPTABLES_CHAINS = {"INPUT": "input", "FORWARD": "forward", "OUTPUT": "output"}
+UFW_DIRECTIONS = {"IN": "input", "OUT": "output", "FWD": "forward"}
+UFW_VERDICTS = {"allow": "accept", "limit": "accept", "deny": "drop", "reject": "reject"}
+UFW_DEFAULT = re.compile(r"(\w+) \((incoming|outgoing|routed)\)")
+UFW_PORTS = re.compile(r"^([\d,:]+)(?:/(tcp|udp))?\b")
+
+
+class Rule:
+    def __init__(self, chain: str, verdict: str, iif: str = None, oif: str = None, saddr: str = None,
+                 protocol: str = None, ports: Optional[List[Tuple[int, int]]] = None, text: str = ""):
+        self.chain = chain
+        self.verdict = verdict
+        self.iif = iif
+        self.oif = oif
+        self.saddr = saddr
+        self.protocol = protocol
+        # None means the rule matches any port
+        self.ports = ports
+        self.text = text
+
+    def covers(self, port: int, protocol: str) -> bool:
+        if self.ports is None or (self.protocol and self.protocol != protocol):
+            return False
+        return any(low <= port <= high for low, high in self.ports)
+
+
+class Ruleset:
+    def __init__(self, backend: str):
+        self.backend = backend
+        self.available = False
+        self.error = ""
+        self.active = False
+        # input/forward/output, or incoming/outgoing/routed for ufw -> lower case policy
+        self.policies: Dict[str, str] = {}
+        self.tables: List[str] = []
+        self.rules: List[Rule] = []
+
+    def chain_rules(self, chain: str) -> List[Rule]:
+        return [rule for rule in self.rules if rule.chain == chain]
+
+
+def port_ranges(value) -> List[Tuple[int, int]]:
+    # 22 | "80,443" | "1000:2000" | nft {"set": [22, {"range": [1000, 2000]}]} | {"range": [...]}
+    if isinstance(value, int):
+        return [(value, value)]
+    if isinstance(value, dict):
+        if "set" in value:
+            return [r for item in value["set"] for r in port_ranges(item)]
+        if "range" in value:
+            low, high = value["range"]
+            return [(int(low), int(high))] if str(low).isdigit() and str(high).isdigit() else []
+        return []
+    ranges = []
+    for part in str(value).split(','):
+        low, _, high = part.partition(':')
+        if low.isdigit():
+            ranges.append((int(low), int(high) if high.isdigit() else int(low)))
+    return ranges
+
+
+def nft_rule(chain: str, data: dict) -> Rule:
+    rule = Rule(chain, verdict="")
+    for expression in data.get("expr", []):
+        for verdict in ("accept", "drop", "reject"):
+            if verdict in expression:
+                rule.verdict = verdict
+        match = expression.get("match")
+        if not match or match.get("op", "==") not in ("==", "in"):
+            continue
+        left, right = match.get("left") or {}, match.get("right")
+        meta = left.get("meta", {}).get("key") if isinstance(left, dict) else None
+        payload = left.get("payload", {}) if isinstance(left, dict) else {}
+        if meta in ("iif", "iifname"):
+            rule.iif = right
+        elif meta in ("oif", "oifname"):
+            rule.oif = right
+        elif payload.get("field") == "saddr":
+            prefix = right.get("prefix") if isinstance(right, dict) else None
+            rule.saddr = f"{prefix['addr']}/{prefix['len']}" if prefix else str(right)
+        elif payload.get("field") == "dport":
+            rule.protocol = payload.get("protocol") if payload.get("protocol") in ("tcp", "udp") else None
+            rule.ports = port_ranges(right)
+    return rule
+
+
+def parse_nftables(ruleset: Ruleset, text: str):
+    hooks = {}
+    for item in json.loads(text).get("nftables", []):
+        if "table" in item:
+            ruleset.tables.append(f"table {item['table']['family']} {item['table']['name']}")
+        elif "chain" in item and item["chain"].get("hook"):
+            chain = item["chain"]
+            hooks[(chain["family"], chain["table"], chain["name"])] = chain["hook"]
+            if chain["hook"] in ("input", "forward", "output") and chain.get("type", "filter") == "filter":
+                ruleset.policies[chain["hook"]] = chain.get("policy", "accept").lower()
+        elif "rule" in item:
+            rule = item["rule"]
+            hook = hooks.get((rule["family"], rule["table"], rule["chain"]))
+            if hook:
+                ruleset.rules.append(nft_rule(hook, rule))
+    ruleset.active = bool(ruleset.tables)
+
+
+def iptables_rule(chain: str, tokens: List[str], text: str) -> Rule:
+    rule = Rule(chain, verdict="", text=text)
+    index = 0
+    while index < len(tokens):
+        token, value = tokens[index], tokens[index + 1] if index + 1 < len(tokens) else ""
+        if token == "!":
+            # negated matches say nothing about what is allowed, skip the match and its value
+            index += 3
+            continue
+        if token in ("-i", "--in-interface"):
+            rule.iif = value
+        elif token in ("-o", "--out-interface"):
+            rule.oif = value
+        elif token in ("-s", "--source"):
+            rule.saddr = value
+        elif token in ("-p", "--protocol"):
+            rule.protocol = value.lower() if value.lower() in ("tcp", "udp") else None
+        elif token in ("--dport", "--destination-port", "--dports", "--destination-ports"):
+            rule.ports = port_ranges(value)
+        elif token in ("-j", "--jump"):
+            rule.verdict = value.lower()
+        else:
+            index += 1
+            continue
+        index += 2
+    return rule
+
+
+def parse_iptables(ruleset: Ruleset, text: str):
+    in_filter = False
+    for line in text.splitlines():
+        if line.startswith('*'):
+            in_filter = line == '*filter'
+        elif not in_filter:
+            continue
+        elif line.startswith(':'):
+            name, policy = (line[1:].split() + ["", ""])[:2]
+            if name in IPTABLES_CHAINS:
+                ruleset.policies[IPTABLES_CHAINS[name]] = policy.lower()
+        elif line.startswith('-A '):
+            tokens = line.split()
+            if tokens[1] in IPTABLES_CHAINS:
+                ruleset.rules.append(iptables_rule(IPTABLES_CHAINS[tokens[1]], tokens[2:], line))
+    ruleset.active = bool(ruleset.policies)
+
+
+def parse_ufw(ruleset: Ruleset, text: str):
+    in_rules = False
+    for line in text.splitlines():
+        if line.startswith("Status:"):
+            ruleset.active = line.split(":", 1)[1].strip().lower() == "active"
+        elif line.startswith("Default:"):
+            for policy, direction in UFW_DEFAULT.findall(line):
+                ruleset.policies[direction] = policy.lower()
+        elif line.startswith("--"):
+            in_rules = True
+        elif in_rules and line.strip():
+            columns = re.split(r"\s{2,}", line.strip())
+            if len(columns) < 3:
+                continue
+            to, action, source = columns[0], columns[1].split(), columns[2]
+            direction = UFW_DIRECTIONS.get(action[1] if len(action) > 1 else "IN", "input")
+            rule = Rule(direction, verdict=UFW_VERDICTS.get(action[0].lower(), action[0].lower()), text=line.strip())
+            if to.startswith("Anywhere on "):
+                rule.iif = to.split()[2]
+            if source.startswith("Anywhere on "):
+                rule.oif = source.split()[2]
+            elif not source.startswith("Anywhere"):
+                rule.saddr = source.split()[0]
+            ports = UFW_PORTS.match(to)
+            if ports:
+                rule.ports = port_ranges(ports.group(1))
+                rule.protocol = ports.group(2)
+            ruleset.rules.append(rule)
+
+
+def load(backend: str) -> Ruleset:
+    if backend not in COMMANDS:
+        raise ValueError(f"Unknown firewall backend '{backend}', expected one of {', '.join(COMMANDS)}")
+    ruleset = Ruleset(backend)
+    result = execute_command([COMMANDS[backend]])
+    if result.returncode != 0 or not result.stdout.strip():
+        # a missing or unreadable backend is a finding of the check, not an error of the audit
+        ruleset.error = result.stderr.strip() or f"'{COMMANDS[backend]}' returned nothing"
+        return ruleset
+    try:
+        if backend == "nftables":
+            parse_nftables(ruleset, result.stdout)
+        elif backend == "ufw":
+            parse_ufw(ruleset, result.stdout)
+        else:
+            parse_iptables(ruleset, result.stdout)
+    except (ValueError, KeyError, TypeError) as e:
+        ruleset.error = f"Could not parse the output of '{COMMANDS[backend]}': {e}"
+        return ruleset
+    ruleset.available = True
+    return ruleset
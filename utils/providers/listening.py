@@ -0,0 +1,42 @@
+from typing import List, Optional
+
+from utils.execution_utils import execute_command
+
+# Sockets listening for traffic from other hosts, from one `ss -tuln`. Loopback only
+# listeners (127.0.0.0/8, ::1, %lo) are left out, no firewall rule is needed for them.
+
+
+class Listener:
+    def __init__(self, protocol: str, address: str, port: int):
+        self.protocol = protocol
+        self.address = address
+        self.port = port
+
+    @property
+    def family(self) -> str:
+        return "ipv6" if ':' in self.address else "ipv4"
+
+    def __str__(self) -> str:
+        return f"{self.port}/{self.protocol} on {self.address}"
+
+
+def is_loopback(address: str) -> bool:
+    return address.startswith('127.') or address in ('::1', '[::1]') or '%lo' in address
+
+
+def parse_line(line: str) -> Optional[Listener]:
+    fields = line.split()
+    if len(fields) < 5 or fields[0] not in ('tcp', 'udp'):
+        return None
+    address, _, port = fields[4].rpartition(':')
+    if not port.isdigit() or is_loopback(address):
+        return None
+    return Listener(fields[0], address.strip('[]'), int(port))
+
+
+def load() -> List[Listener]:
+    result = execute_command(['ss', '-tuln'])
+    if result.returncode != 0:
+        raise OSError(f"Could not list listening sockets: {result.stderr.strip()}")
+    listeners = [parse_line(line) for line in result.stdout.splitlines()]
+    return [listener for listener in listeners if listener]
@@ -0,0 +1,80 @@
+import re
+from typing import Dict, List
+
+from utils.execution_utils import execute_command, switch_mode
+
+# The kernel mount table, read once from /proc/self/mountinfo (what `findmnt -k` reads).
+# A line looks like
+#   36 35 98:0 /mnt1 /mnt2 rw,noatime master:1 - ext3 /dev/root rw,errors=continue
+# mount ID, parent ID, major:minor, root, mount point, mount options, optional fields,
+# a '-' separator, then the filesystem type, the source and the superblock options.
+
+MOUNTINFO = "/proc/self/mountinfo"
+# paths in mountinfo escape space, tab, newline and backslash as \ooo
+ESCAPED = re.compile(r"\\([0-7]{3})")
+
+
+def unescape(value: str) -> str:
+    return ESCAPED.sub(lambda match: chr(int(match.group(1), 8)), value)
+
+
+class Mount:
+    def __init__(self, target: str, source: str, fstype: str, options: List[str]):
+        self.target = target
+        self.source = source
+        self.fstype = fstype
+        self.options = options
+        self.option_set = set(options)
+        # bare names too, so 'size' matches 'size=1024k'
+        self.option_set.update(option.split('=', 1)[0] for option in options)
+
+    def has_option(self, option: str) -> bool:
+        return option in self.option_set
+
+    def findmnt_line(self) -> str:
+        # the columns `findmnt -kn <target>` prints: TARGET SOURCE FSTYPE OPTIONS
+        return f"{self.target} {self.source} {self.fstype} {','.join(self.options)}"
+
+
+class MountTable:
+    def __init__(self, mounts: List[Mount]):
+        self.mounts = mounts
+        self.by_target: Dict[str, List[Mount]] = {}
+        for mount in mounts:
+            self.by_target.setdefault(mount.target, []).append(mount)
+
+    def find(self, target: str) -> List[Mount]:
+        # every mount stacked on the target, oldest first, like findmnt lists them
+        if target != '/':
+            target = target.rstrip('/')
+        return self.by_target.get(target, [])
+
+
+def parse_line(line: str) -> Mount:
+    fields = line.split()
+    separator = fields.index('-', 6)
+    vfs_options = fields[5].split(',')
+    fs_options = fields[separator + 3].split(',') if len(fields) > separator + 3 else []
+    # findmnt shows the per mount options followed by the superblock ones, rw/ro only once
+    options = vfs_options + [option for option in fs_options if option not in vfs_options and option not in ('rw', 'ro')]
+    return Mount(unescape(fields[4]), unescape(fields[separator + 2]), fields[separator + 1], options)
+
+
+def parse(text: str) -> MountTable:
+    mounts = []
+    for line in text.splitlines():
+        try:
+            mounts.append(parse_line(line))
+        except (ValueError, IndexError):
+            continue
+    return MountTable(mounts)
+
+
+def load() -> MountTable:
+    if switch_mode():
+        result = execute_command(['cat', MOUNTINFO])
+        if result.returncode != 0 or not result.stdout.strip():
+            raise OSError(f"Could not read {MOUNTINFO}: {result.stderr.strip()}")
+        return parse(result.stdout)
+    with open(MOUNTINFO, 'r', encoding='utf-8', errors='replace') as f:
+        return parse(f.read())
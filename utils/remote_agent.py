@@ -0,0 +1,94 @@
+import json
+import logging
+import os
+import shlex
+import tempfile
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from audit_task import AuditTask
+from utils.result_blob import unpack_tasks
+from utils.script_bundle import ScriptBundle, referenced_scripts, SCRIPTS_DIR
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AGENT_MODULES = ["audit_task.py", "agent_runner.py"]
+AGENT_PACKAGES = ["handlers", "utils"]
+
+
+def agent_files(tasks: List[AuditTask]) -> Dict[str, str]:
+    files = {}
+    for name in AGENT_MODULES:
+        files[name] = os.path.join(PROJECT_ROOT, name)
+    for package in AGENT_PACKAGES:
+        for root, dirs, names in os.walk(os.path.join(PROJECT_ROOT, package)):
+            dirs[:] = [d for d in dirs if d != "__pycache__"]
+            for name in names:
+                if name.endswith(".py"):
+                    local_path = os.path.join(root, name)
+                    files[os.path.relpath(local_path, PROJECT_ROOT).replace(os.sep, "/")] = local_path
+    for name in referenced_scripts(tasks):
+        local_path = os.path.join(PROJECT_ROOT, SCRIPTS_DIR, name)
+        if os.path.isfile(local_path):
+            files[f"{SCRIPTS_DIR}/{name}"] = local_path
+    return files
+
+
+class RemoteAgent:
+    def __init__(self, executor, timeout: int = 3600):
+        self.executor = executor
+        self.timeout = timeout
+        self.meta = {}
+        self.logger = logging.getLogger(__name__)
+
+    def run(self, tasks: List[AuditTask], workers: int = 1, parallel_steps: int = 0, log_level: str = 'WARNING',
+            deadline: Optional[float] = None) -> Optional[List[AuditTask]]:
+        bundle = ScriptBundle(self.executor, agent_files(tasks))
+        if not bundle.install():
+            self.logger.error("Could not ship the audit agent to the remote host.")
+            return None
+
+        job = {
+            "tasks": [task.to_dict() for task in tasks],
+            "workers": workers,
+            "parallel_steps": parallel_steps,
+            "loglevel": log_level,
+        }
+        if deadline is not None:
+            # monotonic clocks differ between hosts, the agent gets what is left of the budget
+            job["budget_seconds"] = max(deadline - time.monotonic(), 0.0)
+        remote_job = f"/tmp/cis_audit_job_{uuid.uuid4().hex[:8]}.json"
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False, encoding='utf-8') as tmp:
+            json.dump(job, tmp)
+        try:
+            if not self.executor.upload_file(tmp.name, remote_job):
+                return None
+        finally:
+            os.unlink(tmp.name)
+
+        self.logger.info(f"Running {len(tasks)} checks on {self.executor.hostname} through the audit agent")
+        script = (
+            f"cd {bundle.remote_dir} && python3 agent_runner.py {remote_job} </dev/null; "
+            f"rc=$?; rm -f {remote_job}; exit $rc"
+        )
+        try:
+            # not retried: the whole audit would run twice, the SSH fallback takes over instead
+            stdout, stderr, exit_status = self.executor.execute(f"sudo sh -c {shlex.quote(script)}", self.timeout, retry=False)
+        except Exception as e:
+            self.logger.error(f"Audit agent failed to run: {e}")
+            return None
+        finally:
+            bundle.cleanup()
+
+        if exit_status != 0 or not stdout.strip():
+            self.logger.error(f"Audit agent exited with status {exit_status}: {stderr.strip()[-500:]}")
+            return None
+
+        try:
+            completed, self.meta = unpack_tasks(stdout.strip().splitlines()[-1])
+        except Exception as e:
+            self.logger.error(f"Could not decode the audit agent result: {e}")
+            return None
+
+        self.logger.info(f"Audit agent finished {len(completed)} checks in {self.meta.get('agent_duration', '?')}s on the remote host")
+        return completed
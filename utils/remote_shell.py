@@ -0,0 +1,107 @@
+import logging
+import select
+import shlex
+import time
+from typing import List, Optional
+
+import paramiko
+
+from utils.shell_framing import FramedResult, new_token, frame_script, split_framed, stdout_marker, stderr_marker
+
+
+# One long-lived `sudo bash` per channel. Commands are framed so stdout,
+# stderr and the real exit code come back separately for each of them.
+class ElevatedShell:
+    def __init__(self, client: paramiko.SSHClient, password: Optional[str] = None):
+        self.client = client
+        self.password = password
+        self.channel = None
+        self.token = new_token()
+        self.commands_run = 0
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def alive(self) -> bool:
+        return self.channel is not None and not self.channel.closed and not self.channel.exit_status_ready()
+
+    def open(self, timeout: int = 30):
+        prompt = f"{self.token}:PASSWORD"
+        ready = f"{self.token}:READY"
+        inner = f"printf '%s\\n' {shlex.quote(ready)}; exec bash --noprofile --norc"
+        command = f"sudo -S -p {shlex.quote(prompt)} bash --noprofile --norc -c {shlex.quote(inner)}"
+
+        self.channel = self.client.get_transport().open_session(timeout=timeout)
+        self.channel.exec_command(command)
+
+        out_buf, err_buf = b"", b""
+        password_sent = False
+        deadline = time.monotonic() + timeout
+        while ready.encode() not in out_buf:
+            self._wait(deadline)
+            out_buf += self._drain(self.channel.recv_ready, self.channel.recv)
+            err_buf += self._drain(self.channel.recv_stderr_ready, self.channel.recv_stderr)
+
+            if prompt.encode() in err_buf:
+                if password_sent or not self.password:
+                    self.close()
+                    raise PermissionError("sudo rejected the password for the persistent shell")
+                self.channel.sendall((self.password + '\n').encode())
+                password_sent = True
+                err_buf = err_buf.replace(prompt.encode(), b"")
+            if self.channel.exit_status_ready() and not self.channel.recv_ready():
+                self.close()
+                raise ConnectionError(f"Persistent shell exited during start-up: {err_buf.decode('utf-8', errors='replace').strip()}")
+
+        self.logger.debug("Persistent elevated shell is ready")
+
+    def run_many(self, commands: List[str], timeout: int = 30) -> List[FramedResult]:
+        if not commands:
+            return []
+        if not self.alive:
+            self.open(timeout)
+
+        token = new_token()
+        last_out, last_err = stdout_marker(token, len(commands) - 1), stderr_marker(token, len(commands) - 1)
+        self.channel.sendall(frame_script(commands, token).encode())
+
+        out_buf, err_buf = b"", b""
+        deadline = time.monotonic() + timeout
+        try:
+            while not (last_out.search(out_buf) and last_err.search(err_buf)):
+                self._wait(deadline)
+                out_buf += self._drain(self.channel.recv_ready, self.channel.recv)
+                err_buf += self._drain(self.channel.recv_stderr_ready, self.channel.recv_stderr)
+                # a dropped transport closes the channel without an exit status
+                if (self.channel.closed or self.channel.exit_status_ready()) and not (self.channel.recv_ready() or self.channel.recv_stderr_ready()):
+                    raise ConnectionError("Persistent shell exited while running a command")
+        except Exception:
+            # the shell is now out of sync with its framing, start a fresh one next time
+            self.close()
+            raise
+
+        self.commands_run += len(commands)
+        return split_framed(out_buf, err_buf, token, len(commands))
+
+    def run(self, command: str, timeout: int = 30) -> FramedResult:
+        return self.run_many([command], timeout)[0]
+
+    def close(self):
+        if self.channel is not None:
+            try:
+                self.channel.close()
+            except Exception:
+                pass
+        self.channel = None
+
+    def _wait(self, deadline: float):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError("Timed out waiting for the persistent shell")
+        select.select([self.channel], [], [], min(remaining, 1.0))
+
+    @staticmethod
+    def _drain(ready, recv) -> bytes:
+        data = b""
+        while ready():
+            data += recv(65536)
+        return data
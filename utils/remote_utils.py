@@ -1,20 +1,69 @@
 import logging
-from typing import Tuple
+import shlex
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Tuple
 import paramiko
+from utils.remote_shell import ElevatedShell
+from utils.command_batcher import CommandBatcher
+from utils.shell_framing import new_token, frame_script, split_framed
+from utils.tracing import span
+
+# failures that mean the connection itself went away, not that the command failed
+CONNECTION_ERRORS = (paramiko.SSHException, EOFError, ConnectionError)
 
 
 class RemoteExecutor:
     def __init__(self, hostname: str, port: int = 22, username: str = None, 
-                 password: str = None, key_path: str = None):
+                 password: str = None, key_path: str = None, persistent_shell: bool = False,
+                 max_channels: int = 8, batch_size: int = 0, batch_window: float = 0.005,
+                 keepalive: int = 30, retries: int = 2, reconnect_attempts: int = 5):
         self.hostname = hostname
         self.port = port
         self.username = username
         self.password = password
         self.key_path = key_path
+        self.persistent_shell = persistent_shell
         self.client = None
+        self.script_bundle = None
         self.logger = logging.getLogger(__name__)
+
+        # Keepalives stop idle NAT/firewall entries expiring between checks. A dropped
+        # connection is re-opened with exponential backoff and the command that hit it
+        # is sent again, audit commands only read state so running them twice is safe.
+        self.keepalive = keepalive
+        self.retries = max(0, retries)
+        self.reconnect_attempts = max(1, reconnect_attempts)
+        self.connected_once = False
+        self.stats = {"reconnects": 0, "retries": 0}
+        self.stats_lock = threading.Lock()
+
+        # Concurrent channels share the one transport. OpenSSH refuses sessions past
+        # MaxSessions (10 by default), so the cap shrinks whenever the server says no.
+        self.max_channels = max(1, max_channels)
+        self.channel_slots = threading.Semaphore(self.max_channels)
+        self.retired_slots = 0
+        self.slot_lock = threading.Lock()
+        self.connect_lock = threading.Lock()
+        self.idle_shells = []
+        self.slot_waiters = 0
+
+        # commands from concurrent workers can share one round trip as a framed script
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.batcher = self.new_batcher()
         
+    def new_batcher(self):
+        if self.batch_size <= 1:
+            return None
+        return CommandBatcher(self.execute_batch, max_batch=self.batch_size, window=self.batch_window, parallel=self.max_channels)
+    
     def connect(self) -> bool:
+        with self.connect_lock:
+            return self.open_connection()
+    
+    def open_connection(self) -> bool:
         try:
             self.client = paramiko.SSHClient()
             self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
@@ -37,6 +86,9 @@ class RemoteExecutor:
                 timeout=30,
                 **auth_kwargs
             )
+            if self.keepalive:
+                self.client.get_transport().set_keepalive(self.keepalive)
+            self.connected_once = True
             
             self.logger.info(f"Successfully connected to {self.hostname}")
             return True
@@ -52,59 +104,221 @@ class RemoteExecutor:
             return False
     
     def disconnect(self):
+        if self.batcher:
+            # a fresh batcher, the executor may connect again later (daemon pool)
+            self.batcher.close()
+            self.batcher = self.new_batcher()
+        with self.slot_lock:
+            shells, self.idle_shells = self.idle_shells, []
+        for shell in shells:
+            shell.close()
+            self.release_channel_slot()
         if self.client:
             self.client.close()
             self.logger.info(f"Disconnected from {self.hostname}")
     
-    def run_command(self, command: str, timeout: int = 30) -> Tuple[str, str]:
-        if not self.client:
-            if not self.connect():
-                raise ConnectionError(f"Could not establish connection to {self.hostname}")
-        
+    def transport_active(self) -> bool:
+        transport = self.client.get_transport() if self.client else None
+        return transport is not None and transport.is_active()
+    
+    def ensure_connected(self):
+        with self.connect_lock:
+            if self.transport_active():
+                return
+            if not self.connected_once:
+                if not self.open_connection():
+                    raise ConnectionError(f"Could not establish connection to {self.hostname}")
+                return
+            self.reconnect()
+    
+    def reconnect(self):
+        # called with connect_lock held, so only one thread re-opens the connection
+        delay = 1
+        for attempt in range(1, self.reconnect_attempts + 1):
+            self.logger.warning(f"Connection to {self.hostname} lost, reconnecting (attempt {attempt}/{self.reconnect_attempts})")
+            if self.client:
+                self.client.close()
+            if self.open_connection():
+                self.count_stat("reconnects")
+                return
+            if attempt < self.reconnect_attempts:
+                time.sleep(delay)
+                delay *= 2
+        raise ConnectionError(f"Could not re-establish connection to {self.hostname} after {self.reconnect_attempts} attempts")
+    
+    def count_stat(self, name: str):
+        with self.stats_lock:
+            self.stats[name] += 1
+    
+    def connection_stats(self) -> dict:
+        with self.stats_lock:
+            return {"host": self.hostname, **self.stats}
+    
+    def connection_lost(self, error: Exception) -> bool:
+        if not self.transport_active():
+            return True
+        # another worker may have reconnected already
+        return isinstance(error, CONNECTION_ERRORS) and not isinstance(error, paramiko.ChannelException)
+    
+    @contextmanager
+    def channel_slot(self):
+        self.acquire_channel_slot()
         try:
-            if command.strip().startswith('sudo '):
-                return self.call_sudo_command(command, timeout)
-            else:
-                stdin, stdout, stderr = self.client.exec_command(command, timeout=timeout)
-                
-                stdout_content = stdout.read().decode('utf-8')
-                stderr_content = stderr.read().decode('utf-8')
-                
-                exit_status = stdout.channel.recv_exit_status()
-                
-                self.logger.debug(f"Command executed with exit status: {exit_status}")
-                self.logger.debug(f"STDOUT: {stdout_content}")
-                if stderr_content:
-                    self.logger.debug(f"STDERR: {stderr_content}")
-                
-                return stdout_content, stderr_content
+            yield
+        finally:
+            self.release_channel_slot()
+    
+    def acquire_channel_slot(self):
+        # an idle shell holds a slot, it is closed rather than let other channels wait behind it
+        while not self.channel_slots.acquire(blocking=False):
+            with self.slot_lock:
+                shell = self.idle_shells.pop(0) if self.idle_shells else None
+                if shell is None:
+                    # checked under the same lock, so checkin_shell hands its slot over instead of parking
+                    self.slot_waiters += 1
+            if shell is not None:
+                shell.close()
+                self.release_channel_slot()
+                continue
+            try:
+                self.channel_slots.acquire()
+            finally:
+                with self.slot_lock:
+                    self.slot_waiters -= 1
+            return
+    
+    def release_channel_slot(self):
+        with self.slot_lock:
+            if self.retired_slots > 0:
+                self.retired_slots -= 1
+                return
+        self.channel_slots.release()
+    
+    def retire_channel_slot(self) -> bool:
+        with self.slot_lock:
+            if self.max_channels <= 1:
+                return False
+            self.max_channels -= 1
+            self.retired_slots += 1
+        self.logger.warning(f"{self.hostname} refused a new session, lowering the channel cap to {self.max_channels}")
+        return True
+    
+    def with_channel(self, func, *args):
+        while True:
+            with self.channel_slot():
+                try:
+                    return func(*args)
+                except paramiko.ChannelException:
+                    if not self.retire_channel_slot():
+                        raise
+    
+    def with_shell(self, func, *args):
+        # the shell brings its own channel slot, see checkout_shell
+        while True:
+            shell = self.checkout_shell()
+            try:
+                return func(shell, *args)
+            except paramiko.ChannelException:
+                if not self.retire_channel_slot():
+                    raise
+            finally:
+                self.checkin_shell(shell)
+    
+    def execute(self, command: str, timeout: int = 30, batch: bool = False, retry: bool = True) -> Tuple[str, str, int]:
+        with span("ssh execute", "remote", host=self.hostname, batched=bool(batch and self.batcher)):
+            return self.execute_with_retry(command, timeout, batch, retry)
+    
+    def execute_with_retry(self, command: str, timeout: int = 30, batch: bool = False, retry: bool = True) -> Tuple[str, str, int]:
+        attempt = 0
+        while True:
+            self.ensure_connected()
             
-        except paramiko.SSHException as e:
-            self.logger.error(f"SSH execution error: {e}")
-            raise
-        except Exception as e:
-            self.logger.error(f"Command execution failed: {e}")
-            raise
+            try:
+                return self.dispatch(command, timeout, batch)
+                
+            except Exception as e:
+                if retry and attempt < self.retries and self.connection_lost(e):
+                    attempt += 1
+                    self.count_stat("retries")
+                    self.logger.warning(f"Connection to {self.hostname} dropped during a command, retrying ({attempt}/{self.retries})")
+                    continue
+                if isinstance(e, paramiko.SSHException):
+                    self.logger.error(f"SSH execution error: {e}")
+                else:
+                    self.logger.error(f"Command execution failed: {e}")
+                raise
+    
+    def dispatch(self, command: str, timeout: int = 30, batch: bool = False) -> Tuple[str, str, int]:
+        if batch and self.batcher and command.strip().startswith('sudo '):
+            return self.batcher.submit(command, timeout)
+        if command.strip().startswith('sudo '):
+            if self.persistent_shell:
+                return self.with_shell(self.call_shell_command, command, timeout)
+            return self.with_channel(self.exec_channel, command.replace('sudo ', 'sudo -S -p "" ', 1), timeout, True)
+        return self.with_channel(self.exec_channel, command, timeout)
+    
+    def execute_batch(self, commands: List[str], timeout: int = 30) -> List[Tuple[str, str, int]]:
+        # the batch runs as root already, so only the leading sudo of each command is dropped
+        commands = [command.strip()[len('sudo '):] for command in commands]
+        self.ensure_connected()
+        with span("ssh batch", "remote", host=self.hostname, commands=len(commands)):
+            if self.persistent_shell:
+                results = self.with_shell(self.run_shell_batch, commands, timeout)
+            else:
+                results = self.with_channel(self.exec_batch, commands, timeout)
+        
+        self.logger.debug(f"Batch of {len(commands)} commands executed")
+        # a command the batch never reached gets the same code as a failed remote call
+        return [(stdout, stderr or "Remote batch ended before the command completed", 127) if exit_status is None
+                else (stdout, stderr, exit_status) for stdout, stderr, exit_status in results]
+    
+    def run_shell_batch(self, shell: ElevatedShell, commands: List[str], timeout: int = 30):
+        return shell.run_many(commands, timeout)
+    
+    def exec_batch(self, commands: List[str], timeout: int = 30):
+        token = new_token()
+        script = frame_script(commands, token)
+        stdin, stdout, stderr = self.client.exec_command(f'sudo -S -p "" bash -c {shlex.quote(script)}', timeout=timeout)
+        
+        if self.password:
+            stdin.write(self.password + '\n')
+            stdin.flush()
+        
+        stdout_content = stdout.read()
+        stderr_content = stderr.read()
+        if stdout.channel.recv_exit_status() == -1 and not self.transport_active():
+            raise ConnectionError(f"Connection to {self.hostname} dropped while the batch was running")
+        return split_framed(stdout_content, stderr_content, token, len(commands))
+    
+    def run_command(self, command: str, timeout: int = 30) -> Tuple[str, str]:
+        stdout_content, stderr_content, _ = self.execute(command, timeout)
+        return stdout_content, stderr_content
+    
+    def exec_channel(self, command: str, timeout: int = 30, send_password: bool = False) -> Tuple[str, str, int]:
+        stdin, stdout, stderr = self.client.exec_command(command, timeout=timeout)
+        
+        if send_password and self.password:
+            stdin.write(self.password + '\n')
+            stdin.flush()
+        
+        stdout_content = stdout.read().decode('utf-8')
+        stderr_content = stderr.read().decode('utf-8')
+        
+        exit_status = stdout.channel.recv_exit_status()
+        if exit_status == -1 and not self.transport_active():
+            raise ConnectionError(f"Connection to {self.hostname} dropped while the command was running")
+        
+        self.logger.debug(f"Command executed with exit status: {exit_status}")
+        self.logger.debug(f"STDOUT: {stdout_content}")
+        if stderr_content:
+            self.logger.debug(f"STDERR: {stderr_content}")
+        
+        return stdout_content, stderr_content, exit_status
     
     def call_sudo_command(self, command: str, timeout: int = 30) -> Tuple[str, str]:
         try:
             sudo_command = command.replace('sudo ', 'sudo -S -p "" ', 1)
-            stdin, stdout, stderr = self.client.exec_command(sudo_command, timeout=timeout)
-            
-            if hasattr(self, 'password') and self.password:
-                stdin.write(self.password + '\n')
-                stdin.flush()
-            
-            stdout_content = stdout.read().decode('utf-8')
-            stderr_content = stderr.read().decode('utf-8')
-            
-            exit_status = stdout.channel.recv_exit_status()
-            
-            self.logger.debug(f"Sudo command executed with exit status: {exit_status}")
-            self.logger.debug(f"STDOUT: {stdout_content}")
-            if stderr_content:
-                self.logger.debug(f"STDERR: {stderr_content}")
-            
+            stdout_content, stderr_content, _ = self.with_channel(self.exec_channel, sudo_command, timeout, True)
             return stdout_content, stderr_content
             
         except paramiko.SSHException as e:
@@ -114,6 +328,43 @@ class RemoteExecutor:
             self.logger.error(f"Sudo command execution failed: {e}")
             raise
     
+    def call_shell_command(self, shell: ElevatedShell, command: str, timeout: int = 30) -> Tuple[str, str, int]:
+        # the shell is already root, so only the leading sudo is dropped
+        command = command.strip()[len('sudo '):]
+        stdout_content, stderr_content, exit_status = shell.run(command, timeout)
+        
+        self.logger.debug(f"Shell command executed with exit status: {exit_status}")
+        self.logger.debug(f"STDOUT: {stdout_content}")
+        if stderr_content:
+            self.logger.debug(f"STDERR: {stderr_content}")
+        
+        return stdout_content, stderr_content, exit_status
+    
+    def checkout_shell(self) -> ElevatedShell:
+        # every shell, busy or idle, holds one channel slot, so open shells and the other
+        # channels (SFTP uploads, exec fallbacks) together never exceed max_channels
+        while True:
+            with self.slot_lock:
+                if not self.idle_shells:
+                    break
+                shell = self.idle_shells.pop()
+            if shell.alive:
+                return shell
+            shell.close()
+            self.release_channel_slot()
+        self.acquire_channel_slot()
+        return ElevatedShell(self.client, self.password)
+    
+    def checkin_shell(self, shell: ElevatedShell):
+        # an idle shell keeps its slot, a dead one or one a waiting channel needs gives it back
+        if shell.alive:
+            with self.slot_lock:
+                if not self.slot_waiters:
+                    self.idle_shells.append(shell)
+                    return
+        shell.close()
+        self.release_channel_slot()
+    
     def run_script(self, script_content: str, timeout: int = 30) -> Tuple[str, str]:
         wrapped_command = f"sudo bash -c {repr(script_content)}"
         return self.run_command(wrapped_command, timeout)
@@ -131,9 +382,10 @@ class RemoteExecutor:
             return False
             
         try:
-            sftp = self.client.open_sftp()
-            sftp.put(local_path, remote_path)
-            sftp.close()
+            with self.channel_slot():
+                sftp = self.client.open_sftp()
+                sftp.put(local_path, remote_path)
+                sftp.close()
             self.logger.debug(f"Successfully uploaded {local_path} to {remote_path}")
             return True
         except Exception as e:
@@ -146,10 +398,11 @@ class RemoteExecutor:
             return False
             
         try:
-            sftp = self.client.open_sftp()
-            with sftp.file(remote_path, 'w') as remote_file:
-                remote_file.write(script_content)
-            sftp.close()
+            with self.channel_slot():
+                sftp = self.client.open_sftp()
+                with sftp.file(remote_path, 'w') as remote_file:
+                    remote_file.write(script_content)
+                sftp.close()
             # Change permissions to make it executable
             self.run_command(f"sudo chmod +x {remote_path}")
             self.logger.debug(f"Successfully uploaded script content to {remote_path}")
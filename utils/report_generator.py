@@ -10,23 +10,31 @@ from .console_reporter import ConsoleReporter
 from .summary_reporter import SummaryReporter
 from .detailed_reporter import DetailedReporter
 from .csv_reporter import CSVReporter, LegacyReporter
+from .prometheus_reporter import PrometheusReporter
+from .evidence_reporter import EvidenceReporter
 from .report_formatters import Colors
 
 
+def new_session_id() -> str:
+    timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+    audit_id = str(uuid.uuid4())[:8]  # Short 8-character ID
+    return f"{timestamp}_{audit_id}"
+
+
 class ReportGenerator:
-    def __init__(self, tasks: List[AuditTask], log_level: str = 'INFO'):
+    def __init__(self, tasks: List[AuditTask], log_level: str = 'INFO', session_id: str = None, report_dir: str = "reports",
+                 connection_stats: Dict[str, Any] = None):
         self.tasks = tasks
         self.log_level = log_level
-        self.timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
-        
-        self.audit_id = str(uuid.uuid4())[:8]  # Short 8-character ID
-        self.session_id = f"{self.timestamp}_{self.audit_id}"
+        self.report_dir = report_dir
+        self.session_id = session_id or new_session_id()
+        self.timestamp, self.audit_id = self.session_id.rsplit('_', 1)
         
         self.console_reporter = ConsoleReporter(tasks, log_level)
-        self.summary_reporter = SummaryReporter(tasks, self.session_id)
-        self.detailed_reporter = DetailedReporter(tasks, self.session_id)
-        self.csv_reporter = CSVReporter(tasks, self.session_id)
-        self.legacy_reporter = LegacyReporter(tasks, self.session_id)
+        self.summary_reporter = SummaryReporter(tasks, self.session_id, report_dir, connection_stats)
+        self.detailed_reporter = DetailedReporter(tasks, self.session_id, report_dir)
+        self.csv_reporter = CSVReporter(tasks, self.session_id, report_dir)
+        self.legacy_reporter = LegacyReporter(tasks, self.session_id, report_dir)
         
         # Calculate summary statistics for backward compatibility
         self.pass_count = self.console_reporter.pass_count
@@ -113,22 +121,35 @@ class ReportGenerator:
         return self.console_reporter._should_show_in_console(status, show_all)
 
 
-def gsummary_report(tasks: List[AuditTask], log_level: str = 'INFO', show_all: bool = False):
-    generator = ReportGenerator(tasks, log_level)
+def gsummary_report(tasks: List[AuditTask], log_level: str = 'INFO', show_all: bool = False, session_id: str = None, report_dir: str = "reports"):
+    generator = ReportGenerator(tasks, log_level, session_id, report_dir)
     generator.generate_console_summary(show_all)
     generator.generate_legacy_summary_file(show_all)
 
 
-def gcsv_report(tasks: List[AuditTask]):
-    generator = ReportGenerator(tasks)
+def gcsv_report(tasks: List[AuditTask], session_id: str = None, report_dir: str = "reports"):
+    generator = ReportGenerator(tasks, session_id=session_id, report_dir=report_dir)
     generator.generate_csv_report()
 
 
-def gorganized_reports(tasks: List[AuditTask], log_level: str = 'INFO'):
-    generator = ReportGenerator(tasks, log_level)
+def gorganized_reports(tasks: List[AuditTask], log_level: str = 'INFO', session_id: str = None, report_dir: str = "reports",
+                       connection_stats: Dict[str, Any] = None):
+    generator = ReportGenerator(tasks, log_level, session_id, report_dir, connection_stats)
     generator.generate_organized_reports()
 
 
+def gevidence_report(tasks: List[AuditTask], session_id: str = None, report_dir: str = "reports", meta: Dict[str, Any] = None):
+    reporter = EvidenceReporter(tasks, session_id or new_session_id(), report_dir, meta)
+    reporter.generate_evidence_file()
+
+
+def gprom_report(tasks: List[AuditTask], prom_path: str, session_id: str = None, host: str = None,
+                 run_duration: float = None, connection_stats: Dict[str, Any] = None):
+    reporter = PrometheusReporter(prom_path, session_id)
+    reporter.add_run(tasks, host=host, run_duration=run_duration, connection_stats=connection_stats)
+    reporter.generate_prom_file()
+
+
 # old function
 def format_tree_file(node: Dict[str, Any], log_level: str, prefix: str = "", is_last: bool = True) -> str:
     from .report_formatters import TreeFormatter
@@ -0,0 +1,19 @@
+import base64
+import gzip
+import json
+from typing import Any, Dict, List, Tuple
+
+from audit_task import AuditTask
+
+# one compressed, ASCII-safe document for a whole run, so it survives a text channel
+
+
+def pack_tasks(tasks: List[AuditTask], meta: Dict[str, Any] = None) -> str:
+    document = {"meta": meta or {}, "tasks": [task.to_dict() for task in tasks]}
+    raw = json.dumps(document, default=str).encode('utf-8')
+    return base64.b64encode(gzip.compress(raw)).decode('ascii')
+
+
+def unpack_tasks(blob: str) -> Tuple[List[AuditTask], Dict[str, Any]]:
+    document = json.loads(gzip.decompress(base64.b64decode(blob.strip())).decode('utf-8'))
+    return [AuditTask.from_dict(t) for t in document.get("tasks", [])], document.get("meta", {})
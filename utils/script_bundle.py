@@ -0,0 +1,146 @@
+import gzip
+import hashlib
+import io
+import logging
+import os
+import shlex
+import tarfile
+import tempfile
+import uuid
+from typing import Dict, Iterable, List, Optional
+
+from audit_task import AuditTask
+
+# root-owned parent, unlike /tmp nobody else can pre-create or swap a bundle directory
+BUNDLE_ROOT = "/var/cache/cis_audit/bundles"
+SCRIPTS_DIR = "functions"
+# other runs (shards, the agent, another auditor) may be using an older bundle or be
+# installing one right now, cleanup leaves everything touched within this many minutes
+BUNDLE_GRACE_MINUTES = 24 * 60
+
+
+def step_scripts(steps: Iterable[dict]) -> List[str]:
+    names = []
+    for node in steps:
+        if not isinstance(node, dict):
+            continue
+        if "logic" in node:
+            names.extend(step_scripts(node.get("steps", [])))
+        elif node.get("type_handler") == "execute_script" and node.get("target"):
+            names.append(node["target"])
+    return names
+
+
+def referenced_scripts(tasks: List[AuditTask]) -> List[str]:
+    names = set()
+    for task in tasks:
+        if task.check_type == "execute_script" and task.target:
+            names.add(task.target)
+        elif task.check_type == "multi_procedure" and isinstance(task.parameters, dict):
+            names.update(step_scripts(task.parameters.get("steps", [])))
+    return sorted(names)
+
+
+def build_archive(files: Dict[str, str]) -> bytes:
+    # fixed metadata and gzip mtime, so the same scripts always hash the same
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb', mtime=0) as gz:
+        with tarfile.open(fileobj=gz, mode='w', format=tarfile.PAX_FORMAT) as tar:
+            for arcname in sorted(files):
+                with open(files[arcname], 'rb') as f:
+                    data = f.read()
+                info = tarfile.TarInfo(arcname)
+                info.size = len(data)
+                info.mode = 0o700
+                info.mtime = 0
+                info.uid = info.gid = 0
+                info.uname = info.gname = "root"
+                tar.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+class ScriptBundle:
+    def __init__(self, executor, files: Dict[str, str], bundle_root: str = BUNDLE_ROOT):
+        self.executor = executor
+        self.files = files
+        self.archive = build_archive(files)
+        self.digest = hashlib.sha256(self.archive).hexdigest()
+        self.bundle_root = bundle_root
+        self.remote_dir = f"{bundle_root}/{self.digest[:16]}"
+        self.installed = False
+        self.logger = logging.getLogger(__name__)
+
+    @classmethod
+    def for_tasks(cls, executor, tasks: List[AuditTask], scripts_dir: str = SCRIPTS_DIR) -> "ScriptBundle":
+        files = {}
+        for name in referenced_scripts(tasks):
+            local_path = os.path.abspath(os.path.join(scripts_dir, name))
+            if os.path.isfile(local_path):
+                files[name] = local_path
+        return cls(executor, files)
+
+    def path_for(self, script_name: str) -> Optional[str]:
+        if not self.installed or script_name not in self.files:
+            return None
+        return f"{self.remote_dir}/{script_name}"
+
+    def sudo_sh(self, script: str, timeout: int = 120):
+        return self.executor.execute(f"sudo sh -c {shlex.quote(script)}", timeout)
+
+    def install(self) -> bool:
+        if not self.files:
+            return False
+        try:
+            # touching it marks the bundle as in use for the cleanup of other runs
+            stdout, _, _ = self.sudo_sh(f"test -f {self.remote_dir}/.complete && touch {self.remote_dir} && echo reuse")
+            if stdout.strip() == "reuse":
+                self.logger.info(f"Reusing script bundle {self.digest[:16]} on {self.executor.hostname}")
+                self.installed = True
+                return True
+
+            remote_archive = f"/tmp/cis_audit_bundle_{uuid.uuid4().hex[:8]}.tar.gz"
+            with tempfile.NamedTemporaryFile(suffix='.tar.gz', delete=False) as tmp:
+                tmp.write(self.archive)
+            try:
+                if not self.executor.upload_file(tmp.name, remote_archive):
+                    return False
+            finally:
+                os.unlink(tmp.name)
+
+            # verify the upload before extracting it as root, then swap the directory in atomically;
+            # the lock keeps a concurrent install of the same bundle from replacing one in use
+            install_script = (
+                f"set -e; trap 'rm -f {remote_archive}' EXIT; "
+                f"echo '{self.digest}  {remote_archive}' | sha256sum -c --status; "
+                f"mkdir -p -m 700 {self.bundle_root}; "
+                f"exec 9>{self.bundle_root}/.lock; if command -v flock >/dev/null; then flock 9; fi; "
+                f"if [ -f {self.remote_dir}/.complete ]; then touch {self.remote_dir}; exit 0; fi; "
+                f"staging=$(mktemp -d {self.bundle_root}/.staging.XXXXXX); "
+                f"tar -xzf {remote_archive} -C \"$staging\"; "
+                f"touch \"$staging/.complete\"; chmod 700 \"$staging\"; "
+                f"rm -rf {self.remote_dir}; mv \"$staging\" {self.remote_dir}"
+            )
+            _, stderr, exit_status = self.sudo_sh(install_script)
+            if exit_status != 0:
+                self.logger.error(f"Script bundle install failed on {self.executor.hostname}: {stderr.strip()}")
+                return False
+
+            self.logger.info(f"Installed script bundle {self.digest[:16]} ({len(self.files)} scripts) on {self.executor.hostname}")
+            self.installed = True
+            return True
+        except Exception as e:
+            self.logger.error(f"Script bundle install failed on {self.executor.hostname}: {e}")
+            return False
+
+    def cleanup(self):
+        # the current bundle stays for the next run; bundles and aborted installs nobody touched
+        # within the grace period go, recent ones may belong to a run still going on
+        if not self.installed:
+            return
+        try:
+            self.sudo_sh(
+                f"[ -d {self.bundle_root} ] && find {self.bundle_root} -mindepth 1 -maxdepth 1 "
+                f"! -name {self.digest[:16]} ! -name .lock -mmin +{BUNDLE_GRACE_MINUTES} -exec rm -rf {{}} + ; true"
+            )
+        except Exception as e:
+            self.logger.debug(f"Script bundle cleanup failed: {e}")
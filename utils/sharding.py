@@ -0,0 +1,56 @@
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+from audit_task import AuditTask
+from .cost_history import CostHistory
+
+# Splits the selected checks into N shards, so one audit can run as several processes or
+# from several jump hosts. A check always lands in the same shard for the same inputs:
+#   by check ID hash (default), stable across machines and runs
+#   by cost (--shard-costs), greedy balancing of the recorded durations; every shard must
+#   then be given the same cost history file, or shards overlap and miss checks
+# The shard and a digest of the cost file go into the evidence meta, --merge checks them.
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    # "2/4" is the second of four shards
+    try:
+        index, count = (int(part) for part in spec.split('/'))
+    except ValueError:
+        raise ValueError(f"Invalid shard '{spec}', expected i/N like 1/4")
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Invalid shard '{spec}', i must be between 1 and N")
+    return index, count
+
+
+def hash_shard(task_id: str, count: int) -> int:
+    # crc32 rather than hash(), which is salted per process
+    return zlib.crc32(task_id.encode('utf-8')) % count
+
+
+def balanced_shards(tasks: List[AuditTask], count: int, history: CostHistory) -> List[int]:
+    default = history.default_cost()
+    costs = [history.estimate(task.id) or default for task in tasks]
+    loads = [0.0] * count
+    assignment = [0] * len(tasks)
+    # longest first onto the least loaded shard, ties broken by ID and shard number
+    for position in sorted(range(len(tasks)), key=lambda i: (-costs[i], tasks[i].id)):
+        shard = min(range(count), key=lambda s: (loads[s], s))
+        assignment[position] = shard
+        loads[shard] += costs[position]
+    return assignment
+
+
+def select_shard(tasks: List[AuditTask], spec: Optional[str], costs_path: Optional[str] = None) -> Tuple[List[AuditTask], Dict[str, Any]]:
+    # the selected tasks and the evidence meta describing the split
+    if not spec:
+        return tasks, {}
+    index, count = parse_shard(spec)
+    meta = {"shard": f"{index}/{count}", "shard_costs": None}
+    if costs_path:
+        history = CostHistory.load(costs_path)
+        meta["shard_costs"] = history.digest
+        assignment = balanced_shards(tasks, count, history)
+    else:
+        assignment = [hash_shard(task.id, count) for task in tasks]
+    # declared order is kept inside a shard
+    return [task for task, shard in zip(tasks, assignment) if shard == index - 1], meta
@@ -0,0 +1,58 @@
+import re
+import shlex
+import uuid
+from typing import List, Optional, Tuple
+
+# Each command runs in its own subshell and is followed by an end marker on
+# both stdout and stderr. The marker is always preceded by a newline we add
+# ourselves, so the exact output of the command can be cut back out.
+#
+#   <stdout of cmd 0>\n<token>:0 <exit code>\n<stdout of cmd 1>\n<token>:1 <exit code>\n
+#   <stderr of cmd 0>\n<token>:0\n<stderr of cmd 1>\n<token>:1\n
+
+FramedResult = Tuple[str, str, Optional[int]]
+
+
+def new_token() -> str:
+    return f"__CIS_AUDIT_{uuid.uuid4().hex}__"
+
+
+def frame_command(command: str, token: str, index: int) -> str:
+    return (
+        f"( eval {shlex.quote(command)} ) </dev/null\n"
+        f"__cis_rc=$?\n"
+        f"printf '\\n%s %d\\n' '{token}:{index}' \"$__cis_rc\"\n"
+        f"printf '\\n%s\\n' '{token}:{index}' >&2\n"
+    )
+
+
+def frame_script(commands: List[str], token: str) -> str:
+    return "".join(frame_command(command, token, index) for index, command in enumerate(commands))
+
+
+def stdout_marker(token: str, index: int) -> re.Pattern:
+    return re.compile(rb"\n" + re.escape(f"{token}:{index}".encode()) + rb" (-?\d+)\n")
+
+
+def stderr_marker(token: str, index: int) -> re.Pattern:
+    return re.compile(rb"\n" + re.escape(f"{token}:{index}".encode()) + rb"\n")
+
+
+def decode(data: bytes) -> str:
+    return data.decode('utf-8', errors='replace')
+
+
+def split_framed(stdout: bytes, stderr: bytes, token: str, count: int) -> List[FramedResult]:
+    results = []
+    out_pos, err_pos = 0, 0
+    for index in range(count):
+        out_match = stdout_marker(token, index).search(stdout, out_pos)
+        err_match = stderr_marker(token, index).search(stderr, err_pos)
+        if not out_match or not err_match:
+            # the stream ended early (shell died or timed out), the rest has no verdict
+            results.append((decode(stdout[out_pos:]) if not out_match else "", decode(stderr[err_pos:]) if not err_match else "", None))
+            out_pos, err_pos = len(stdout), len(stderr)
+            continue
+        results.append((decode(stdout[out_pos:out_match.start()]), decode(stderr[err_pos:err_match.start()]), int(out_match.group(1))))
+        out_pos, err_pos = out_match.end(), err_match.end()
+    return results
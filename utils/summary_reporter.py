@@ -1,15 +1,17 @@
 import datetime
 import os
-from typing import List
+from typing import Any, Dict, List
 from audit_task import AuditTask
 from .report_formatters import TaskFormatter
 
 
 class SummaryReporter:
     
-    def __init__(self, tasks: List[AuditTask], session_id: str):
+    def __init__(self, tasks: List[AuditTask], session_id: str, report_dir: str = "reports", connection_stats: Dict[str, Any] = None):
         self.tasks = tasks
         self.session_id = session_id
+        self.report_dir = report_dir
+        self.connection_stats = connection_stats
         # Extract timestamp and audit ID from session_id
         parts = session_id.split('_')
         self.timestamp = f"{parts[0]}_{parts[1]}"  # YYYYMMDD_HHMMSS
@@ -20,6 +22,7 @@ class SummaryReporter:
         self.pass_count = self._count_by_status("PASS")
         self.fail_count = self._count_by_status("FAIL") 
         self.error_count = self._count_by_status("ERROR")
+        self.not_run_count = self._count_by_status("NOT_RUN")
     
     def _count_by_status(self, status: str) -> int:
         return len([
@@ -28,7 +31,7 @@ class SummaryReporter:
         ])
     
     def generate_summary_report(self):
-        summary_dir = "reports/summary"
+        summary_dir = os.path.join(self.report_dir, "summary")
         os.makedirs(summary_dir, exist_ok=True)
         
         summary_filename = f"audit_summary_{self.session_id}.txt"
@@ -40,6 +43,8 @@ class SummaryReporter:
                 self._write_category_summary(f)
                 self._write_failed_summary(f)
                 self._write_error_summary(f)
+                self._write_not_run_summary(f)
+                self._write_slowest_summary(f)
             
             print(f"Summary report saved to '{summary_path}'")
         except Exception as e:
@@ -49,8 +54,12 @@ class SummaryReporter:
         f.write("="*25 + " AUDIT SUMMARY " + "="*25 + "\n")
         f.write(f"Audit Session ID: {self.session_id}\n")
         f.write(f"Report Time: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-        f.write(f"Total Checks Run: {len(self.tasks)}\n")
-        f.write(f"RESULTS: {self.pass_count} Passed, {self.fail_count} Failed, {self.error_count} Errored.\n")
+        f.write(f"Total Checks Run: {len(self.tasks) - self.not_run_count}\n")
+        not_run = f", {self.not_run_count} Not Run" if self.not_run_count else ""
+        f.write(f"RESULTS: {self.pass_count} Passed, {self.fail_count} Failed, {self.error_count} Errored{not_run}.\n")
+        if self.connection_stats:
+            stats = self.connection_stats
+            f.write(f"CONNECTION ({stats['host']}): {stats['reconnects']} Reconnects, {stats['retries']} Retried Commands.\n")
         f.write("="*67 + "\n\n")
     
     def _write_category_summary(self, f):
@@ -58,7 +67,7 @@ class SummaryReporter:
         for task in self.tasks:
             domain = task.domain or "General"
             if domain not in categories:
-                categories[domain] = {"PASS": 0, "FAIL": 0, "ERROR": 0}
+                categories[domain] = {"PASS": 0, "FAIL": 0, "ERROR": 0, "NOT_RUN": 0}
             
             status = self.task_formatter.get_task_status(task)
             if status in categories[domain]:
@@ -67,7 +76,8 @@ class SummaryReporter:
         f.write("RESULTS BY CATEGORY:\n")
         for category, results in categories.items():
             total = sum(results.values())
-            f.write(f"  {category}: {results['PASS']} Pass, {results['FAIL']} Fail, {results['ERROR']} Error (Total: {total})\n")
+            not_run = f", {results['NOT_RUN']} Not Run" if results['NOT_RUN'] else ""
+            f.write(f"  {category}: {results['PASS']} Pass, {results['FAIL']} Fail, {results['ERROR']} Error{not_run} (Total: {total})\n")
     
     def _write_failed_summary(self, f):
         f.write(f"\nFAILED CHECKS SUMMARY:\n")
@@ -81,3 +91,38 @@ class SummaryReporter:
             for task in self.tasks:
                 if self.task_formatter.get_task_status(task) == "ERROR":
                     f.write(f"  - {task.id}: {task.title}\n")
+    
+    def _write_not_run_summary(self, f):
+        if self.not_run_count > 0:
+            f.write(f"\nNOT RUN CHECKS SUMMARY:\n")
+            for task in self.tasks:
+                if self.task_formatter.get_task_status(task) == "NOT_RUN":
+                    f.write(f"  - {task.id}: {task.title} ({task.final_result['details'].get('reason', '')})\n")
+    
+    def _slowest_step(self, nodes):
+        slowest = None
+        for node in nodes or []:
+            if not isinstance(node, dict):
+                continue
+            candidate = self._slowest_step(node.get("steps")) if "logic" in node else node
+            if candidate and candidate.get("metrics") and (slowest is None or candidate["metrics"]["wall_time"] > slowest["metrics"]["wall_time"]):
+                slowest = candidate
+        return slowest
+    
+    def _write_slowest_summary(self, f, limit: int = 10):
+        measured = [t for t in self.tasks if t.metrics]
+        if not measured:
+            return
+        
+        total = sum(t.metrics["wall_time"] for t in measured)
+        f.write(f"\nSLOWEST CHECKS (of {total:.2f}s check time):\n")
+        for task in sorted(measured, key=lambda t: t.metrics["wall_time"], reverse=True)[:limit]:
+            m = task.metrics
+            cached = ", cached" if m.get("cached") else ""
+            f.write(f"  - {task.id}: {m['wall_time']:.2f}s wall, {m['child_cpu']:.2f}s child CPU, "
+                    f"{m['commands']} commands, {m['round_trips']} round trips, {m['evidence_bytes']} bytes evidence{cached} - {task.title}\n")
+            
+            if isinstance(task.actual_output, dict) and task.actual_output.get("is_unified_logic_payload"):
+                step = self._slowest_step(task.actual_output.get("evidence_tree"))
+                if step:
+                    f.write(f"      slowest step: {step['metrics']['wall_time']:.2f}s - {step.get('title', 'Untitled Step')}\n")
@@ -0,0 +1,99 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# Opt-in span recording in Chrome trace-event format (chrome://tracing, ui.perfetto.dev).
+# Spans nest per thread by time, so run -> task -> logic group -> step -> command shows
+# up as a flame chart for every worker thread.
+
+
+class Tracer:
+    def __init__(self):
+        self.pid = os.getpid()
+        self.origin = time.perf_counter()
+        self.events = []
+        self.thread_names = {}
+        self.lock = threading.Lock()
+
+    def complete(self, name: str, category: str, started: float, ended: float, args: Dict[str, Any]):
+        thread = threading.current_thread()
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": round((started - self.origin) * 1e6, 1),
+            "dur": round((ended - started) * 1e6, 1),
+            "pid": self.pid,
+            "tid": thread.ident,
+            "args": args,
+        }
+        with self.lock:
+            self.events.append(event)
+            self.thread_names.setdefault(thread.ident, thread.name)
+
+    def save(self, path: str):
+        with self.lock:
+            events = list(self.events)
+            metadata = [
+                {"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": name}}
+                for tid, name in self.thread_names.items()
+            ]
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"traceEvents": metadata + events, "displayTimeUnit": "ms"}, f, default=str)
+
+
+class Span:
+    __slots__ = ("tracer", "name", "category", "args", "started")
+
+    def __init__(self, tracer: Tracer, name: str, category: str, args: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is not None:
+            self.args["error"] = str(exc_val)
+        self.tracer.complete(self.name, self.category, self.started, time.perf_counter(), self.args)
+        return False
+
+
+class NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+NULL_SPAN = NullSpan()
+tracer: Optional[Tracer] = None
+
+
+def enable_tracing() -> Tracer:
+    global tracer
+    tracer = Tracer()
+    return tracer
+
+
+def save_trace(path: str):
+    if tracer is not None:
+        tracer.save(path)
+
+
+def span(name: str, category: str = "audit", **args):
+    # disabled tracing costs one global lookup and returns a shared no-op
+    if tracer is None:
+        return NULL_SPAN
+    return Span(tracer, name, category, args)
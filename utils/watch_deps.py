@@ -0,0 +1,110 @@
+import functools
+import os
+import re
+from typing import Any, Set
+
+from audit_task import AuditTask
+from utils.script_bundle import SCRIPTS_DIR
+
+# Which files a check reads, so --watch only re-runs the checks a change can affect.
+# A path ending in '/' means "anything inside this directory".
+
+# absolute paths written in commands and scripts, runtime trees (/proc, /sys, /dev, /run, /tmp) cannot be watched
+PATH_PATTERN = re.compile(r"(?<![\w$.~-])(/(?:etc|boot|usr|var|lib|lib64|opt|root|home|srv)(?:/[\w.*?+@:,\[\]-]*)*)")
+GLOB_CHARS = re.compile(r"[*?\[]")
+
+# files behind commands that do not name them
+COMMAND_FILES = {
+    "sshd": ["/etc/ssh/sshd_config", "/etc/ssh/sshd_config.d/"],
+    "dpkg": ["/var/lib/dpkg/status"],
+    "dpkg-query": ["/var/lib/dpkg/status"],
+    "apt": ["/var/lib/dpkg/status"],
+    "modprobe": ["/etc/modprobe.d/", "/lib/modprobe.d/"],
+    "sysctl": ["/etc/sysctl.conf", "/etc/sysctl.d/", "/usr/lib/sysctl.d/"],
+    "systemctl": ["/etc/systemd/system/", "/etc/systemd/system/multi-user.target.wants/",
+                  "/etc/systemd/system/sockets.target.wants/", "/etc/systemd/system/timers.target.wants/"],
+    "journalctl": ["/etc/systemd/journald.conf", "/etc/systemd/journald.conf.d/"],
+    "ufw": ["/etc/ufw/", "/etc/default/ufw"],
+    "nft": ["/etc/nftables.conf"],
+    "findmnt": ["/etc/fstab"],
+    "getent": ["/etc/passwd", "/etc/group", "/etc/shadow"],
+    "chronyc": ["/etc/chrony/"],
+    "auditctl": ["/etc/audit/"],
+    "aa-status": ["/etc/apparmor.d/"],
+    "apparmor_status": ["/etc/apparmor.d/"],
+    "crontab": ["/etc/crontab", "/var/spool/cron/crontabs/"],
+}
+COMMAND_PATTERN = re.compile(r"(?<![\w/.-])(" + "|".join(re.escape(c) for c in sorted(COMMAND_FILES, key=len, reverse=True)) + r")(?![\w-])")
+
+# check types whose handlers read files without a shell command to look at
+CHECK_TYPE_FILES = {
+    "kernel_module_status": COMMAND_FILES["modprobe"],
+    "package_status": COMMAND_FILES["dpkg"],
+    "mount_point": COMMAND_FILES["findmnt"],
+    "mount_option": COMMAND_FILES["findmnt"],
+    "firewall": COMMAND_FILES["ufw"] + COMMAND_FILES["nft"],
+}
+
+
+def normalize(path: str) -> str:
+    # a glob is watched through the directory it expands in
+    match = GLOB_CHARS.search(path)
+    if match:
+        return path[:match.start()].rsplit('/', 1)[0] + '/'
+    return path
+
+
+def text_dependencies(text: str) -> Set[str]:
+    paths = {normalize(path) for path in PATH_PATTERN.findall(text)}
+    for command in COMMAND_PATTERN.findall(text):
+        paths.update(COMMAND_FILES[command])
+    return {path for path in paths if path not in ('', '/')}
+
+
+@functools.lru_cache(maxsize=None)
+def script_dependencies(script_name: str) -> frozenset:
+    script_path = os.path.join(SCRIPTS_DIR, script_name)
+    try:
+        with open(script_path, 'r', encoding='utf-8', errors='replace') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return frozenset()
+    # the interpreter on the shebang line is not something the check reads
+    if lines and lines[0].startswith('#!'):
+        lines = lines[1:]
+    return frozenset(text_dependencies("\n".join(lines)))
+
+
+def value_dependencies(value: Any) -> Set[str]:
+    if isinstance(value, str):
+        return text_dependencies(value)
+    if isinstance(value, dict):
+        return set().union(*(value_dependencies(v) for v in value.values())) if value else set()
+    if isinstance(value, (list, tuple)):
+        return set().union(*(value_dependencies(v) for v in value)) if value else set()
+    return set()
+
+
+def node_dependencies(check_type: str, target: str, params: Any) -> Set[str]:
+    if check_type == "multi_procedure" and isinstance(params, dict):
+        paths = set()
+        for node in params.get("steps", []):
+            if not isinstance(node, dict):
+                continue
+            if "logic" in node:
+                paths |= node_dependencies("multi_procedure", "", node)
+            else:
+                paths |= node_dependencies(node.get("type_handler"), node.get("target") or "", node.get("parameters"))
+        return paths
+
+    paths = value_dependencies(target) | value_dependencies(params)
+    if check_type == "execute_script" and target:
+        paths |= script_dependencies(target)
+    elif check_type == "config_file_value" and target.startswith('/'):
+        paths.add(target)
+    paths.update(CHECK_TYPE_FILES.get(check_type, []))
+    return paths
+
+
+def task_dependencies(task: AuditTask) -> Set[str]:
+    return node_dependencies(task.check_type, task.target or "", task.parameters)